@@ -1,20 +1,35 @@
 import streamlit as st
-import pandas as pd
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 import base64
-from typing import Dict, List
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, List, Optional, Tuple, Union
+from concurrent.futures import Future
 import json
+import time
 
 # Importando módulos locais
 from config import (
     APP_TITLE, APP_ICON, APP_LAYOUT, COLORS, CUSTOM_CSS,
     ACTIVITY_LEVELS, GOALS, DIETARY_RESTRICTIONS, PHYSICAL_ACTIVITIES,
-    load_config
+    AI_STREAMING, AI_PARALLEL_SECTIONS, AI_JSON_OUTPUT, AI_TEMPLATE_SECTIONS, JOB_SETTINGS, METRICS_SETTINGS, load_config
 )
 from utils import (
-    initialize_ai_model, calcular_tmb, calcular_calorias_diarias,
-    criar_plano_treino, gerar_graficos_plano, gerar_prompt_ia
+    get_ai_model, calcular_tmb, calcular_calorias_diarias,
+    calcular_macros_gramas, aquecer_importacoes,
+    hash_perfil, obter_recomendacoes_ia, transmitir_recomendacoes_ia,
+    processar_resposta_ia, StreamRecomendacoes, uso_tokens_total
 )
+from armazenamento import get_armazenamento
+from coordenador_ia import configurar_limitador
+from llm_cache import get_llm_cache
+from metricas import incrementar, iniciar_exportacao, medir, resumo
+from modelos_secoes import recomendacoes_locais
+from resposta_ia import renderizar_secao
+from tarefas import Tarefa, get_fila_tarefas
+
+# pandas, plano e graficos (numpy/plotly) só são importados quando um plano é gerado
+# ou exibido; na primeira renderização do formulário são pré-carregados em segundo plano
+if TYPE_CHECKING:
+    import pandas as pd
 
 def setup_page():
     """Configura a página inicial do Streamlit."""
@@ -127,8 +142,127 @@ def formulario_usuario():
             'limitacoes': limitacoes, 'duracao_plano': duracao_plano
         })
 
-def exibir_plano(dados_usuario: Dict, plano_treino: List[Dict], calorias: float, recomendacoes_ia: str):
-    """Exibe o plano gerado para o usuário."""
+def aguardar_fila_ia(pronto: Callable[[], bool], uso_tokens: Optional[Dict]) -> None:
+    """Mostra a posição na fila da IA enquanto o pedido aguarda a vez no limitador do processo."""
+    if uso_tokens is None:
+        return
+    aviso = st.empty()
+    while not pronto():
+        posicao = uso_tokens.get('posicao_fila')
+        if posicao:
+            aviso.info(f"⏳ Muitas pessoas gerando planos agora: você é o {posicao}º da fila da IA.")
+        else:
+            aviso.empty()
+        time.sleep(0.25)
+    aviso.empty()
+
+def exibir_tarefa_pendente(tarefa: Tarefa, uso_tokens: Optional[Dict]) -> None:
+    """Estado de uma geração ainda na fila de tarefas: posição na fila da IA e o texto recebido até agora."""
+    posicao = (uso_tokens or {}).get('posicao_fila')
+    if posicao:
+        st.info(f"⏳ Muitas pessoas gerando planos agora: você é o {posicao}º da fila da IA.")
+    parcial = tarefa.andamento.texto() if isinstance(tarefa.andamento, StreamRecomendacoes) else ''
+    if parcial:
+        st.markdown(parcial + ' ▌')
+    else:
+        st.info("🤖 Gerando recomendações personalizadas com IA... "
+                "Você pode sair desta página e voltar depois: a geração continua.")
+
+def exibir_exportacoes(df_plano: 'pd.DataFrame', dados_usuario: Dict, calorias: float, recomendacoes: str) -> None:
+    """Downloads do plano: cada formato só é gerado quando pedido (e fica em cache por plano)."""
+    from exportacao import FORMATOS, chave_exportacao, formatos_disponiveis, gerar_exportacao, nome_arquivo
+    
+    st.markdown("#### 📦 Exportar Plano")
+    col_formato, col_acao = st.columns([2, 1])
+    with col_formato:
+        formato = st.selectbox('Formato:', formatos_disponiveis(), format_func=lambda f: FORMATOS[f][0],
+                               key='formato_exportacao')
+    chave = (chave_exportacao(df_plano, dados_usuario, calorias, recomendacoes), formato)
+    preparados = st.session_state.setdefault('exportacoes_preparadas', set())
+    with col_acao:
+        if chave not in preparados and st.button('⚙️ Preparar arquivo'):
+            preparados.add(chave)
+        if chave in preparados:
+            st.download_button(
+                label=f"📥 Baixar {FORMATOS[formato][0]}",
+                data=gerar_exportacao(formato, df_plano, dados_usuario, calorias, recomendacoes),
+                file_name=nome_arquivo(formato),
+                mime=FORMATOS[formato][1]
+            )
+
+def exibir_registro_pesagem(df_plano: 'pd.DataFrame', peso: float, ao_registrar: Callable[[date, float], None]) -> None:
+    """Formulário de check-in: a pesagem é tratada em um callback, antes do rerun que redesenha o gráfico."""
+    import pandas as pd
+    
+    datas = pd.to_datetime(df_plano['data'], dayfirst=True)
+    inicio, fim = datas.iloc[0].date(), datas.iloc[-1].date()
+    with st.expander('⚖️ Registrar Pesagem'):
+        with st.form('form_pesagem'):
+            col_data, col_peso = st.columns(2)
+            with col_data:
+                st.date_input('Data da pesagem', value=min(max(date.today(), inicio), fim),
+                              min_value=inicio, max_value=fim, key='pesagem_data')
+            with col_peso:
+                st.number_input('Peso (kg)', min_value=30.0, max_value=300.0, value=float(peso), step=0.1,
+                                key='pesagem_peso')
+            st.form_submit_button(
+                '📌 Registrar e atualizar projeção',
+                on_click=lambda: ao_registrar(st.session_state['pesagem_data'], st.session_state['pesagem_peso'])
+            )
+
+def exibir_cardapio(dados_usuario: Dict, calorias: float) -> None:
+    """Exibe o cardápio calculado localmente para as metas do dia, um dia do plano por vez."""
+    from cardapio import NUTRIENTES, gerar_cardapio, metas_diarias
+
+    st.markdown("#### 🍽️ Cardápio Sugerido")
+    restricoes = dados_usuario.get('restricoes')
+    with medir('gerar_cardapio'):
+        cardapio = gerar_cardapio(calorias, dados_usuario['objetivo'], restricoes, dias=dados_usuario['duracao_plano'])
+    if cardapio.empty:
+        st.info("Nenhum alimento da tabela atende a todas as restrições selecionadas.")
+        return
+    dia = st.selectbox(
+        'Dia do plano', range(1, dados_usuario['duracao_plano'] + 1),
+        format_func=lambda d: f"Dia {d}", key='cardapio_dia'
+    )
+    do_dia = cardapio[cardapio['dia'] == dia]
+    st.dataframe(do_dia.drop(columns='dia'), hide_index=True, use_container_width=True)
+    totais = do_dia[NUTRIENTES].sum()
+    metas = metas_diarias(calorias, dados_usuario['objetivo'], restricoes)
+    st.caption(
+        f"Total do dia: {totais['kcal']:.0f} kcal · {totais['proteina_g']:.0f}g de proteínas · "
+        f"{totais['carboidrato_g']:.0f}g de carboidratos · {totais['gordura_g']:.0f}g de gorduras "
+        f"(metas: {metas['kcal']:.0f} kcal · {metas['proteina_g']:.0f}g · {metas['carboidrato_g']:.0f}g · "
+        f"{metas['gordura_g']:.0f}g). Valores baseados na tabela TACO; porções em gramas do alimento pronto."
+    )
+
+def exibir_plano(
+    dados_usuario: Dict,
+    plano_treino: Union['pd.DataFrame', List[Dict]],
+    calorias: float,
+    recomendacoes_ia: Union[str, Future, Iterable[str], Tarefa],
+    figuras: Optional[Tuple] = None,
+    secoes_ia: Optional[Dict] = None,
+    uso_tokens: Optional[Dict] = None,
+    ao_enviar_feedback: Optional[Callable[[str], None]] = None,
+    ao_registrar_pesagem: Optional[Callable[[date, float], None]] = None
+) -> Optional[str]:
+    """Exibe o plano gerado para o usuário e retorna o texto final das recomendações.
+
+    As recomendações podem ser um texto pronto, um Future ainda em execução ou um
+    iterável de partes; nos dois últimos casos as demais abas são exibidas primeiro
+    e a aba da IA aguarda o resultado (ou é preenchida em streaming). Uma Tarefa da
+    fila não é aguardada: enquanto estiver em andamento a aba mostra o texto parcial
+    e a função retorna None, para que a sessão consulte a tarefa de novo no próximo rerun. `figuras`
+    reaproveita gráficos já gerados em vez de reconstruí-los; `secoes_ia` (saída de
+    processar_resposta_ia) exibe as dicas de treino e nutrição nas respectivas abas;
+    `uso_tokens` é o uso de tokens da geração, exibido abaixo das recomendações;
+    `ao_enviar_feedback` recebe o texto do feedback enviado e `ao_registrar_pesagem`
+    a data e o peso de cada pesagem registrada na visão geral.
+    """
+    import pandas as pd
+    from graficos import gerar_graficos_plano
+    
     st.markdown("""
     ## 🎉 Seu Plano Personalizado está Pronto!
     """)
@@ -147,13 +281,15 @@ def exibir_plano(dados_usuario: Dict, plano_treino: List[Dict], calorias: float,
                 f"{dados_usuario['peso'] - 2 if 'Emagrecimento' in dados_usuario['objetivo'] else dados_usuario['peso'] + 2} kg")
         
         # Gráficos
-        df_plano = pd.DataFrame(plano_treino)
-        fig_peso, fig_macro, fig_treinos = gerar_graficos_plano(
+        df_plano = plano_treino if isinstance(plano_treino, pd.DataFrame) else pd.DataFrame(plano_treino)
+        fig_peso, fig_macro, fig_treinos = figuras or gerar_graficos_plano(
             df_plano, dados_usuario['peso'], dados_usuario['objetivo'], 
             GOALS[dados_usuario['objetivo']]
         )
         
         st.plotly_chart(fig_peso, use_container_width=True)
+        if ao_registrar_pesagem is not None:
+            exibir_registro_pesagem(df_plano, dados_usuario['peso'], ao_registrar_pesagem)
         col4, col5 = st.columns(2)
         with col4:
             st.plotly_chart(fig_macro, use_container_width=True)
@@ -162,19 +298,20 @@ def exibir_plano(dados_usuario: Dict, plano_treino: List[Dict], calorias: float,
     
     with tab2:
         st.markdown("### 📅 Calendário de Treinos")
+        # Datas no formato brasileiro apenas para exibição e download
+        df_exibicao = df_plano
+        if pd.api.types.is_datetime64_any_dtype(df_plano['data']):
+            df_exibicao = df_plano.assign(data=df_plano['data'].dt.strftime('%d/%m/%Y'))
         st.dataframe(
-            df_plano[['data', 'dia_semana', 'exercicio', 'intensidade', 'duracao']],
+            df_exibicao[['data', 'dia_semana', 'exercicio', 'intensidade', 'duracao']],
             use_container_width=True
         )
         
-        # Botão para download do plano
-        csv = df_plano.to_csv(index=False)
-        st.download_button(
-            label="📥 Baixar Plano de Treino",
-            data=csv,
-            file_name=f"plano_treino_{datetime.now().strftime('%Y%m%d')}.csv",
-            mime="text/csv"
-        )
+        # Downloads do plano: preenchidos ao final, quando as recomendações já estão completas
+        area_exportacao = st.container()
+        
+        if secoes_ia and secoes_ia.get('treino'):
+            st.markdown(renderizar_secao(secoes_ia, 'treino'))
     
     with tab3:
         st.markdown("""
@@ -197,9 +334,10 @@ def exibir_plano(dados_usuario: Dict, plano_treino: List[Dict], calorias: float,
         #### 📊 Distribuição Calórica Diária
         """)
         
-        calorias_proteina = (calorias * macros['protein'] / 100) / 4
-        calorias_carbs = (calorias * macros['carbs'] / 100) / 4
-        calorias_gorduras = (calorias * macros['fats'] / 100) / 9
+        macros_gramas = calcular_macros_gramas(calorias, dados_usuario['objetivo'])
+        calorias_proteina = macros_gramas['protein']
+        calorias_carbs = macros_gramas['carbs']
+        calorias_gorduras = macros_gramas['fats']
         
         col9, col10, col11 = st.columns(3)
         with col9:
@@ -208,12 +346,44 @@ def exibir_plano(dados_usuario: Dict, plano_treino: List[Dict], calorias: float,
             st.metric("Carboidratos (g)", f"{int(calorias_carbs)}g")
         with col11:
             st.metric("Gorduras (g)", f"{int(calorias_gorduras)}g")
+
+        exibir_cardapio(dados_usuario, calorias)
+
+        if secoes_ia and secoes_ia.get('nutricao'):
+            st.markdown(renderizar_secao(secoes_ia, 'nutricao'))
             
     with tab4:
         st.markdown("### 🤖 Recomendações Personalizadas da IA")
         
         # Exibir recomendações da IA
-        st.markdown(recomendacoes_ia)
+        if isinstance(recomendacoes_ia, Tarefa):
+            # Uma tarefa que falhou durante esta execução também volta como pendente: a
+            # sessão troca a resposta pelas recomendações locais no próximo rerun
+            if not recomendacoes_ia.concluida or recomendacoes_ia.erro is not None:
+                exibir_tarefa_pendente(recomendacoes_ia, uso_tokens)
+                return None
+            recomendacoes_ia = recomendacoes_ia.obter_resultado()
+        if isinstance(recomendacoes_ia, Future):
+            with st.spinner('🤖 Gerando recomendações personalizadas com IA...'):
+                aguardar_fila_ia(recomendacoes_ia.done, uso_tokens)
+                recomendacoes_ia = recomendacoes_ia.result()
+        elif isinstance(recomendacoes_ia, StreamRecomendacoes):
+            stream = recomendacoes_ia
+            aguardar_fila_ia(lambda: bool(stream.partes) or stream.concluido, uso_tokens)
+        if isinstance(recomendacoes_ia, str):
+            st.markdown(recomendacoes_ia)
+        else:
+            recomendacoes_ia = st.write_stream(iter(recomendacoes_ia))
+        if uso_tokens:
+            if uso_tokens.get('cache'):
+                st.caption('⚡ Recomendações reaproveitadas do cache (nenhum token consumido)')
+            elif uso_tokens.get('compartilhada') and not uso_tokens.get('requisicoes'):
+                st.caption('⚡ Recomendações compartilhadas com um pedido idêntico em andamento')
+            elif uso_tokens.get('requisicoes'):
+                st.caption(
+                    f"🔢 {uso_tokens['tokens_entrada']} tokens de entrada · {uso_tokens['tokens_saida']} de saída "
+                    f"(limite {uso_tokens['max_tokens_saida']}) · {uso_tokens['latencia_s']:.1f}s"
+                )
         
         # Adicionar botão para exportar recomendações
         st.download_button(
@@ -231,7 +401,154 @@ def exibir_plano(dados_usuario: Dict, plano_treino: List[Dict], calorias: float,
             placeholder="Digite aqui seu feedback sobre as recomendações recebidas..."
         )
         if st.button("📤 Enviar Feedback"):
+            if ao_enviar_feedback is not None and feedback.strip():
+                ao_enviar_feedback(feedback.strip())
             st.success("Obrigado pelo seu feedback! Isso nos ajuda a melhorar continuamente.")
+    
+    with area_exportacao:
+        exibir_exportacoes(df_plano, dados_usuario, calorias, recomendacoes_ia)
+    
+    return recomendacoes_ia
+
+def gerar_resultado(dados_usuario: Dict, ai_model, llm_cache, config: Dict, armazenamento, fila) -> Dict:
+    """Gera plano e calorias e submete as recomendações da IA à fila de tarefas.
+
+    O resultado é guardado na sessão para que reruns (feedback, downloads) apenas
+    o exibam novamente, sem recalcular nem chamar a IA. O plano fica na sessão como
+    PlanoCompacto e os gráficos só no cache de graficos (ver figuras_plano). A tarefa
+    grava a resposta no histórico ao terminar, mesmo que o usuário já tenha saído da página.
+    """
+    from plano import PlanoCompacto, criar_plano_treino_df
+    
+    with st.spinner('🔮 Gerando seu plano personalizado...'):
+        # Cálculos básicos
+        with medir('calcular_tmb'):
+            tmb = calcular_tmb(
+                dados_usuario['peso'], 
+                dados_usuario['altura'],
+                dados_usuario['idade'],
+                dados_usuario['sexo']
+            )
+        
+        with medir('calcular_calorias'):
+            calorias = calcular_calorias_diarias(
+                tmb,
+                dados_usuario['nivel_atividade'],
+                dados_usuario['objetivo']
+            )
+        
+        # Gerar plano de treino (DataFrame tipado, sem passar por lista de dicts)
+        with medir('criar_plano_treino'):
+            plano_treino = criar_plano_treino_df(
+                dados_usuario['atividades'],
+                dados_usuario['duracao_plano'],
+                dados_usuario['objetivo'],
+                dados_usuario['limitacoes'],
+                dados_usuario['peso']  # Adicionando peso inicial
+            )
+    
+    perfil_hash = hash_perfil(dados_usuario)
+    resultado = {
+        'perfil_hash': perfil_hash,
+        'dados_usuario': dados_usuario,
+        'calorias': calorias,
+        'plano_treino': PlanoCompacto.de_dataframe(plano_treino),
+        'uso_tokens': {}
+    }
+    if armazenamento is not None:
+        resultado['plano_id'] = armazenamento.salvar_plano(dados_usuario, perfil_hash, calorias, plano_treino)
+    
+    paralelo = config.get('AI_PARALLEL_SECTIONS', AI_PARALLEL_SECTIONS)
+    formato_json = config.get('AI_JSON_OUTPUT', AI_JSON_OUTPUT)
+    streaming = config.get('AI_STREAMING', AI_STREAMING)
+    modelos = config.get('AI_TEMPLATE_SECTIONS', AI_TEMPLATE_SECTIONS)
+    uso_tokens = resultado['uso_tokens']
+    
+    def gerar_recomendacoes(tarefa: Tarefa) -> str:
+        if streaming:
+            # Em streaming, o texto parcial fica visível para as sessões que consultam a tarefa
+            tarefa.andamento = StreamRecomendacoes()
+            texto = transmitir_recomendacoes_ia(
+                tarefa.andamento, ai_model, dados_usuario, llm_cache, paralelo, formato_json, uso_tokens, modelos
+            )
+        else:
+            texto = obter_recomendacoes_ia(
+                ai_model, dados_usuario, llm_cache, paralelo, formato_json, uso_tokens, modelos
+            )
+        if armazenamento is not None and resultado.get('plano_id'):
+            armazenamento.salvar_recomendacoes(resultado['plano_id'], texto, uso_tokens)
+        return texto
+    
+    # O contexto guarda uma cópia do resultado, para que outra sessão possa retomar a tarefa
+    resultado['recomendacoes'] = fila.submeter(perfil_hash, gerar_recomendacoes, contexto=dict(resultado))
+    return resultado
+
+def retomar_tarefa(tarefa: Optional[Tarefa]) -> Optional[Dict]:
+    """Resultado de uma tarefa já submetida (por esta ou outra sessão), para voltar a acompanhá-la."""
+    if tarefa is None or tarefa.erro is not None:
+        return None
+    return {**tarefa.contexto, 'recomendacoes': tarefa}
+
+def registrar_pesagem(resultado: Dict, data_pesagem: date, peso: float, armazenamento, config: Dict) -> None:
+    """Registra uma pesagem e reprojeta o peso dos dias restantes do plano, sem chamar a IA."""
+    from plano import PlanoCompacto, reprojetar_peso
+    
+    dados = resultado['dados_usuario']
+    data_iso = data_pesagem.isoformat()
+    pesagens = sorted(
+        [p for p in resultado.get('pesagens', []) if p['data'] != data_iso] + [{'data': data_iso, 'peso': float(peso)}],
+        key=lambda p: p['data']
+    )
+    with medir('reprojetar_peso'):
+        plano_treino = reprojetar_peso(
+            resultado['plano_treino'].para_dataframe(), pesagens, dados['peso'], dados['objetivo'],
+            config.get('WEIGHT_TREND')
+        )
+    resultado['plano_treino'] = PlanoCompacto.de_dataframe(plano_treino)
+    resultado['pesagens'] = pesagens
+    if armazenamento is not None and resultado.get('plano_id'):
+        armazenamento.salvar_pesagem(resultado['plano_id'], dados['nome'], data_iso, peso)
+        armazenamento.atualizar_plano(resultado['plano_id'], plano_treino)
+
+def figuras_plano(resultado: Dict, plano_df: 'pd.DataFrame') -> Tuple:
+    """Gráficos do plano da sessão, pelo cache de graficos (compartilhado e limitado).
+
+    As figuras não ficam na sessão: são a maior parte da memória de cada uma e o
+    cache por processo as reaproveita nos reruns, reconstruindo só se tiverem sido descartadas.
+    """
+    from graficos import gerar_graficos_plano
+    dados = resultado['dados_usuario']
+    with medir('gerar_graficos_plano'):
+        return gerar_graficos_plano(
+            plano_df, dados['peso'], dados['objetivo'], GOALS[dados['objetivo']],
+            pesagens=resultado.get('pesagens'), assinatura=resultado['plano_treino'].assinatura
+        )
+
+def exibir_painel_metricas(fila) -> None:
+    """Painel de administração com as métricas do processo (ativado por METRICS.admin_panel)."""
+    with st.sidebar.expander('🛠️ Métricas do servidor'):
+        metricas = resumo()
+        if metricas['etapas']:
+            import pandas as pd
+            st.dataframe(pd.DataFrame.from_dict(metricas['etapas'], orient='index'), use_container_width=True)
+        else:
+            st.caption('Nenhuma etapa medida ainda.')
+        st.json({'contadores': metricas['contadores'], 'tokens': uso_tokens_total(), 'tarefas': fila.resumo(),
+                 'recursos': metricas['recursos']})
+
+def carregar_ultimo_plano(armazenamento, dados_usuario: Dict, perfil_hash: str) -> Optional[Dict]:
+    """Recupera do histórico o último plano do usuário para o mesmo perfil, sem gerar outro."""
+    if armazenamento is None:
+        return None
+    salvo = armazenamento.ultimo_plano(dados_usuario['nome'], perfil_hash)
+    if salvo is None:
+        return None
+    from plano import PlanoCompacto
+    # O plano salvo já tem o peso reprojetado pelas pesagens registradas
+    salvo['plano_treino'] = PlanoCompacto.de_dataframe(salvo['plano_treino'])
+    salvo['pesagens'] = armazenamento.pesagens(salvo['plano_id'])
+    salvo['do_historico'] = True
+    return salvo
 
 def main():
     """Função principal da aplicação."""
@@ -239,16 +556,29 @@ def main():
     criar_header()
     criar_sidebar()
     
-    # Carregar configuração
+    # Carregar configuração (cacheada por processo; recarrega se config.yaml mudar)
     try:
         config = load_config()
-        ai_model = initialize_ai_model(config['GOOGLE_API_KEY'])
+        api_key = config['GOOGLE_API_KEY']
+        llm_cache = get_llm_cache(config)
+        armazenamento = get_armazenamento(config)
+        fila = get_fila_tarefas(config)
+        configurar_limitador(config)
+        iniciar_exportacao(config)
     except Exception as e:
         st.error(f"Erro na configuração: {e}")
         return
     
     # Formulário principal
     submit_button, dados_usuario = formulario_usuario()
+    aquecer_importacoes()
+    
+    resultado = st.session_state.get('resultado_plano')
+    if resultado is None and 'tarefa' in st.query_params:
+        # Página recarregada (nova sessão): volta a acompanhar a tarefa indicada na URL
+        resultado = retomar_tarefa(fila.obter(st.query_params['tarefa']))
+        if resultado is not None:
+            st.session_state['resultado_plano'] = resultado
     
     if submit_button:
         if not all([dados_usuario['nome'], dados_usuario['idade'], dados_usuario['altura'], 
@@ -256,41 +586,81 @@ def main():
             st.warning('⚠️ Por favor, preencha todos os campos obrigatórios.')
             return
         
-        with st.spinner('🔮 Gerando seu plano personalizado...'):
+        # Só gera um novo plano se o perfil mudou desde o último envio
+        perfil_hash = hash_perfil(dados_usuario)
+        # (ou se o último envio ficou sem a IA, para tentar de novo)
+        if resultado is None or resultado['perfil_hash'] != perfil_hash or resultado.get('sem_ia'):
             try:
-                # Cálculos básicos
-                tmb = calcular_tmb(
-                    dados_usuario['peso'], 
-                    dados_usuario['altura'],
-                    dados_usuario['idade'],
-                    dados_usuario['sexo']
-                )
-                
-                calorias = calcular_calorias_diarias(
-                    tmb,
-                    dados_usuario['nivel_atividade'],
-                    dados_usuario['objetivo']
-                )
-                
-                # Gerar plano de treino
-                plano_treino = criar_plano_treino(
-                    dados_usuario['atividades'],
-                    dados_usuario['duracao_plano'],
-                    dados_usuario['objetivo'],
-                    dados_usuario['limitacoes'],
-                    dados_usuario['peso']  # Adicionando peso inicial
-                )
-                
-                # Gerar recomendações da IA
-                with st.spinner('🤖 Gerando recomendações personalizadas com IA...'):
-                    prompt = gerar_prompt_ia(dados_usuario)
-                    recomendacoes = ai_model.invoke(prompt)
-                    
-                # Exibir resultados
-                exibir_plano(dados_usuario, plano_treino, calorias, recomendacoes.content)
-                
+                # Usuário que volta com o mesmo perfil recebe o último plano salvo, ou
+                # retoma a geração que ainda está em andamento na fila
+                resultado = (carregar_ultimo_plano(armazenamento, dados_usuario, perfil_hash)
+                             or retomar_tarefa(fila.buscar(perfil_hash)))
+                if resultado is None:
+                    # O cliente da IA (e o langchain) só é criado no primeiro envio
+                    ai_model = get_ai_model(api_key, config)
+                    resultado = gerar_resultado(dados_usuario, ai_model, llm_cache, config, armazenamento, fila)
+                st.session_state['resultado_plano'] = resultado
+                if isinstance(resultado['recomendacoes'], Tarefa):
+                    st.query_params['tarefa'] = resultado['recomendacoes'].id
             except Exception as e:
                 st.error(f"Ocorreu um erro ao gerar o plano: {str(e)}")
+                return
+    
+    tarefa_pendente = None
+    if resultado is not None:
+        try:
+            if resultado.get('do_historico'):
+                criado_em = datetime.fromtimestamp(resultado['criado_em']).strftime('%d/%m/%Y %H:%M')
+                st.info(f"📂 Bem-vindo de volta! Este é o seu plano salvo em {criado_em}.")
+            
+            def salvar_feedback(texto: str) -> None:
+                if armazenamento is not None and resultado.get('plano_id'):
+                    armazenamento.salvar_feedback(resultado['plano_id'], resultado['dados_usuario']['nome'], texto)
+            
+            def salvar_pesagem(data_pesagem: date, peso: float) -> None:
+                registrar_pesagem(resultado, data_pesagem, peso, armazenamento, config)
+            
+            # Exibir resultados (a partir da sessão nos reruns); o DataFrame e os gráficos
+            # do plano são montados só para esta execução, a sessão guarda o plano compacto
+            recomendacoes = resultado['recomendacoes']
+            if isinstance(recomendacoes, Tarefa) and recomendacoes.erro is not None:
+                # IA indisponível (disjuntor aberto, prazo esgotado ou erro do provedor): o plano local
+                # é exibido na hora com as recomendações padrão, que não vão para o histórico
+                incrementar('ia_fallback')
+                st.warning(f"⚠️ Não foi possível gerar as recomendações personalizadas: {recomendacoes.erro}")
+                recomendacoes = resultado['recomendacoes'] = recomendacoes_locais(resultado['dados_usuario'])
+                resultado['sem_ia'] = True
+                st.query_params.pop('tarefa', None)
+            plano_df = resultado['plano_treino'].para_dataframe()
+            with medir('exibir_plano'):
+                resultado['recomendacoes'] = exibir_plano(
+                    resultado['dados_usuario'], plano_df, resultado['calorias'],
+                    recomendacoes, figuras_plano(resultado, plano_df), resultado.get('secoes_ia'),
+                    resultado.get('uso_tokens'), salvar_feedback, salvar_pesagem
+                )
+            if resultado['recomendacoes'] is None:
+                # Tarefa ainda em andamento: consulta de novo no próximo rerun
+                resultado['recomendacoes'] = tarefa_pendente = recomendacoes
+            elif 'secoes_ia' not in resultado:
+                # Seções da resposta: já analisadas durante o streaming, ou lidas uma única vez do texto
+                transmissao = recomendacoes.andamento if isinstance(recomendacoes, Tarefa) else recomendacoes
+                resultado['secoes_ia'] = (transmissao.secoes() if isinstance(transmissao, StreamRecomendacoes)
+                                          else processar_resposta_ia(resultado['recomendacoes']))
+        except Exception as e:
+            # Descarta o resultado para que um novo envio tente gerar as recomendações novamente
+            st.session_state.pop('resultado_plano', None)
+            st.query_params.pop('tarefa', None)
+            st.error(f"Ocorreu um erro ao gerar o plano: {str(e)}")
+    
+    if {**METRICS_SETTINGS, **(config.get('METRICS') or {})}['admin_panel']:
+        exibir_painel_metricas(fila)
+    
+    if tarefa_pendente is not None:
+        # Polling: cada execução do script dura no máximo um intervalo a mais (menos, se a tarefa
+        # terminar antes) e o rerun mostra o progresso; sair da página não interrompe a geração
+        intervalo = {**JOB_SETTINGS, **(config.get('JOBS') or {})}['intervalo_polling_segundos']
+        tarefa_pendente.aguardar(intervalo)
+        st.rerun()
 
 if __name__ == "__main__":
     main()
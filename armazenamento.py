@@ -0,0 +1,288 @@
+import atexit
+import io
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+from config import STORE_SETTINGS
+from metricas import incrementar, observar
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS perfis (
+    perfil_hash TEXT PRIMARY KEY,
+    usuario TEXT NOT NULL,
+    dados TEXT NOT NULL,
+    criado_em REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_perfis_usuario ON perfis (usuario, criado_em);
+
+CREATE TABLE IF NOT EXISTS planos (
+    id TEXT PRIMARY KEY,
+    usuario TEXT NOT NULL,
+    perfil_hash TEXT NOT NULL,
+    criado_em REAL NOT NULL,
+    calorias REAL NOT NULL,
+    plano BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_planos_usuario ON planos (usuario, perfil_hash, criado_em);
+CREATE INDEX IF NOT EXISTS idx_planos_perfil ON planos (perfil_hash, criado_em);
+CREATE INDEX IF NOT EXISTS idx_planos_data ON planos (criado_em);
+
+CREATE TABLE IF NOT EXISTS respostas_ia (
+    plano_id TEXT PRIMARY KEY,
+    texto TEXT NOT NULL,
+    uso_tokens TEXT,
+    criado_em REAL NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS feedback (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    plano_id TEXT NOT NULL,
+    usuario TEXT NOT NULL,
+    texto TEXT NOT NULL,
+    criado_em REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_feedback_usuario ON feedback (usuario, criado_em);
+CREATE INDEX IF NOT EXISTS idx_feedback_plano ON feedback (plano_id);
+CREATE INDEX IF NOT EXISTS idx_feedback_data ON feedback (criado_em);
+
+CREATE TABLE IF NOT EXISTS pesagens (
+    plano_id TEXT NOT NULL,
+    usuario TEXT NOT NULL,
+    data TEXT NOT NULL,
+    peso REAL NOT NULL,
+    criado_em REAL NOT NULL,
+    PRIMARY KEY (plano_id, data)
+);
+CREATE INDEX IF NOT EXISTS idx_pesagens_usuario ON pesagens (usuario, data);
+"""
+
+def chave_usuario(nome: str) -> str:
+    """Identificador do usuário: o nome normalizado (caixa e espaços)."""
+    return ' '.join((nome or '').lower().split())
+
+def _plano_para_bytes(plano_df: 'pd.DataFrame') -> bytes:
+    # Parquet preserva os tipos do plano (datas, categorias, int16)
+    return plano_df.to_parquet(index=False)
+
+def _plano_de_bytes(dados: bytes) -> 'pd.DataFrame':
+    import pandas as pd
+    return pd.read_parquet(io.BytesIO(dados))
+
+class ArmazenamentoPlanos:
+    """Histórico local (SQLite) de perfis, planos, respostas da IA, pesagens e feedback.
+
+    As escritas entram em uma fila e são gravadas por uma thread em lotes (uma
+    transação por lote), então quem chama nunca espera pelo disco. As leituras
+    usam os índices por usuário, perfil e data; escritas ainda na fila (no
+    máximo `intervalo_segundos`) não aparecem nelas.
+    """
+
+    def __init__(self, path: str, lote_max: int = 200, intervalo_segundos: float = 0.5):
+        self.path = path
+        self.lote_max = lote_max
+        self.intervalo_segundos = intervalo_segundos
+        self._fila: 'queue.Queue[Tuple[str, Union[tuple, Callable]]]' = queue.Queue()
+
+        diretorio = os.path.dirname(path)
+        if diretorio:
+            os.makedirs(diretorio, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(ESQUEMA)
+
+        self._thread = threading.Thread(target=self._gravar_lotes, name='fitia-armazenamento', daemon=True)
+        self._thread.start()
+        atexit.register(self.flush)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.path, timeout=10)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    # Escrita (write-behind)
+
+    def _enfileirar(self, sql: str, parametros: Union[tuple, Callable[[], tuple]]) -> None:
+        """Enfileira uma escrita; `parametros` pode ser uma função, avaliada já na thread de gravação."""
+        self._fila.put((sql, parametros))
+
+    def _gravar_lotes(self) -> None:
+        while True:
+            lote = [self._fila.get()]
+            # Acumula o que chegar durante o intervalo, até o tamanho máximo do lote
+            limite = time.monotonic() + self.intervalo_segundos
+            while len(lote) < self.lote_max:
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    break
+                try:
+                    lote.append(self._fila.get(timeout=restante))
+                except queue.Empty:
+                    break
+            inicio = time.perf_counter()
+            try:
+                with self._connect() as conn:
+                    gravadas = self._gravar_lote(conn, lote)
+                incrementar('armazenamento_escritas', gravadas)
+            except Exception as e:
+                incrementar('erros', etapa='armazenamento')
+                incrementar('armazenamento_perdidas', len(lote))
+                print(f"Erro ao gravar o histórico de planos: {e}")
+            finally:
+                observar('armazenamento_lote', time.perf_counter() - inicio)
+                for _ in lote:
+                    self._fila.task_done()
+
+    def _gravar_lote(self, conn: sqlite3.Connection, lote: List[Tuple[str, Union[tuple, Callable]]]) -> int:
+        """Grava o lote em uma transação, com um SAVEPOINT por escrita; retorna quantas foram gravadas.
+
+        Uma escrita que falha (ex.: restrição violada ou erro ao serializar) é desfeita
+        sozinha e contada em `armazenamento_perdidas`, sem descartar o restante do lote.
+        """
+        gravadas = 0
+        conn.execute("BEGIN")
+        for sql, parametros in lote:
+            conn.execute("SAVEPOINT escrita")
+            try:
+                conn.execute(sql, parametros() if callable(parametros) else parametros)
+            except Exception as e:
+                conn.execute("ROLLBACK TO escrita")
+                incrementar('erros', etapa='armazenamento')
+                incrementar('armazenamento_perdidas')
+                print(f"Erro ao gravar o histórico de planos: {e}")
+            else:
+                gravadas += 1
+            finally:
+                conn.execute("RELEASE escrita")
+        return gravadas
+
+    def flush(self) -> None:
+        """Aguarda a gravação de todas as escritas enfileiradas."""
+        self._fila.join()
+
+    def salvar_plano(self, dados_usuario: Dict, perfil_hash: str, calorias: float, plano_df: 'pd.DataFrame') -> str:
+        """Enfileira o perfil e o plano gerado; retorna o id do plano."""
+        plano_id = uuid.uuid4().hex
+        usuario = chave_usuario(dados_usuario.get('nome'))
+        agora = time.time()
+        self._enfileirar(
+            "INSERT OR IGNORE INTO perfis (perfil_hash, usuario, dados, criado_em) VALUES (?, ?, ?, ?)",
+            (perfil_hash, usuario, json.dumps(dados_usuario, ensure_ascii=False, default=str), agora)
+        )
+        # A serialização do plano também fica fora da thread de quem chama (sobre uma cópia)
+        plano_df = plano_df.copy()
+        self._enfileirar(
+            "INSERT INTO planos (id, usuario, perfil_hash, criado_em, calorias, plano) VALUES (?, ?, ?, ?, ?, ?)",
+            lambda: (plano_id, usuario, perfil_hash, agora, float(calorias), _plano_para_bytes(plano_df))
+        )
+        return plano_id
+
+    def salvar_recomendacoes(self, plano_id: str, texto: str, uso_tokens: Optional[Dict] = None) -> None:
+        """Enfileira a resposta final da IA de um plano."""
+        self._enfileirar(
+            "INSERT OR REPLACE INTO respostas_ia (plano_id, texto, uso_tokens, criado_em) VALUES (?, ?, ?, ?)",
+            (plano_id, texto, json.dumps(uso_tokens or {}), time.time())
+        )
+
+    def salvar_feedback(self, plano_id: str, nome: str, texto: str) -> None:
+        """Enfileira o feedback enviado para um plano."""
+        self._enfileirar(
+            "INSERT INTO feedback (plano_id, usuario, texto, criado_em) VALUES (?, ?, ?, ?)",
+            (plano_id, chave_usuario(nome), texto, time.time())
+        )
+
+    def salvar_pesagem(self, plano_id: str, nome: str, data: str, peso: float) -> None:
+        """Enfileira uma pesagem (data aaaa-mm-dd); uma nova pesagem no mesmo dia substitui a anterior."""
+        self._enfileirar(
+            "INSERT OR REPLACE INTO pesagens (plano_id, usuario, data, peso, criado_em) VALUES (?, ?, ?, ?, ?)",
+            (plano_id, chave_usuario(nome), data, float(peso), time.time())
+        )
+
+    def atualizar_plano(self, plano_id: str, plano_df: 'pd.DataFrame') -> None:
+        """Enfileira a nova versão de um plano (ex.: peso reprojetado após uma pesagem)."""
+        plano_df = plano_df.copy()
+        self._enfileirar(
+            "UPDATE planos SET plano = ? WHERE id = ?",
+            lambda: (_plano_para_bytes(plano_df), plano_id)
+        )
+
+    # Leitura
+
+    def ultimo_plano(self, nome: str, perfil_hash: Optional[str] = None) -> Optional[Dict]:
+        """Último plano do usuário (opcionalmente do mesmo perfil) que já tem resposta da IA."""
+        inicio = time.perf_counter()
+        consulta = (
+            "SELECT p.id, p.perfil_hash, p.criado_em, p.calorias, p.plano, r.texto, r.uso_tokens, f.dados "
+            "FROM planos p JOIN respostas_ia r ON r.plano_id = p.id JOIN perfis f ON f.perfil_hash = p.perfil_hash "
+            "WHERE p.usuario = ?"
+        )
+        parametros: tuple = (chave_usuario(nome),)
+        if perfil_hash is not None:
+            consulta += " AND p.perfil_hash = ?"
+            parametros += (perfil_hash,)
+        with self._connect() as conn:
+            linha = conn.execute(consulta + " ORDER BY p.criado_em DESC LIMIT 1", parametros).fetchone()
+        observar('armazenamento_leitura', time.perf_counter() - inicio)
+        if linha is None:
+            return None
+        return {
+            'plano_id': linha[0],
+            'perfil_hash': linha[1],
+            'criado_em': linha[2],
+            'calorias': linha[3],
+            'plano_treino': _plano_de_bytes(linha[4]),
+            'recomendacoes': linha[5],
+            'uso_tokens': json.loads(linha[6] or '{}'),
+            'dados_usuario': json.loads(linha[7])
+        }
+
+    def pesagens(self, plano_id: str) -> List[Dict]:
+        """Pesagens registradas para um plano, em ordem de data."""
+        with self._connect() as conn:
+            linhas = conn.execute(
+                "SELECT data, peso FROM pesagens WHERE plano_id = ? ORDER BY data", (plano_id,)
+            ).fetchall()
+        return [{'data': data, 'peso': peso} for data, peso in linhas]
+
+    def feedbacks(self, nome: Optional[str] = None, limite: int = 100) -> List[Dict]:
+        """Feedbacks mais recentes (de um usuário ou de todos)."""
+        consulta = "SELECT plano_id, usuario, texto, criado_em FROM feedback"
+        parametros: tuple = ()
+        if nome is not None:
+            consulta += " WHERE usuario = ?"
+            parametros = (chave_usuario(nome),)
+        with self._connect() as conn:
+            linhas = conn.execute(consulta + " ORDER BY criado_em DESC LIMIT ?", parametros + (limite,)).fetchall()
+        return [dict(zip(['plano_id', 'usuario', 'texto', 'criado_em'], linha)) for linha in linhas]
+
+# Instância única por processo, recriada apenas se as configurações mudarem
+_armazenamento_lock = threading.Lock()
+_armazenamento_instancia: Dict = {'settings': None, 'armazenamento': None}
+
+def get_armazenamento(config: Optional[Dict] = None) -> Optional[ArmazenamentoPlanos]:
+    """Retorna o armazenamento compartilhado, ou None se desativado (STORE.enabled: false)."""
+    settings = {**STORE_SETTINGS, **((config or {}).get('STORE') or {})}
+    if not settings['enabled']:
+        return None
+    with _armazenamento_lock:
+        if _armazenamento_instancia['settings'] != settings:
+            _armazenamento_instancia['armazenamento'] = ArmazenamentoPlanos(
+                path=settings['path'],
+                lote_max=settings['lote_max'],
+                intervalo_segundos=settings['intervalo_segundos']
+            )
+            _armazenamento_instancia['settings'] = settings
+        return _armazenamento_instancia['armazenamento']
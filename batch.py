@@ -0,0 +1,340 @@
+"""Geração de planos em lote, sem a interface do Streamlit.
+
+Uso:
+    python batch.py perfis.jsonl --saida resultados/ --concorrencia 8 --rpm 60
+
+Cada perfil usa os mesmos campos do formulário do app (nome, idade, sexo,
+altura, peso, nivel_atividade, objetivo, restricoes, atividades,
+preferencias_alimentares, limitacoes, duracao_plano) e, opcionalmente, um
+`id`. Em CSV, restricoes e atividades são separadas por ';'.
+
+O progresso é gravado em `checkpoint.jsonl` na pasta de saída; rodar o mesmo
+comando novamente retoma de onde parou. Ao final são gerados `perfis.parquet`
+(um registro por pessoa, com uma coluna por seção da IA), `planos.parquet`
+(um registro por dia de cada plano), `cardapios.parquet` (cardápio calculado
+localmente, um registro por alimento de cada refeição de cada dia) e um
+Markdown por pessoa em `markdown/`.
+A exportação relê o checkpoint em streaming (na ordem em que os perfis foram
+concluídos), então a memória usada não cresce com o tamanho do lote.
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import threading
+import time
+import warnings
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Iterator, List, Set, Tuple
+
+import pandas as pd
+
+from config import AI_TEMPLATE_SECTIONS, load_config
+from cohort import calcular_perfis_lote, validar_perfis_lote
+from coordenador_ia import configurar_limitador
+from exportacao import exportar_lote_stream
+from llm_cache import get_llm_cache
+from resposta_ia import TITULOS_SECOES, renderizar_secao
+from utils import criar_plano_treino, get_ai_model, obter_recomendacoes_ia, processar_resposta_ia
+
+CAMPOS_LISTA = ['restricoes', 'atividades']
+VALORES_PADRAO = {
+    'restricoes': [],
+    'atividades': [],
+    'preferencias_alimentares': '',
+    'limitacoes': '',
+    'duracao_plano': 30
+}
+
+def carregar_perfis(caminho: str) -> List[Dict]:
+    """Lê os perfis de um arquivo JSONL ou CSV e completa os campos opcionais."""
+    if caminho.endswith('.csv'):
+        df = pd.read_csv(caminho, keep_default_na=False)
+        perfis = df.to_dict(orient='records')
+        for perfil in perfis:
+            for campo in CAMPOS_LISTA:
+                valor = perfil.get(campo)
+                if isinstance(valor, str):
+                    perfil[campo] = [v.strip() for v in valor.split(';') if v.strip()]
+    else:
+        with open(caminho, 'r', encoding='utf-8') as arquivo:
+            perfis = [json.loads(linha) for linha in arquivo if linha.strip()]
+
+    for i, perfil in enumerate(perfis):
+        for campo, padrao in VALORES_PADRAO.items():
+            if perfil.get(campo) in (None, ''):
+                perfil[campo] = list(padrao) if isinstance(padrao, list) else padrao
+        perfil['id'] = str(perfil.get('id') or i)
+        perfil['duracao_plano'] = int(perfil['duracao_plano'])
+    return perfis
+
+def ler_checkpoint(caminho: str) -> Iterator[Dict]:
+    """Percorre os resultados concluídos do checkpoint, um por id, sem carregá-los todos."""
+    if not os.path.exists(caminho):
+        return
+    vistos: Set[str] = set()
+    with open(caminho, 'r', encoding='utf-8') as arquivo:
+        for linha in arquivo:
+            try:
+                registro = json.loads(linha)
+            except json.JSONDecodeError:
+                continue  # linha truncada por uma interrupção
+            if registro.get('status') == 'ok' and registro['id'] not in vistos:
+                vistos.add(registro['id'])
+                yield registro
+
+def carregar_checkpoint(caminho: str) -> Set[str]:
+    """Retorna os ids dos perfis já concluídos."""
+    return {registro['id'] for registro in ler_checkpoint(caminho)}
+
+def _nome_arquivo(perfil: Dict) -> str:
+    slug = re.sub(r'[^a-z0-9]+', '_', str(perfil.get('nome', '')).lower()).strip('_')
+    return f"{perfil['id']}_{slug or 'perfil'}.md"
+
+def gerar_markdown(registro: Dict) -> str:
+    """Monta o relatório Markdown de uma pessoa (métricas, plano de treino e recomendações)."""
+    linhas = [
+        f"# Plano Personalizado - {registro['nome']}",
+        '',
+        f"- Calorias diárias: {int(registro['calorias'])} kcal",
+        f"- Proteínas: {int(registro['proteinas_g'])}g | Carboidratos: {int(registro['carboidratos_g'])}g"
+        f" | Gorduras: {int(registro['gorduras_g'])}g",
+        f"- Duração do plano: {registro['duracao_plano']} dias",
+        '',
+        '## Plano de Treino',
+        '',
+        '| Data | Dia | Exercício | Intensidade | Duração (min) | Peso projetado (kg) |',
+        '|---|---|---|---|---|---|'
+    ]
+    for dia in registro['plano']:
+        linhas.append(
+            f"| {dia['data']} | {dia['dia_semana']} | {dia['exercicio']} | {dia['intensidade']}"
+            f" | {dia['duracao']} | {dia['peso_projetado']} |"
+        )
+    linhas += ['', '## Recomendações da IA', '', registro['recomendacoes']]
+    return '\n'.join(linhas) + '\n'
+
+def calcular_metricas_validas(perfis: List[Dict]) -> Tuple[pd.DataFrame, Dict[int, str]]:
+    """TMB, calorias e macros dos perfis válidos em uma passada vetorizada.
+
+    Retorna os perfis válidos com as colunas calculadas (índice = posição em `perfis`)
+    e o erro de cada perfil inválido, por posição, para que só ele seja descartado.
+    """
+    df = pd.DataFrame(perfis, index=range(len(perfis)))
+    erros = validar_perfis_lote(df).dropna()
+    validos = df.drop(index=erros.index)
+    calculado = calcular_perfis_lote(validos) if len(validos) else validos
+    return calculado, {int(posicao): erro for posicao, erro in erros.items()}
+
+def _secoes_markdown(recomendacoes: str) -> Dict[str, str]:
+    """Markdown de cada seção da resposta da IA (vazio quando a seção não foi encontrada)."""
+    secoes = processar_resposta_ia(recomendacoes)
+    return {
+        secao: renderizar_secao(secoes, secao) if secoes.get(secao) else ''
+        for secao in TITULOS_SECOES
+    }
+
+def processar_perfil(
+    perfil: Dict,
+    metricas: Dict,
+    ai_model,
+    cache,
+    modelos: bool = AI_TEMPLATE_SECTIONS
+) -> Dict:
+    """Gera o plano e as recomendações de um perfil.
+
+    As novas tentativas ficam a cargo da camada de resiliência do modelo (get_ai_model),
+    que reserva a cota do limitador a cada requisição; um erro que sobra vira `status: erro`.
+    Erros ao montar o plano (ex.: dados inválidos no perfil) não são repetidos: o perfil é
+    registrado como `status: erro` e o lote continua.
+    """
+    inicio = time.perf_counter()
+    try:
+        plano = criar_plano_treino(
+            perfil['atividades'],
+            perfil['duracao_plano'],
+            perfil['objetivo'],
+            perfil['limitacoes'],
+            perfil['peso']
+        )
+    except Exception as e:
+        return {'id': perfil['id'], 'nome': perfil.get('nome'), 'status': 'erro', 'erro': f"Erro ao criar o plano: {e}"}
+
+    uso: Dict = {}
+    try:
+        # A cota de RPM/TPM é controlada pelo limitador do processo (coordenador_ia);
+        # respostas já em cache não a consomem
+        recomendacoes = obter_recomendacoes_ia(ai_model, perfil, cache, uso=uso, modelos=modelos)
+    except Exception as e:
+        return {'id': perfil['id'], 'nome': perfil.get('nome'), 'status': 'erro', 'erro': str(e)}
+
+    return {
+        'id': perfil['id'],
+        'nome': perfil['nome'],
+        'status': 'ok',
+        'duracao_plano': perfil['duracao_plano'],
+        **metricas,
+        'plano': plano,
+        'recomendacoes': recomendacoes,
+        # Seções já separadas, para que a exportação não precise reler o texto
+        **{f'secao_{secao}': texto for secao, texto in _secoes_markdown(recomendacoes).items()},
+        'tokens_entrada': uso.get('tokens_entrada', 0),
+        'tokens_saida': uso.get('tokens_saida', 0),
+        'tempo_s': round(time.perf_counter() - inicio, 3)
+    }
+
+def _esquemas_exportacao() -> Dict:
+    """Colunas de perfis.parquet e planos.parquet (os registros de processar_perfil e os dias do plano)."""
+    import pyarrow as pa
+    texto, inteiro, real = pa.string(), pa.int64(), pa.float64()
+    return {
+        'perfis': pa.schema(
+            [('id', texto), ('nome', texto), ('status', texto), ('duracao_plano', inteiro)]
+            + [(c, real) for c in ['tmb', 'calorias', 'proteinas_g', 'carboidratos_g', 'gorduras_g']]
+            + [('recomendacoes', texto)] + [(f'secao_{secao}', texto) for secao in TITULOS_SECOES]
+            + [('tokens_entrada', inteiro), ('tokens_saida', inteiro), ('tempo_s', real)]
+        ),
+        'planos': pa.schema([
+            ('id', texto), ('data', texto), ('dia_semana', texto), ('exercicio', texto),
+            ('intensidade', texto), ('duracao', inteiro), ('peso_projetado', real)
+        ])
+    }
+
+def exportar_resultados(caminho_checkpoint: str, pasta_saida: str) -> int:
+    """Grava os resultados do checkpoint em Parquet (perfis e planos) e um Markdown por pessoa."""
+    pasta_markdown = os.path.join(pasta_saida, 'markdown')
+    os.makedirs(pasta_markdown, exist_ok=True)
+
+    def gravar_markdown(registro: Dict) -> None:
+        with open(os.path.join(pasta_markdown, _nome_arquivo(registro)), 'w', encoding='utf-8') as arquivo:
+            arquivo.write(gerar_markdown(registro))
+
+    return exportar_lote_stream(
+        ler_checkpoint(caminho_checkpoint), pasta_saida, ao_exportar=gravar_markdown, esquemas=_esquemas_exportacao()
+    )
+
+def exportar_cardapios(perfis: List[Dict], pasta_saida: str, tamanho_lote: int = 500) -> int:
+    """Grava cardapios.parquet com o cardápio local de cada perfil para toda a duração do plano.
+
+    Não depende da IA nem do checkpoint: é recalculado para todos os perfis (cardapio.gerar_cardapios_lote),
+    em lotes de `tamanho_lote` perfis gravados como row groups. Retorna o número de linhas gravadas.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    from cardapio import gerar_cardapios_lote
+
+    escritor = None
+    linhas = 0
+    try:
+        for inicio in range(0, len(perfis), tamanho_lote):
+            lote, erros = calcular_metricas_validas(perfis[inicio:inicio + tamanho_lote])
+            for posicao, erro in erros.items():
+                warnings.warn(f"Perfil {perfis[inicio + posicao].get('id')} sem cardápio: {erro}")
+            if not len(lote):
+                continue
+            lote = lote.reset_index(drop=True)
+            duracoes = lote['duracao_plano'].to_numpy()
+            cardapios = gerar_cardapios_lote(lote, dias=int(duracoes.max()))
+            cardapios = cardapios[cardapios['dia'].to_numpy() <= duracoes[cardapios['usuario'].to_numpy()]]
+            tabela = pa.Table.from_pandas(cardapios.drop(columns='usuario'), preserve_index=False)
+            if escritor is None:
+                escritor = pq.ParquetWriter(os.path.join(pasta_saida, 'cardapios.parquet'), tabela.schema)
+            escritor.write_table(tabela.cast(escritor.schema))
+            linhas += len(cardapios)
+    finally:
+        if escritor is not None:
+            escritor.close()
+    return linhas
+
+def executar_lote(
+    caminho_entrada: str,
+    pasta_saida: str,
+    concorrencia: int = 4,
+    rpm: float = 60,
+    tentativas: int = 3,
+    usar_cache: bool = True,
+    cardapios: bool = True
+) -> Dict:
+    """Processa todos os perfis pendentes e exporta os resultados. Retorna um resumo."""
+    os.makedirs(pasta_saida, exist_ok=True)
+    caminho_checkpoint = os.path.join(pasta_saida, 'checkpoint.jsonl')
+
+    perfis = carregar_perfis(caminho_entrada)
+    concluidos = carregar_checkpoint(caminho_checkpoint)
+    pendentes = [p for p in perfis if p['id'] not in concluidos]
+
+    config = load_config()
+    # --tentativas define as tentativas da camada de resiliência (um único laço de novas tentativas)
+    config['AI_RESILIENCE'] = {**(config.get('AI_RESILIENCE') or {}), 'tentativas': tentativas}
+    ai_model = get_ai_model(config['GOOGLE_API_KEY'], config)
+    cache = get_llm_cache(config) if usar_cache else None
+    configurar_limitador(config, rpm=rpm)
+    modelos = config.get('AI_TEMPLATE_SECTIONS', AI_TEMPLATE_SECTIONS)
+
+    # TMB, calorias e macros de todos os pendentes válidos em uma única passada vetorizada;
+    # perfis inválidos (ex.: nível de atividade desconhecido) viram `status: erro` sem parar o lote
+    calculado, invalidos = calcular_metricas_validas(pendentes)
+    colunas = ['tmb', 'calorias', 'proteinas_g', 'carboidratos_g', 'gorduras_g']
+    metricas = dict(zip(calculado.index, calculado[colunas].to_dict(orient='records'))) if len(calculado) else {}
+
+    lock_checkpoint = threading.Lock()
+    erros: Set[str] = set()
+    with open(caminho_checkpoint, 'a', encoding='utf-8') as checkpoint, \
+            ThreadPoolExecutor(max_workers=concorrencia) as executor:
+        for posicao, erro in invalidos.items():
+            perfil = pendentes[posicao]
+            registro = {'id': perfil['id'], 'nome': perfil.get('nome'), 'status': 'erro', 'erro': erro}
+            checkpoint.write(json.dumps(registro, ensure_ascii=False) + '\n')
+            erros.add(perfil['id'])
+            print(f"{perfil['id']}: erro ({erro})", file=sys.stderr)
+        checkpoint.flush()
+        futuros = {
+            executor.submit(processar_perfil, pendentes[posicao], m, ai_model, cache, modelos): pendentes[posicao]
+            for posicao, m in metricas.items()
+        }
+        for n, futuro in enumerate(as_completed(futuros), 1):
+            try:
+                registro = futuro.result()
+            except Exception as e:
+                # Um perfil com problema não interrompe o lote
+                perfil = futuros[futuro]
+                registro = {'id': perfil['id'], 'nome': perfil.get('nome'), 'status': 'erro', 'erro': str(e)}
+            with lock_checkpoint:
+                checkpoint.write(json.dumps(registro, ensure_ascii=False) + '\n')
+                checkpoint.flush()
+            if registro['status'] != 'ok':
+                erros.add(registro['id'])
+            print(f"[{n}/{len(futuros)}] {registro['id']}: {registro['status']}", file=sys.stderr)
+
+    exportados = exportar_resultados(caminho_checkpoint, pasta_saida)
+    resumo = {'total': len(perfis), 'concluidos': exportados, 'erros': sorted(erros)}
+    if cardapios:
+        # O cardápio é um extra local: uma falha nele não descarta o resumo do lote
+        try:
+            exportar_cardapios(perfis, pasta_saida)
+        except Exception as e:
+            print(f"Erro ao exportar os cardápios: {e}", file=sys.stderr)
+            resumo['erro_cardapios'] = str(e)
+    return resumo
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description='Gera planos Fit-IA em lote a partir de JSONL/CSV.')
+    parser.add_argument('entrada', help='Arquivo de perfis (.jsonl ou .csv)')
+    parser.add_argument('--saida', default='resultados', help='Pasta de saída (padrão: resultados)')
+    parser.add_argument('--concorrencia', type=int, default=4, help='Chamadas simultâneas ao modelo')
+    parser.add_argument('--rpm', type=float, default=60, help='Limite de requisições por minuto (0 = sem limite)')
+    parser.add_argument('--tentativas', type=int, default=3, help='Tentativas por perfil antes de registrar erro')
+    parser.add_argument('--sem-cache', action='store_true', help='Ignora o cache de respostas da IA')
+    parser.add_argument('--sem-cardapio', action='store_true', help='Não gera cardapios.parquet')
+    args = parser.parse_args(argv)
+
+    resumo = executar_lote(
+        args.entrada, args.saida, args.concorrencia, args.rpm, args.tentativas, not args.sem_cache,
+        not args.sem_cardapio
+    )
+    print(json.dumps(resumo, ensure_ascii=False))
+    return 1 if resumo['erros'] else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,348 @@
+"""Teste de carga: várias sessões simultâneas do app em uma única instância.
+
+Uso (a partir da raiz do projeto):
+    python -m benchmarks.carga                                      # 20 sessões, 5 simultâneas
+    python -m benchmarks.carga --usuarios 50 --sessoes 200 --latencia-ia lognormal:2,0.5
+    python -m benchmarks.carga --comparar benchmarks/results/<anterior>_carga.json
+
+Cada sessão é um AppTest (sessão headless do Streamlit no mesmo processo, com os
+mesmos singletons do app): abre a página, envia o formulário e espera as
+recomendações ficarem prontas, prepara uma exportação, registra uma pesagem e
+envia feedback. A IA é o FakeChatModel com a latência sorteada pela distribuição
+de --latencia-ia; o cache da IA e o limite de requisições ficam desligados e o
+histórico vai para uma pasta temporária, para medir o app e não o provedor. Não
+inclui a rede nem o websocket do navegador. Relata vazão, p50/p95/p99 por
+operação, threads e RSS do processo.
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from benchmarks.run import PASTA_RESULTADOS, _commit_atual
+
+OPERACOES = ['abrir', 'enviar', 'exportar', 'pesagem', 'feedback']
+
+SCRIPT = """
+import app
+app.main()
+"""
+
+# Parâmetros de cada distribuição de --latencia-ia (segundos)
+DISTRIBUICOES = {
+    'fixa': 1,         # fixa:valor
+    'uniforme': 2,     # uniforme:min,max
+    'normal': 2,       # normal:media,desvio
+    'lognormal': 2,    # lognormal:mediana,sigma
+    'exponencial': 1   # exponencial:media
+}
+
+def distribuicao_latencia(especificacao: str, seed: int = 42) -> Callable[[], float]:
+    """Converte uma especificação como 'lognormal:2,0.5' em uma função que sorteia latências (s)."""
+    nome, _, parametros = especificacao.partition(':')
+    try:
+        valores = [float(v) for v in parametros.split(',') if v.strip()]
+    except ValueError:
+        raise ValueError(f"Erro: parâmetros inválidos na latência '{especificacao}'")
+    if nome not in DISTRIBUICOES or len(valores) != DISTRIBUICOES[nome]:
+        raise ValueError(
+            f"Erro: latência '{especificacao}' inválida; use {', '.join(DISTRIBUICOES)} "
+            "(ex.: fixa:1, uniforme:0.5,2, lognormal:2,0.5)"
+        )
+    rng = random.Random(seed)
+    lock = threading.Lock()
+    sorteios = {
+        'fixa': lambda: valores[0],
+        'uniforme': lambda: rng.uniform(valores[0], valores[1]),
+        'normal': lambda: rng.gauss(valores[0], valores[1]),
+        'lognormal': lambda: rng.lognormvariate(math.log(valores[0]), valores[1]),
+        'exponencial': lambda: rng.expovariate(1 / valores[0])
+    }
+
+    def sortear() -> float:
+        with lock:
+            return sorteios[nome]()
+    return sortear
+
+def _rss_mb() -> Optional[float]:
+    """Memória residente atual do processo (MB); usa o pico se /proc não estiver disponível.
+
+    None quando nenhum dos dois existe (ex.: Windows, sem o módulo `resource`).
+    """
+    try:
+        with open('/proc/self/statm', 'r') as arquivo:
+            return round(int(arquivo.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1024 ** 2, 1)
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+class Monitor:
+    """Amostra threads ativas e RSS do processo em segundo plano durante a carga."""
+
+    def __init__(self, intervalo: float = 0.25):
+        self.intervalo = intervalo
+        self.threads: List[int] = []
+        self.rss_mb: List[float] = []
+        self._parar = threading.Event()
+        self._thread = threading.Thread(target=self._amostrar, name='fitia-carga-monitor', daemon=True)
+
+    def _amostrar(self) -> None:
+        while not self._parar.is_set():
+            self.threads.append(threading.active_count())
+            rss = _rss_mb()
+            if rss is not None:
+                self.rss_mb.append(rss)
+            self._parar.wait(self.intervalo)
+
+    def __enter__(self) -> 'Monitor':
+        self._thread.start()
+        return self
+
+    def __exit__(self, *_) -> None:
+        self._parar.set()
+        self._thread.join()
+
+def permitir_sessoes_concorrentes() -> None:
+    """Permite AppTests em várias threads do mesmo processo.
+
+    O AppTest foi feito para uma sessão por vez: cada execução instala um Runtime
+    falso global, apaga-o ao terminar e sobrescreve config.get_option durante o
+    script, então uma sessão concorrente perderia o Runtime no meio da execução.
+    Aqui o último Runtime instalado continua valendo para todas as sessões e a opção
+    global.appTest fica fixa enquanto o teste de carga roda.
+    """
+    from contextlib import nullcontext
+    from streamlit import config as st_config
+    from streamlit.runtime import Runtime
+    from streamlit.testing.v1 import app_test
+
+    ultimo: Dict = {'runtime': None}
+
+    def instancia(cls):
+        if cls._instance is not None:
+            ultimo['runtime'] = cls._instance
+        if ultimo['runtime'] is None:
+            raise RuntimeError("Runtime hasn't been created!")
+        return ultimo['runtime']
+
+    Runtime.instance = classmethod(instancia)
+    Runtime.exists = classmethod(lambda cls: cls._instance is not None or ultimo['runtime'] is not None)
+    get_option = st_config.get_option
+    st_config.get_option = lambda chave: True if chave == 'global.appTest' else get_option(chave)
+    app_test.patch_config_options = lambda _: nullcontext()
+
+def simular_sessao(indice: int, timeout: float) -> Dict[str, float]:
+    """Percorre o app como um usuário; retorna a duração (s) de cada operação."""
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_string(SCRIPT, default_timeout=timeout)
+    tempos: Dict[str, float] = {}
+
+    def etapa(nome: str, acao: Callable[[], object]) -> None:
+        inicio = time.perf_counter()
+        acao()
+        tempos[nome] = time.perf_counter() - inicio
+        erros = [str(e.value) for e in at.exception] + [str(e.value) for e in at.error]
+        if erros:
+            raise Exception(f"Erro na etapa {nome}: {erros[0][:120]}")
+
+    etapa('abrir', at.run)
+    # Perfis diferentes por sessão, para que cada envio gere um plano novo
+    at.text_input[0].input(f'Usuario Carga {indice}')
+    at.number_input[0].set_value(18 + indice % 60)
+    atividades = at.multiselect[1]
+    atividades.select(atividades.options[indice % len(atividades.options)])
+    etapa('enviar', lambda: at.button[0].click().run())
+    if not isinstance(at.session_state['resultado_plano']['recomendacoes'], str):
+        raise Exception("Erro na etapa enviar: recomendações não concluídas dentro do timeout")
+
+    etapa('exportar', lambda: [b for b in at.button if 'Preparar' in b.label][0].click().run())
+    at.number_input(key='pesagem_peso').set_value(at.number_input(key='pesagem_peso').value - 0.5)
+    etapa('pesagem', lambda: [b for b in at.button if 'Registrar e' in b.label][0].click().run())
+    at.text_area[-1].input('Teste de carga')
+    etapa('feedback', lambda: at.button[-1].click().run())
+    return tempos
+
+def _quantil(amostras: List[float], q: float) -> float:
+    """Quantil por posição (nearest rank) de amostras já ordenadas."""
+    return amostras[min(len(amostras) - 1, max(0, math.ceil(q * len(amostras)) - 1))]
+
+def _estatisticas(amostras: List[float]) -> Dict:
+    amostras = sorted(amostras)
+    if not amostras:
+        return {'n': 0}
+    return {
+        'n': len(amostras),
+        'media_ms': round(sum(amostras) / len(amostras) * 1000, 2),
+        'p50_ms': round(_quantil(amostras, 0.50) * 1000, 2),
+        'p95_ms': round(_quantil(amostras, 0.95) * 1000, 2),
+        'p99_ms': round(_quantil(amostras, 0.99) * 1000, 2),
+        'max_ms': round(amostras[-1] * 1000, 2)
+    }
+
+def preparar_app(modelo, pasta: str) -> None:
+    """Faz o app usar o modelo falso, sem cache da IA nem limite de requisições, e o histórico em `pasta`."""
+    import app
+    from config import load_config
+    from resiliencia_ia import ModeloResiliente
+
+    config = {
+        **load_config(),
+        'LLM_CACHE': {'enabled': False},
+        'AI_RATE_LIMIT': {'rpm': 0, 'tpm': 0},
+        'STORE': {'path': os.path.join(pasta, 'fitia.sqlite')}
+    }
+    # O modelo falso passa pela mesma camada de resiliência (prazos, tentativas, disjuntor) do real
+    resiliente = ModeloResiliente(modelo, config.get('AI_RESILIENCE'))
+    app.load_config = lambda: dict(config)
+    app.get_ai_model = lambda api_key, config=None: resiliente
+
+def executar_carga(usuarios: int, sessoes: int, timeout: float) -> Dict:
+    """Roda `sessoes` sessões com até `usuarios` simultâneas; retorna durações, falhas e recursos."""
+    duracoes: Dict[str, List[float]] = {nome: [] for nome in OPERACOES + ['sessao']}
+    falhas: Counter = Counter()
+    rss_inicio = _rss_mb()
+    with Monitor() as monitor:
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=usuarios, thread_name_prefix='fitia-carga') as executor:
+            futuros = {executor.submit(simular_sessao, i, timeout): time.perf_counter() for i in range(sessoes)}
+            for futuro in as_completed(futuros):
+                try:
+                    tempos = futuro.result()
+                except Exception as e:
+                    falhas[str(e)[:160]] += 1
+                    continue
+                for nome, segundos in tempos.items():
+                    duracoes[nome].append(segundos)
+                duracoes['sessao'].append(sum(tempos.values()))
+        total = time.perf_counter() - inicio
+    concluidas = len(duracoes['sessao'])
+    return {
+        'duracao_s': round(total, 3),
+        'sessoes_ok': concluidas,
+        'falhas': dict(falhas),
+        'vazao_sessoes_s': round(concluidas / total, 3),
+        'vazao_operacoes_s': round(sum(len(duracoes[n]) for n in OPERACOES) / total, 3),
+        'operacoes': {nome: _estatisticas(amostras) for nome, amostras in duracoes.items()},
+        'threads': {'max': max(monitor.threads, default=0),
+                    'media': round(sum(monitor.threads) / max(len(monitor.threads), 1), 1)},
+        'rss_mb': {'inicio': rss_inicio, 'max': max(monitor.rss_mb, default=rss_inicio), 'fim': _rss_mb()}
+    }
+
+def comparar(atual: Dict, anterior: Dict, limite: float) -> List[str]:
+    """Imprime p95 e vazão contra uma execução anterior; retorna o que regrediu além do limite."""
+    regressoes = []
+    diferentes = [c for c in ['usuarios', 'sessoes', 'latencia_ia', 'tokens_por_segundo'] if atual[c] != anterior.get(c)]
+    if diferentes:
+        print(f"Aviso: execuções com parâmetros diferentes ({', '.join(diferentes)})", file=sys.stderr)
+    print(f"\n{'medida':30} {'anterior':>12} {'atual':>12} {'razão':>8}")
+    medidas = [(f'{nome} p95_ms', anterior['operacoes'].get(nome, {}).get('p95_ms'), e.get('p95_ms'), False)
+               for nome, e in atual['operacoes'].items()]
+    medidas.append(('vazao_sessoes_s', anterior.get('vazao_sessoes_s'), atual['vazao_sessoes_s'], True))
+    medidas.append(('rss_mb max', anterior.get('rss_mb', {}).get('max'), atual['rss_mb']['max'], False))
+    for nome, antes, depois, maior_melhor in medidas:
+        if not antes or depois is None:
+            continue
+        razao = depois / antes
+        regrediu = razao < 1 / limite if maior_melhor else razao > limite
+        print(f"{nome:30} {antes:12.2f} {depois:12.2f} {razao:8.2f}{' <-- regressão' if regrediu else ''}")
+        if regrediu:
+            regressoes.append(nome)
+    return regressoes
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description='Teste de carga com sessões headless do app (AppTest).')
+    parser.add_argument('--usuarios', type=int, default=5, help='Sessões simultâneas')
+    parser.add_argument('--sessoes', type=int, default=20, help='Total de sessões simuladas')
+    parser.add_argument('--latencia-ia', default='lognormal:1,0.5',
+                        help=f"Latência até o primeiro token do modelo falso: {', '.join(DISTRIBUICOES)} "
+                             "(padrão: lognormal:1,0.5 = mediana 1 s)")
+    parser.add_argument('--tokens-por-segundo', type=float, default=None,
+                        help='Velocidade de geração simulada do modelo falso (padrão: instantânea)')
+    parser.add_argument('--timeout', type=float, default=120.0, help='Tempo máximo de cada operação (s)')
+    parser.add_argument('--seed', type=int, default=42, help='Semente do sorteio das latências')
+    parser.add_argument('--saida', help='Arquivo JSON de saída (padrão: benchmarks/results/<data>_<commit>_carga.json)')
+    parser.add_argument('--comparar', help='JSON de uma execução anterior para comparação')
+    parser.add_argument('--limite', type=float, default=1.25,
+                        help='Razão atual/anterior acima da qual uma medida é considerada regressão')
+    args = parser.parse_args(argv)
+
+    try:
+        sortear = distribuicao_latencia(args.latencia_ia, args.seed)
+    except ValueError as e:
+        parser.error(str(e))
+
+    from fake_llm import FakeChatModel
+    from metricas import resumo
+
+    modelo = FakeChatModel(tokens_por_segundo=args.tokens_por_segundo, tokens_resposta=800,
+                           sortear_latencia=sortear)
+    permitir_sessoes_concorrentes()
+    with tempfile.TemporaryDirectory(prefix='fitia-carga-') as pasta:
+        preparar_app(modelo, pasta)
+        resultado = executar_carga(args.usuarios, args.sessoes, args.timeout)
+        from armazenamento import get_armazenamento
+        get_armazenamento({'STORE': {'path': os.path.join(pasta, 'fitia.sqlite')}}).flush()
+
+    print(f"{resultado['sessoes_ok']}/{args.sessoes} sessões em {resultado['duracao_s']:.1f} s "
+          f"({args.usuarios} simultâneas): {resultado['vazao_sessoes_s']:.2f} sessões/s, "
+          f"{resultado['vazao_operacoes_s']:.2f} operações/s", file=sys.stderr)
+    for nome, e in resultado['operacoes'].items():
+        if e['n']:
+            print(f"  {nome:10} p50 {e['p50_ms']:9.1f}  p95 {e['p95_ms']:9.1f}  p99 {e['p99_ms']:9.1f} ms",
+                  file=sys.stderr)
+    rss = resultado['rss_mb']
+    print(f"  threads máx. {resultado['threads']['max']} | RSS "
+          + (f"{rss['inicio']:.0f} -> {rss['max']:.0f} MB (pico)" if rss['max'] is not None else 'indisponível'),
+          file=sys.stderr)
+    for falha, quantidade in resultado['falhas'].items():
+        print(f"  falha ({quantidade}x): {falha}", file=sys.stderr)
+
+    commit = _commit_atual()
+    execucao = {
+        'commit': commit,
+        'data': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'cpus': os.cpu_count(),
+        'usuarios': args.usuarios,
+        'sessoes': args.sessoes,
+        'latencia_ia': args.latencia_ia,
+        'tokens_por_segundo': args.tokens_por_segundo,
+        'chamadas_ia': modelo.chamadas,
+        **resultado,
+        # Etapas medidas pelo próprio app (metricas.medir) durante a carga
+        'etapas_app': resumo()['etapas']
+    }
+    saida = args.saida or os.path.join(
+        PASTA_RESULTADOS, f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{commit}_carga.json")
+    os.makedirs(os.path.dirname(saida) or '.', exist_ok=True)
+    with open(saida, 'w', encoding='utf-8') as arquivo:
+        json.dump(execucao, arquivo, indent=2, ensure_ascii=False)
+    print(f"Resultados salvos em {saida}", file=sys.stderr)
+
+    falhou = bool(resultado['falhas'])
+    if args.comparar:
+        with open(args.comparar, 'r', encoding='utf-8') as arquivo:
+            regressoes = comparar(execucao, json.load(arquivo), args.limite)
+        if regressoes:
+            print(f"\nRegressões: {', '.join(regressoes)}", file=sys.stderr)
+            falhou = True
+    return 1 if falhou else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
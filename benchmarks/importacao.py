@@ -0,0 +1,106 @@
+"""Tempo de importação do app (partida a frio) com orçamento.
+
+Uso (a partir da raiz do projeto):
+    python -m benchmarks.importacao                     # mede `import app` e confere o orçamento
+    python -m benchmarks.importacao --orcamento-ms 900 --modulo app
+
+Cada amostra roda `python -X importtime -c "import <modulo>"` em um processo
+novo. O resultado usa a mediana do tempo acumulado do módulo; a execução falha
+(código 1) se passar do orçamento ou se algum módulo de PROIBIDOS_NA_PARTIDA
+for importado na partida.
+"""
+import argparse
+import json
+import os
+import platform
+import re
+import statistics
+import subprocess
+import sys
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+from benchmarks.run import PASTA_RESULTADOS, _commit_atual
+
+ORCAMENTO_MS = 1000.0
+
+# Dependências que só devem ser carregadas depois do primeiro envio do formulário
+PROIBIDOS_NA_PARTIDA = ['pandas', 'numpy', 'langchain_google_genai', 'plano', 'graficos', 'exportacao', 'cardapio']
+
+_LINHA_IMPORTTIME = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+
+def medir_importacao(modulo: str) -> Tuple[float, Dict[str, float]]:
+    """Importa `modulo` em um processo novo; retorna o total (ms) e o acumulado (ms) de cada módulo."""
+    processo = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {modulo}'],
+        capture_output=True, text=True, cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    )
+    if processo.returncode != 0:
+        raise Exception(f"Erro ao importar {modulo}: {processo.stderr.strip().splitlines()[-1:]}")
+    acumulados = {}
+    for linha in processo.stderr.splitlines():
+        encontrado = _LINHA_IMPORTTIME.match(linha)
+        if encontrado:
+            acumulados[encontrado.group(4)] = int(encontrado.group(2)) / 1000
+    return acumulados.get(modulo, 0.0), acumulados
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description='Mede o tempo de importação do app (-X importtime).')
+    parser.add_argument('--modulo', default='app', help='Módulo importado (padrão: app)')
+    parser.add_argument('--repeticoes', type=int, default=5, help='Processos medidos')
+    parser.add_argument('--orcamento-ms', type=float, default=ORCAMENTO_MS,
+                        help=f'Tempo máximo (mediana) de importação em ms (padrão: {ORCAMENTO_MS:.0f})')
+    parser.add_argument('--top', type=int, default=10, help='Quantos módulos mais lentos listar')
+    parser.add_argument('--saida', help='Arquivo JSON de saída (padrão: benchmarks/results/<data>_<commit>_importacao.json)')
+    args = parser.parse_args(argv)
+
+    totais, ultimo = [], {}
+    for _ in range(args.repeticoes):
+        total, ultimo = medir_importacao(args.modulo)
+        totais.append(total)
+    mediana = statistics.median(totais)
+
+    # Módulos de primeiro nível mais caros (acumulado), da última amostra
+    raizes: Dict[str, float] = {}
+    for nome, acumulado in ultimo.items():
+        raiz = nome.split('.')[0]
+        raizes[raiz] = max(raizes.get(raiz, 0.0), acumulado)
+    mais_lentos = sorted(raizes.items(), key=lambda item: item[1], reverse=True)[:args.top]
+    proibidos = [m for m in PROIBIDOS_NA_PARTIDA if m in ultimo]
+
+    print(f"import {args.modulo}: mediana {mediana:.1f} ms (min {min(totais):.1f}, max {max(totais):.1f})"
+          f" | orçamento {args.orcamento_ms:.0f} ms", file=sys.stderr)
+    for nome, acumulado in mais_lentos:
+        print(f"  {nome:40} {acumulado:10.1f} ms", file=sys.stderr)
+
+    commit = _commit_atual()
+    execucao = {
+        'commit': commit,
+        'data': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'modulo': args.modulo,
+        'amostras_ms': totais,
+        'mediana_ms': mediana,
+        'orcamento_ms': args.orcamento_ms,
+        'mais_lentos_ms': dict(mais_lentos),
+        'proibidos_importados': proibidos
+    }
+    saida = args.saida or os.path.join(
+        PASTA_RESULTADOS, f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{commit}_importacao.json")
+    os.makedirs(os.path.dirname(saida) or '.', exist_ok=True)
+    with open(saida, 'w', encoding='utf-8') as arquivo:
+        json.dump(execucao, arquivo, indent=2, ensure_ascii=False)
+    print(f"Resultados salvos em {saida}", file=sys.stderr)
+
+    falhou = False
+    if proibidos:
+        print(f"Importados na partida (deveriam ser tardios): {', '.join(proibidos)}", file=sys.stderr)
+        falhou = True
+    if mediana > args.orcamento_ms:
+        print(f"Orçamento de importação excedido: {mediana:.1f} ms > {args.orcamento_ms:.0f} ms", file=sys.stderr)
+        falhou = True
+    return 1 if falhou else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
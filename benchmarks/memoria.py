@@ -0,0 +1,118 @@
+"""Memória do plano guardado em cada sessão (bytes por sessão), antes e depois do PlanoCompacto.
+
+Uso (a partir da raiz do projeto):
+    python -m benchmarks.memoria                       # durações 30, 90 e 365 dias
+    python -m benchmarks.memoria --duracoes 30 730 --sessoes 100
+
+Para cada representação, monta o estado de `--sessoes` sessões e mede com
+tracemalloc os bytes que continuam alocados enquanto elas existem:
+  - lista_dataframe_figuras: lista de dicts + DataFrame de texto + figuras por sessão
+  - dataframe_figuras: DataFrame tipado + figuras por sessão
+  - compacto: PlanoCompacto (as figuras ficam só no cache de graficos, limitado a
+    CHART_CACHE_MAX_ENTRIES conjuntos para o processo inteiro)
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import tracemalloc
+from datetime import datetime
+from typing import Callable, Dict, List
+
+import pandas as pd
+
+from benchmarks.run import PASTA_RESULTADOS, PERFIL, _commit_atual
+from config import CHART_CACHE_MAX_ENTRIES, GOALS
+from graficos import construir_graficos_plano
+from plano import PlanoCompacto, criar_plano_treino_df
+from utils import criar_plano_treino
+
+def _plano_df(duracao: int) -> pd.DataFrame:
+    return criar_plano_treino_df(
+        PERFIL['atividades'], duracao, PERFIL['objetivo'], PERFIL['limitacoes'], PERFIL['peso']
+    )
+
+def _figuras(plano_df: pd.DataFrame) -> tuple:
+    return construir_graficos_plano(plano_df, GOALS[PERFIL['objetivo']])
+
+def _lista_dataframe_figuras(duracao: int) -> Dict:
+    plano = criar_plano_treino(
+        PERFIL['atividades'], duracao, PERFIL['objetivo'], PERFIL['limitacoes'], PERFIL['peso']
+    )
+    plano_df = pd.DataFrame(plano)
+    return {'plano_treino': plano, 'df': plano_df, 'figuras': _figuras(_plano_df(duracao))}
+
+def _dataframe_figuras(duracao: int) -> Dict:
+    plano_df = _plano_df(duracao)
+    return {'plano_treino': plano_df, 'figuras': _figuras(plano_df)}
+
+def _compacto(duracao: int) -> Dict:
+    return {'plano_treino': PlanoCompacto.de_dataframe(_plano_df(duracao))}
+
+REPRESENTACOES: Dict[str, Callable[[int], Dict]] = {
+    'lista_dataframe_figuras': _lista_dataframe_figuras,
+    'dataframe_figuras': _dataframe_figuras,
+    'compacto': _compacto
+}
+
+def bytes_por_sessao(montar: Callable[[int], Dict], duracao: int, sessoes: int) -> float:
+    """Bytes retidos por sessão ao manter `sessoes` estados montados por `montar`."""
+    montar(duracao)  # aquece imports e caches de tipos fora da medição
+    gc.collect()
+    tracemalloc.start()
+    try:
+        base = tracemalloc.get_traced_memory()[0]
+        estados = [montar(duracao) for _ in range(sessoes)]
+        gc.collect()
+        retido = tracemalloc.get_traced_memory()[0] - base
+    finally:
+        tracemalloc.stop()
+    del estados
+    return retido / sessoes
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description='Mede os bytes do plano guardados por sessão.')
+    parser.add_argument('--duracoes', type=int, nargs='+', default=[30, 90, 365], help='Durações do plano (dias)')
+    parser.add_argument('--sessoes', type=int, default=50, help='Sessões simuladas por medição')
+    parser.add_argument('--saida', help='Arquivo JSON de saída (padrão: benchmarks/results/<data>_<commit>_memoria.json)')
+    args = parser.parse_args(argv)
+
+    resultados: Dict[str, Dict[str, float]] = {}
+    for duracao in args.duracoes:
+        resultados[str(duracao)] = {
+            nome: bytes_por_sessao(montar, duracao, args.sessoes) for nome, montar in REPRESENTACOES.items()
+        }
+        antes = resultados[str(duracao)]['lista_dataframe_figuras']
+        print(f"{duracao} dias:", file=sys.stderr)
+        for nome, valor in resultados[str(duracao)].items():
+            print(f"  {nome:26} {valor / 1024:10.1f} KB/sessão ({valor / antes:6.1%})", file=sys.stderr)
+
+    # Teto das figuras no modelo compacto: o cache do processo, independente do número de sessões
+    figuras_maior = bytes_por_sessao(lambda d: {'figuras': _figuras(_plano_df(d))}, max(args.duracoes), args.sessoes)
+    teto_cache = figuras_maior * CHART_CACHE_MAX_ENTRIES
+    print(f"Cache de gráficos (compartilhado): até {teto_cache / 1024 ** 2:.1f} MB "
+          f"({CHART_CACHE_MAX_ENTRIES} conjuntos de {max(args.duracoes)} dias)", file=sys.stderr)
+
+    commit = _commit_atual()
+    execucao = {
+        'commit': commit,
+        'data': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'pandas': pd.__version__,
+        'sessoes': args.sessoes,
+        'bytes_por_sessao': resultados,
+        'teto_cache_graficos_bytes': teto_cache
+    }
+    saida = args.saida or os.path.join(
+        PASTA_RESULTADOS, f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{commit}_memoria.json")
+    os.makedirs(os.path.dirname(saida) or '.', exist_ok=True)
+    with open(saida, 'w', encoding='utf-8') as arquivo:
+        json.dump(execucao, arquivo, indent=2, ensure_ascii=False)
+    print(f"Resultados salvos em {saida}", file=sys.stderr)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,209 @@
+"""Micro-benchmarks do pipeline de geração de planos.
+
+Uso (a partir da raiz do projeto):
+    python -m benchmarks.run                      # roda e salva em benchmarks/results/
+    python -m benchmarks.run --filtro plano       # só benchmarks cujo nome contém "plano"
+    python -m benchmarks.run --comparar benchmarks/results/<anterior>.json
+
+Nenhum benchmark usa rede: a IA é substituída pelo FakeChatModel, cuja
+latência pode ser simulada com --latencia-ia e --tokens-por-segundo.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+from typing import Callable, Dict, List
+
+import pandas as pd
+
+from cardapio import gerar_cardapios_lote
+from config import GOALS
+from fake_llm import FakeChatModel
+from graficos import construir_graficos_plano, gerar_graficos_plano
+from plano import criar_plano_treino_df, criar_planos_lote
+from utils import (
+    calcular_calorias_diarias, calcular_tmb, criar_plano_treino,
+    gerar_prompt_ia, iniciar_recomendacoes_ia, obter_recomendacoes_ia, stream_recomendacoes_ia
+)
+
+PASTA_RESULTADOS = os.path.join(os.path.dirname(__file__), 'results')
+DURACOES = [7, 30, 90, 365, 730]
+
+PERFIL = {
+    'nome': 'Benchmark', 'idade': 30, 'sexo': 'Masculino 👨', 'altura': 175, 'peso': 80.0,
+    'nivel_atividade': 'Moderadamente ativo 🏃', 'objetivo': 'Emagrecimento 📉',
+    'restricoes': ['Sem Lactose 🥛'], 'atividades': ['Corrida 🏃‍♀️', 'Musculação 🏋️‍♀️'],
+    'preferencias_alimentares': 'Frango e legumes', 'limitacoes': 'Nenhuma', 'duracao_plano': 30
+}
+
+def medir(funcao: Callable, repeticoes: int, min_tempo: float = 0.2) -> Dict:
+    """Executa `funcao` em lotes e retorna estatísticas (ms por chamada)."""
+    funcao()  # aquecimento
+    # Calibra o número de chamadas por amostra para amostras de ~min_tempo/repeticoes
+    laco = 1
+    while True:
+        inicio = time.perf_counter()
+        for _ in range(laco):
+            funcao()
+        decorrido = time.perf_counter() - inicio
+        if decorrido >= min_tempo / repeticoes or laco >= 1_000_000:
+            break
+        laco *= 10
+
+    amostras = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        for _ in range(laco):
+            funcao()
+        amostras.append((time.perf_counter() - inicio) * 1000 / laco)
+    amostras.sort()
+    return {
+        'repeticoes': repeticoes,
+        'chamadas_por_amostra': laco,
+        'media_ms': statistics.fmean(amostras),
+        'mediana_ms': statistics.median(amostras),
+        'p95_ms': amostras[min(len(amostras) - 1, int(len(amostras) * 0.95))],
+        'min_ms': amostras[0]
+    }
+
+def pipeline_submit(modelo: FakeChatModel, dias: int) -> None:
+    """Reproduz o submit do app.main: IA em segundo plano, cálculos locais e gráficos."""
+    perfil = {**PERFIL, 'duracao_plano': dias}
+    futuro = iniciar_recomendacoes_ia(modelo, perfil)
+    tmb = calcular_tmb(perfil['peso'], perfil['altura'], perfil['idade'], perfil['sexo'])
+    calcular_calorias_diarias(tmb, perfil['nivel_atividade'], perfil['objetivo'])
+    plano = criar_plano_treino(perfil['atividades'], dias, perfil['objetivo'], '', perfil['peso'])
+    df_plano = pd.DataFrame(plano)
+    gerar_graficos_plano(df_plano, perfil['peso'], perfil['objetivo'], GOALS[perfil['objetivo']])
+    df_plano.to_csv(index=False)
+    futuro.result()
+
+def registrar_benchmarks(latencia_ia: float = 0.0, tokens_por_segundo: float = None) -> Dict[str, Callable]:
+    """Monta o dicionário nome -> função sem argumentos a ser medida."""
+    benchmarks: Dict[str, Callable] = {
+        'calcular_tmb': lambda: calcular_tmb(80.0, 175, 30, 'Masculino 👨'),
+        'calcular_calorias_diarias': lambda: calcular_calorias_diarias(
+            1800.0, 'Moderadamente ativo 🏃', 'Emagrecimento 📉'),
+        'gerar_prompt_ia': lambda: gerar_prompt_ia(PERFIL),
+    }
+
+    for dias in DURACOES:
+        plano = criar_plano_treino(PERFIL['atividades'], dias, PERFIL['objetivo'], '', PERFIL['peso'])
+        df_plano = pd.DataFrame(plano)
+        benchmarks[f'criar_plano_treino[{dias}]'] = (
+            lambda dias=dias: criar_plano_treino(PERFIL['atividades'], dias, PERFIL['objetivo'], '', PERFIL['peso'])
+        )
+        benchmarks[f'criar_plano_treino_df[{dias}]'] = (
+            lambda dias=dias: criar_plano_treino_df(PERFIL['atividades'], dias, PERFIL['objetivo'], '', PERFIL['peso'])
+        )
+        # Construção do DataFrame e do CSV feita em exibir_plano
+        benchmarks[f'exibir_plano_dataframe_csv[{dias}]'] = (
+            lambda plano=plano: pd.DataFrame(plano).to_csv(index=False)
+        )
+        benchmarks[f'gerar_graficos_plano[{dias}]'] = (
+            lambda df=df_plano: gerar_graficos_plano(df, PERFIL['peso'], PERFIL['objetivo'], GOALS[PERFIL['objetivo']])
+        )
+        # Sem o cache de figuras: custo de construção a cada plano novo
+        benchmarks[f'gerar_graficos_plano_sem_cache[{dias}]'] = (
+            lambda df=df_plano: construir_graficos_plano(df, GOALS[PERFIL['objetivo']])
+        )
+        # Inclui a serialização feita pelo Streamlit ao enviar as figuras ao navegador
+        benchmarks[f'gerar_graficos_plano_json[{dias}]'] = (
+            lambda df=df_plano: [f.to_json() for f in gerar_graficos_plano(
+                df, PERFIL['peso'], PERFIL['objetivo'], GOALS[PERFIL['objetivo']])]
+        )
+
+        # Cardápio local do plano inteiro, sem o cache de cardápios (as soluções por refeição já em cache)
+        benchmarks[f'gerar_cardapio_sem_cache[{dias}]'] = (
+            lambda dias=dias: gerar_cardapios_lote(pd.DataFrame([{**PERFIL, 'calorias': 2300.0}]), dias=dias)
+        )
+
+    modelo = FakeChatModel(latencia_ia, tokens_por_segundo, tokens_resposta=800)
+    # Cardápios de 30 dias para 1000 usuários com calorias diferentes
+    perfis_cardapio = pd.DataFrame([{**PERFIL, 'calorias': 1500.0 + i} for i in range(1000)])
+    benchmarks['gerar_cardapios_lote[1000x30]'] = lambda: gerar_cardapios_lote(perfis_cardapio, dias=30)
+    # Coorte de 1000 usuários com planos de 365 dias
+    coorte = pd.DataFrame([{**PERFIL, 'duracao_plano': 365}] * 1000)
+    benchmarks['criar_planos_lote[1000x365]'] = lambda: criar_planos_lote(coorte, seed=1)
+
+    benchmarks['obter_recomendacoes_ia[fake]'] = lambda: obter_recomendacoes_ia(modelo, PERFIL)
+    benchmarks['stream_recomendacoes_ia[fake]'] = lambda: ''.join(stream_recomendacoes_ia(modelo, PERFIL))
+    benchmarks['pipeline_submit[30]'] = lambda: pipeline_submit(modelo, 30)
+    return benchmarks
+
+def _commit_atual() -> str:
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except Exception:
+        return 'desconhecido'
+
+def comparar(atual: Dict, anterior: Dict, limite: float) -> List[str]:
+    """Imprime a variação de cada benchmark e retorna os que regrediram além do limite."""
+    regressoes = []
+    print(f"\n{'benchmark':45} {'anterior':>12} {'atual':>12} {'razão':>8}")
+    for nome, resultado in atual['resultados'].items():
+        if nome not in anterior['resultados']:
+            continue
+        antes = anterior['resultados'][nome]['mediana_ms']
+        depois = resultado['mediana_ms']
+        razao = depois / antes if antes else float('inf')
+        marca = ' <-- regressão' if razao > limite else ''
+        print(f"{nome:45} {antes:12.4f} {depois:12.4f} {razao:8.2f}{marca}")
+        if razao > limite:
+            regressoes.append(nome)
+    return regressoes
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description='Micro-benchmarks do pipeline do Fit-IA.')
+    parser.add_argument('--filtro', default='', help='Roda apenas benchmarks cujo nome contém este texto')
+    parser.add_argument('--repeticoes', type=int, default=15, help='Amostras por benchmark')
+    parser.add_argument('--saida', help='Arquivo JSON de saída (padrão: benchmarks/results/<data>_<commit>.json)')
+    parser.add_argument('--latencia-ia', type=float, default=0.0,
+                        help='Latência simulada até o primeiro token do modelo falso (s)')
+    parser.add_argument('--tokens-por-segundo', type=float, default=None,
+                        help='Velocidade de geração simulada do modelo falso (padrão: instantânea)')
+    parser.add_argument('--comparar', help='JSON de uma execução anterior para comparação')
+    parser.add_argument('--limite', type=float, default=1.25,
+                        help='Razão atual/anterior acima da qual um benchmark é considerado regressão')
+    args = parser.parse_args(argv)
+
+    resultados = {}
+    for nome, funcao in registrar_benchmarks(args.latencia_ia, args.tokens_por_segundo).items():
+        if args.filtro in nome:
+            resultados[nome] = medir(funcao, args.repeticoes)
+            print(f"{nome:45} {resultados[nome]['mediana_ms']:12.4f} ms", file=sys.stderr)
+
+    commit = _commit_atual()
+    execucao = {
+        'commit': commit,
+        'data': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'latencia_ia': args.latencia_ia,
+        'tokens_por_segundo': args.tokens_por_segundo,
+        'resultados': resultados
+    }
+    saida = args.saida or os.path.join(
+        PASTA_RESULTADOS, f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{commit}.json")
+    os.makedirs(os.path.dirname(saida) or '.', exist_ok=True)
+    with open(saida, 'w', encoding='utf-8') as arquivo:
+        json.dump(execucao, arquivo, indent=2, ensure_ascii=False)
+    print(f"Resultados salvos em {saida}", file=sys.stderr)
+
+    if args.comparar:
+        with open(args.comparar, 'r', encoding='utf-8') as arquivo:
+            regressoes = comparar(execucao, json.load(arquivo), args.limite)
+        if regressoes:
+            print(f"\nRegressões: {', '.join(regressoes)}", file=sys.stderr)
+            return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,324 @@
+"""Cardápio calculado localmente a partir de uma tabela de composição de alimentos.
+
+Cada refeição leva um alimento de cada um dos seus grupos (ex.: almoço = proteína,
+carboidrato, leguminosa, vegetal e azeite). As porções de todas as combinações
+possíveis são resolvidas de uma vez, com mínimos quadrados regularizados
+vetorizados em NumPy, para chegar à fração da refeição nas calorias e nos macros
+do dia (GOALS); as combinações de menor erro se alternam ao longo do plano.
+
+As metas são proporcionais às calorias, então a solução de cada refeição é
+calculada uma única vez por objetivo (para 1 kcal/dia, com a tabela inteira) e
+apenas filtrada pelas restrições, escalada e limitada às porções de cada perfil:
+o modo em lote resolve milhares de perfis com as mesmas operações de um só.
+
+Os alimentos vêm de dados/alimentos_taco.csv (valores por 100 g baseados na TACO;
+a coluna `fonte` indica os que vieram de outras referências) e são filtrados
+pelas restrições do formulário (DIETARY_RESTRICTIONS).
+"""
+import itertools
+import os
+import warnings
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from config import DIETARY_RESTRICTIONS, GOALS, MEAL_PLAN_ROUNDING_G, MEAL_PLAN_VARIETY
+from modelos_secoes import nome_opcao
+
+CAMINHO_ALIMENTOS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'dados', 'alimentos_taco.csv')
+
+NUTRIENTES = ['kcal', 'proteina_g', 'carboidrato_g', 'gordura_g']
+
+# Refeições do dia: fração diária de cada nutriente (kcal, proteínas, carboidratos, gorduras) e
+# grupos de alimentos (o primeiro é o que varia entre os dias). A proteína se concentra no almoço
+# e no jantar, já que pães, frutas e lanches não chegam aos percentuais de proteína dos objetivos
+REFEICOES: List[Tuple[str, Tuple[float, float, float, float], List[str]]] = [
+    ('Café da manhã', (0.25, 0.15, 0.30, 0.30), ['cafe_proteina', 'cafe_carboidrato', 'fruta']),
+    ('Almoço', (0.35, 0.43, 0.31, 0.33), ['proteina', 'carboidrato', 'leguminosa', 'vegetal', 'gordura']),
+    ('Lanche', (0.10, 0.05, 0.14, 0.12), ['lanche', 'fruta']),
+    ('Jantar', (0.30, 0.37, 0.25, 0.25), ['proteina', 'carboidrato', 'vegetal', 'gordura'])
+]
+
+# Marcadores da tabela de alimentos excluídos por restrição
+EXCLUSOES_POR_RESTRICAO = {
+    'Nenhuma': [],
+    'Vegetariano': ['carne', 'peixe', 'frutos_do_mar'],
+    'Vegano': ['carne', 'peixe', 'frutos_do_mar', 'ovo', 'leite'],
+    'Sem Glúten': ['gluten'],
+    'Sem Lactose': ['leite'],
+    'Baixo Carboidrato': ['alto_carboidrato'],
+    'Alergia a Nozes': ['nozes'],
+    'Alergia a Frutos do Mar': ['frutos_do_mar']
+}
+
+# Baixo carboidrato: alimentos acima deste teor (g por 100 g) ficam de fora e a meta de
+# carboidratos fica limitada a este percentual das calorias (o restante vai para as gorduras)
+LIMITE_ALTO_CARBOIDRATO_G = 20
+CARBOIDRATO_MAX_PERCENTUAL_BAIXO = 25
+
+# Peso de cada nutriente (kcal, proteínas, carboidratos, gorduras) no erro relativo da refeição
+PESOS_NUTRIENTES = np.array([1.0, 1.0, 1.0, 1.0])
+
+# Opções de uma refeição que entram na rotação: erro até esta diferença do erro da melhor
+TOLERANCIA_ERRO = 0.15
+
+# Peso do desvio das porções em relação à porção típica (torna o sistema determinado)
+REGULARIZACAO = 0.005
+
+# Perfis resolvidos por vez no modo em lote (limita a memória dos arrays perfis x combinações)
+PERFIS_POR_BLOCO = 128
+
+# Calorias diárias para as quais valem as faixas de porções da tabela; para outras calorias as
+# faixas são escaladas na mesma proporção, limitada a ESCALA_PORCOES
+CALORIAS_REFERENCIA = 2000
+ESCALA_PORCOES = (0.75, 1.5)
+
+# Tabela indexada pelas opções exatas do formulário: uma opção sem exclusões definidas falha já na importação
+_EXCLUSOES = {o: set(EXCLUSOES_POR_RESTRICAO[nome_opcao(o)]) for o in DIETARY_RESTRICTIONS}
+_OPCAO_POR_NOME = {nome_opcao(o).lower(): o for o in DIETARY_RESTRICTIONS}
+
+@lru_cache(maxsize=1)
+def carregar_alimentos(caminho: str = CAMINHO_ALIMENTOS) -> pd.DataFrame:
+    """Tabela de alimentos (nutrientes por 100 g, faixa de porções, grupos e marcadores)."""
+    try:
+        alimentos = pd.read_csv(caminho, keep_default_na=False)
+    except Exception as e:
+        raise Exception(f"Erro ao carregar a tabela de alimentos: {e}")
+    alimentos['grupos'] = alimentos['grupos'].str.split(';')
+    alimentos['marcadores'] = [
+        set(filter(None, marcadores.split(';'))) | ({'alto_carboidrato'} if carboidrato > LIMITE_ALTO_CARBOIDRATO_G else set())
+        for marcadores, carboidrato in zip(alimentos['marcadores'], alimentos['carboidrato_g'])
+    ]
+    return alimentos
+
+def _chave_restricoes(restricoes: Optional[Iterable[str]]) -> Tuple[str, ...]:
+    """Restrições como opções do formulário; aceita os nomes sem emoji (ex.: 'Vegano')."""
+    normalizadas = set()
+    for restricao in restricoes or []:
+        opcao = restricao if restricao in _EXCLUSOES else _OPCAO_POR_NOME.get(nome_opcao(str(restricao)).strip().lower())
+        if opcao is None:
+            raise ValueError(f"Restrição alimentar desconhecida: {restricao}")
+        normalizadas.add(opcao)
+    return tuple(sorted(normalizadas))
+
+def _percentuais(objetivo: str, restricoes: Tuple[str, ...]) -> Dict[str, float]:
+    """Percentuais de proteínas, carboidratos e gorduras do objetivo, ajustados para baixo carboidrato."""
+    macros = dict(GOALS[objetivo])
+    if any('alto_carboidrato' in _EXCLUSOES[r] for r in restricoes):
+        excedente = max(macros['carbs'] - CARBOIDRATO_MAX_PERCENTUAL_BAIXO, 0)
+        macros['carbs'] -= excedente
+        macros['fats'] += excedente
+    return macros
+
+def metas_diarias(calorias: float, objetivo: str, restricoes: Optional[Iterable[str]] = None) -> Dict[str, float]:
+    """Calorias e gramas de proteínas, carboidratos e gorduras que o cardápio busca por dia."""
+    return dict(zip(NUTRIENTES, calorias * _metas_unitarias(objetivo, _chave_restricoes(restricoes))))
+
+def _metas_unitarias(objetivo: str, restricoes: Tuple[str, ...]) -> np.ndarray:
+    """Metas [kcal, proteína, carboidrato, gordura] por kcal diária."""
+    macros = _percentuais(objetivo, restricoes)
+    return np.array([1.0, macros['protein'] / 400, macros['carbs'] / 400, macros['fats'] / 900])
+
+@lru_cache(maxsize=128)
+def _resolver(metas: Tuple[float, ...], fracoes: Tuple[float, ...], grupos: Tuple[str, ...]) -> Dict[str, np.ndarray]:
+    """Porções de todas as combinações de alimentos dos grupos (um de cada) para 1 kcal/dia.
+
+    Minimiza, para cada combinação, o erro relativo em calorias e macros mais o desvio
+    relativo de cada porção em relação à porção típica: (AᵀWA + λD) y = AᵀW v + λD y0,
+    resolvido para todas as combinações em uma única chamada a np.linalg.solve. Usa a
+    tabela inteira; as restrições só escolhem quais combinações valem (_solucao_refeicao).
+    """
+    alimentos = carregar_alimentos()
+    opcoes = [np.flatnonzero(alimentos['grupos'].map(lambda g, grupo=grupo: grupo in g).to_numpy()) for grupo in grupos]
+    combinacoes = np.array(list(itertools.product(*opcoes)), dtype=np.intp)
+    # Um mesmo alimento em dois grupos da refeição não forma uma combinação
+    combinacoes = combinacoes[np.array([len(set(c)) == len(c) for c in combinacoes])]
+
+    por_grama = alimentos[NUTRIENTES].to_numpy(dtype=float) / 100
+    minimo = alimentos['porcao_min_g'].to_numpy(dtype=float)[combinacoes]
+    maximo = alimentos['porcao_max_g'].to_numpy(dtype=float)[combinacoes]
+    A = por_grama[combinacoes].transpose(0, 2, 1)                   # (combinações, nutrientes, alimentos)
+    alvo = np.array(fracoes) * np.array(metas)
+    pesos = PESOS_NUTRIENTES / alvo ** 2                             # erro relativo de cada nutriente
+    tipica = (minimo + maximo) / 2 / CALORIAS_REFERENCIA            # (combinações, alimentos)
+    regularizacao = REGULARIZACAO / tipica ** 2
+
+    M = np.einsum('cnk,n,cnl->ckl', A, pesos, A)
+    indices = np.arange(combinacoes.shape[1])
+    M[:, indices, indices] += regularizacao
+    rhs = np.einsum('cnk,n,n->ck', A, pesos, alvo) + regularizacao * tipica
+    porcoes = np.linalg.solve(M, rhs[..., None])[..., 0]
+    return {
+        'combinacoes': combinacoes, 'porcoes': porcoes, 'minimo': minimo, 'maximo': maximo,
+        'nutrientes': por_grama[combinacoes], 'alvo': alvo
+    }
+
+@lru_cache(maxsize=256)
+def _permitidos(restricoes: Tuple[str, ...]) -> Tuple[np.ndarray, Tuple[Tuple[str, ...], ...]]:
+    """Máscara dos alimentos permitidos e, por refeição, os grupos que ainda têm algum alimento."""
+    alimentos = carregar_alimentos()
+    excluidos = set().union(*(_EXCLUSOES[r] for r in restricoes))
+    permitidos = np.array([not (marcadores & excluidos) for marcadores in alimentos['marcadores']])
+    disponiveis = set().union(*(g for permitido, g in zip(permitidos, alimentos['grupos']) if permitido))
+    # Grupos sem alimento permitido saem da refeição (ex.: lanche para vegano com alergia a nozes)
+    return permitidos, tuple(tuple(g for g in grupos if g in disponiveis) for _, _, grupos in REFEICOES)
+
+def _solucao_refeicao(objetivo: str, restricoes: Tuple[str, ...], refeicao: int) -> Optional[Dict[str, np.ndarray]]:
+    """Solução da refeição só com as combinações de alimentos permitidos (None se não houver alimentos)."""
+    permitidos, grupos = _permitidos(restricoes)
+    if not grupos[refeicao]:
+        return None
+    metas = tuple(_metas_unitarias(objetivo, restricoes))
+    solucao = _resolver(metas, REFEICOES[refeicao][1], grupos[refeicao])
+    validas = permitidos[solucao['combinacoes']].all(axis=1)
+    if not validas.any():
+        return None
+    return {chave: valor if chave == 'alvo' else valor[validas] for chave, valor in solucao.items()}
+
+def _escolher(solucao: Dict[str, np.ndarray], calorias: np.ndarray, variedade: int,
+              arredondamento: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Gramas de cada combinação por perfil e as combinações escolhidas (uma por alimento principal).
+
+    Retorna (gramas, escolhidas, quantidade) com formas (perfis, combinações, alimentos),
+    (perfis, variedade) e (perfis,): as escolhidas estão em ordem crescente de erro e só
+    as `quantidade` primeiras de cada perfil ficam a até TOLERANCIA_ERRO da melhor.
+    """
+    escala = np.clip(calorias / CALORIAS_REFERENCIA, *ESCALA_PORCOES)[:, None, None]
+    gramas = np.clip(calorias[:, None, None] * solucao['porcoes'][None],
+                     escala * solucao['minimo'], escala * solucao['maximo'])
+    if arredondamento:
+        gramas = np.round(gramas / arredondamento) * arredondamento
+    totais = np.einsum('pck,ckn->pcn', gramas, solucao['nutrientes'], optimize=True)
+    alvo = calorias[:, None] * solucao['alvo']
+    erros = (np.abs(totais - alvo[:, None]) / alvo[:, None]).sum(axis=2)
+    # Melhor combinação de cada alimento principal, para variar o prato ao longo dos dias. As
+    # combinações vêm de itertools.product com o grupo principal primeiro, então as de um mesmo
+    # alimento principal são contíguas: cada trecho vira uma linha de `trechos` (completada com
+    # o índice de uma coluna de erro infinito)
+    principais = solucao['combinacoes'][:, 0]
+    inicios = np.flatnonzero(np.r_[True, principais[1:] != principais[:-1]])
+    tamanhos = np.diff(np.r_[inicios, len(principais)])
+    trechos = np.full((len(inicios), tamanhos.max()), len(principais))
+    trechos[np.arange(tamanhos.max()) < tamanhos[:, None]] = np.arange(len(principais))
+    erros_completos = np.concatenate([erros, np.full((len(erros), 1), np.inf)], axis=1)
+    melhores = trechos[np.arange(len(inicios)), erros_completos[:, trechos].argmin(axis=2)]      # (perfis, principais)
+    ordem = np.argsort(np.take_along_axis(erros, melhores, axis=1), axis=1)[:, :variedade]
+    escolhidas = np.take_along_axis(melhores, ordem, axis=1)
+    erros_escolhidas = np.take_along_axis(erros, escolhidas, axis=1)
+    quantidade = (erros_escolhidas <= erros_escolhidas[:, :1] + TOLERANCIA_ERRO).sum(axis=1)
+    return gramas, escolhidas, quantidade
+
+def _itens(calorias: np.ndarray, objetivo: str, restricoes: Tuple[str, ...], dias: int,
+           variedade: int, arredondamento: float) -> Dict[str, np.ndarray]:
+    """Colunas do cardápio (uma posição por alimento) de `dias` dias para perfis de mesmo objetivo e restrições."""
+    colunas: Dict[str, List[np.ndarray]] = {nome: [] for nome in ('usuario', 'dia', 'refeicao', 'ordem', 'alimento', 'gramas')}
+    perfis = np.arange(len(calorias))[:, None]
+    for refeicao, (nome, _, _) in enumerate(REFEICOES):
+        solucao = _solucao_refeicao(objetivo, restricoes, refeicao)
+        if solucao is None:
+            continue
+        gramas, escolhidas, quantidade = _escolher(solucao, calorias, variedade, arredondamento)
+        # Almoço e jantar começam em pontos diferentes da rotação para não repetirem o prato no mesmo dia
+        deslocamento = np.maximum(quantidade[:, None] // 2, 1) if nome == 'Jantar' else 0
+        do_dia = escolhidas[perfis, (np.arange(dias)[None] + deslocamento) % quantidade[:, None]]   # (perfis, dias)
+        itens = gramas[perfis, do_dia]                                                             # (perfis, dias, alimentos)
+        forma = itens.shape
+        colunas['usuario'].append(np.broadcast_to(perfis[:, :, None], forma).ravel())
+        colunas['dia'].append(np.broadcast_to(np.arange(1, dias + 1)[None, :, None], forma).ravel())
+        colunas['refeicao'].append(np.full(itens.size, refeicao))
+        colunas['ordem'].append(np.broadcast_to(np.arange(forma[2]), forma).ravel())
+        colunas['alimento'].append(solucao['combinacoes'][do_dia].ravel())
+        colunas['gramas'].append(itens.ravel())
+    return {nome: np.concatenate(partes) if partes else np.empty(0, dtype=int) for nome, partes in colunas.items()}
+
+def _tabela(itens: Dict[str, np.ndarray]) -> pd.DataFrame:
+    """DataFrame do cardápio ordenado por usuário, dia, refeição e alimento, sem porções zeradas."""
+    alimentos = carregar_alimentos()
+    mantidos = itens['gramas'] > 0
+    ordem = np.lexsort([itens[c][mantidos] for c in ('ordem', 'refeicao', 'dia', 'usuario')])
+    itens = {nome: valores[mantidos][ordem] for nome, valores in itens.items()}
+    por_grama = alimentos[NUTRIENTES].to_numpy(dtype=float)[itens['alimento']] / 100
+    valores = np.round(por_grama * itens['gramas'][:, None], 1)
+    return pd.DataFrame({
+        'usuario': itens['usuario'],
+        'dia': itens['dia'].astype('int16'),
+        'refeicao': pd.Categorical.from_codes(itens['refeicao'], categories=[nome for nome, _, _ in REFEICOES], ordered=True),
+        'alimento': pd.Categorical.from_codes(itens['alimento'], categories=alimentos['alimento']),
+        'gramas': itens['gramas'],
+        **{nutriente: valores[:, i] for i, nutriente in enumerate(NUTRIENTES)}
+    })
+
+@lru_cache(maxsize=64)
+def _cardapio_em_cache(calorias: int, objetivo: str, restricoes: Tuple[str, ...], dias: int,
+                       variedade: int, arredondamento: float) -> pd.DataFrame:
+    itens = _itens(np.array([float(calorias)]), objetivo, restricoes, dias, variedade, arredondamento)
+    return _tabela(itens).drop(columns='usuario')
+
+def gerar_cardapio(
+    calorias: float,
+    objetivo: str,
+    restricoes: Optional[Iterable[str]] = None,
+    dias: int = 1,
+    variedade: int = MEAL_PLAN_VARIETY,
+    arredondamento_g: float = MEAL_PLAN_ROUNDING_G
+) -> pd.DataFrame:
+    """Cardápio do plano inteiro: uma linha por alimento de cada refeição de cada dia.
+
+    Colunas: dia (1..dias), refeicao, alimento, gramas e os NUTRIENTES da porção. Até
+    `variedade` boas opções de cada refeição se alternam entre os dias e as porções são
+    arredondadas para múltiplos de `arredondamento_g`. O resultado fica em cache (por
+    calorias arredondadas e opções) e é compartilhado: não o altere.
+    """
+    if dias < 1:
+        raise ValueError("Erro: o cardápio precisa de pelo menos 1 dia")
+    return _cardapio_em_cache(
+        int(round(calorias)), objetivo, _chave_restricoes(restricoes), int(dias), int(variedade), float(arredondamento_g)
+    )
+
+def _chave_restricoes_lote(restricoes: Optional[Iterable[str]]) -> Optional[Tuple[str, ...]]:
+    try:
+        return _chave_restricoes(restricoes)
+    except ValueError as e:
+        warnings.warn(f"{e}; perfil sem cardápio")
+        return None
+
+def gerar_cardapios_lote(
+    perfis: pd.DataFrame,
+    dias: int = 1,
+    variedade: int = MEAL_PLAN_VARIETY,
+    arredondamento_g: float = MEAL_PLAN_ROUNDING_G
+) -> pd.DataFrame:
+    """Cardápios de vários perfis (colunas calorias, objetivo e restricoes; ver cohort.calcular_perfis_lote).
+
+    Mesmo formato de gerar_cardapio, com a coluna `usuario` (posição do perfil em
+    `perfis`) e, se existir, a coluna `id` dos perfis. Os perfis são agrupados por
+    objetivo e restrições e cada grupo é resolvido com operações vetorizadas. Perfis com
+    restrições desconhecidas ficam sem cardápio (com um aviso), em vez de ignorar a restrição.
+    """
+    if dias < 1:
+        raise ValueError("Erro: o cardápio precisa de pelo menos 1 dia")
+    restricoes = [_chave_restricoes_lote(r) for r in perfis['restricoes']] if 'restricoes' in perfis else [()] * len(perfis)
+    grupos = pd.DataFrame({'objetivo': perfis['objetivo'].to_numpy(), 'restricoes': restricoes})
+    grupos = grupos[grupos['restricoes'].notna()]
+    calorias = perfis['calorias'].to_numpy(dtype=float)
+    partes = []
+    posicoes = grupos.index.to_numpy()
+    for (objetivo, chave), linhas in grupos.groupby(['objetivo', 'restricoes'], sort=False).indices.items():
+        linhas = posicoes[linhas]
+        for inicio in range(0, len(linhas), PERFIS_POR_BLOCO):
+            bloco = linhas[inicio:inicio + PERFIS_POR_BLOCO]
+            itens = _itens(calorias[bloco], objetivo, chave, dias, variedade, arredondamento_g)
+            itens['usuario'] = bloco[itens['usuario']]
+            partes.append(itens)
+    cardapios = _tabela({nome: np.concatenate([p[nome] for p in partes]) if partes else np.empty(0, dtype=int)
+                         for nome in ('usuario', 'dia', 'refeicao', 'ordem', 'alimento', 'gramas')})
+    if 'id' in perfis:
+        cardapios.insert(0, 'id', perfis['id'].to_numpy()[cardapios['usuario'].to_numpy()])
+    return cardapios
+
+def totais_por_dia(cardapio: pd.DataFrame) -> pd.DataFrame:
+    """Soma dos NUTRIENTES por dia (e por usuário, no formato do lote)."""
+    chaves = [c for c in ('id', 'usuario') if c in cardapio] + ['dia']
+    return cardapio.groupby(chaves, observed=True)[NUTRIENTES].sum().round(1).reset_index()
@@ -0,0 +1,120 @@
+import numpy as np
+import pandas as pd
+from typing import Union
+
+from config import ACTIVITY_LEVELS, GOALS, GOAL_CALORIE_ADJUSTMENTS
+from modelos_secoes import nome_opcao
+
+ArrayLike = Union[np.ndarray, pd.Series, list]
+
+# Tabelas de consulta pré-calculadas a partir do config (índice = código categórico)
+NIVEIS_ATIVIDADE = list(ACTIVITY_LEVELS.keys())
+OBJETIVOS = list(GOALS.keys())
+FATORES_ATIVIDADE = np.array([ACTIVITY_LEVELS[n] for n in NIVEIS_ATIVIDADE], dtype=np.float64)
+AJUSTES_OBJETIVO = np.array([GOAL_CALORIE_ADJUSTMENTS[o] for o in OBJETIVOS], dtype=np.float64)
+PERCENTUAIS_MACROS = np.array(
+    [[GOALS[o]['protein'], GOALS[o]['carbs'], GOALS[o]['fats']] for o in OBJETIVOS],
+    dtype=np.float64
+)
+CALORIAS_POR_GRAMA = np.array([4.0, 4.0, 9.0])
+
+def _codigos_ou_invalidos(valores: ArrayLike, categorias: list) -> np.ndarray:
+    """Índices dos rótulos nas tabelas de consulta (-1 para rótulos desconhecidos).
+
+    Rótulos sem o emoji (ex.: 'Sedentário') usam a opção correspondente do formulário.
+    """
+    valores = np.asarray(valores, dtype=object)
+    codigos = pd.Index(categorias).get_indexer(valores)
+    if (codigos < 0).any():
+        por_nome = {nome_opcao(c).lower(): i for i, c in enumerate(categorias)}
+        for i in np.flatnonzero(codigos < 0):
+            codigos[i] = por_nome.get(nome_opcao(str(valores[i])).strip().lower(), -1)
+    return codigos
+
+def _codigos(valores: ArrayLike, categorias: list, campo: str) -> np.ndarray:
+    """Converte rótulos do formulário em índices das tabelas de consulta."""
+    codigos = _codigos_ou_invalidos(valores, categorias)
+    if (codigos < 0).any():
+        invalidos = sorted(set(map(str, np.asarray(valores, dtype=object)[codigos < 0])))
+        raise ValueError(f"Valores inválidos para {campo}: {invalidos}")
+    return codigos
+
+def validar_perfis_lote(perfis: pd.DataFrame) -> pd.Series:
+    """Erro de cada perfil que calcular_perfis_lote rejeitaria (None para os válidos).
+
+    Permite separar os perfis inválidos de um lote sem perder a passada vetorizada dos demais.
+    """
+    erros = pd.Series([None] * len(perfis), index=perfis.index, dtype=object)
+    for campo in ['peso', 'altura', 'idade']:
+        if campo not in perfis.columns:
+            erros[erros.isna()] = f"Campo ausente: {campo}"
+            continue
+        invalidos = pd.to_numeric(perfis[campo], errors='coerce').isna().to_numpy() & erros.isna().to_numpy()
+        erros[invalidos] = [f"Valor inválido para {campo}: {v!r}" for v in perfis[campo][invalidos]]
+    for campo, categorias in [('nivel_atividade', NIVEIS_ATIVIDADE), ('objetivo', OBJETIVOS)]:
+        if campo not in perfis.columns:
+            erros[erros.isna()] = f"Campo ausente: {campo}"
+            continue
+        invalidos = (_codigos_ou_invalidos(perfis[campo], categorias) < 0) & erros.isna().to_numpy()
+        erros[invalidos] = [f"Valores inválidos para {campo}: [{str(v)!r}]" for v in perfis[campo][invalidos]]
+    if 'sexo' not in perfis.columns:
+        erros[erros.isna()] = "Campo ausente: sexo"
+    return erros
+
+def normalizar_sexo_lote(sexo: ArrayLike) -> np.ndarray:
+    """Versão vetorizada de utils.normalizar_sexo; retorna True para masculino."""
+    rotulos = pd.Series(np.asarray(sexo, dtype=object)).str.split(' ').str[0].str.strip()
+    return (rotulos == 'Masculino').to_numpy()
+
+def calcular_tmb_lote(peso: ArrayLike, altura: ArrayLike, idade: ArrayLike, sexo: ArrayLike) -> np.ndarray:
+    """Calcula a TMB (Harris-Benedict) para vários perfis de uma vez."""
+    peso = np.asarray(peso, dtype=np.float64)
+    altura = np.asarray(altura, dtype=np.float64)
+    idade = np.asarray(idade, dtype=np.float64)
+    masculino = normalizar_sexo_lote(sexo)
+    # Mesma ordem de operações da versão escalar para resultados idênticos
+    tmb_masculino = 88.36 + (13.4 * peso) + (4.8 * altura) - (5.7 * idade)
+    tmb_feminino = 447.6 + (9.2 * peso) + (3.1 * altura) - (4.3 * idade)
+    return np.where(masculino, tmb_masculino, tmb_feminino)
+
+def calcular_calorias_lote(tmb: ArrayLike, nivel_atividade: ArrayLike, objetivo: ArrayLike) -> np.ndarray:
+    """Calcula as calorias diárias para vários perfis de uma vez."""
+    fatores = FATORES_ATIVIDADE[_codigos(nivel_atividade, NIVEIS_ATIVIDADE, 'nivel_atividade')]
+    ajustes = AJUSTES_OBJETIVO[_codigos(objetivo, OBJETIVOS, 'objetivo')]
+    return np.asarray(tmb, dtype=np.float64) * fatores + ajustes
+
+def calcular_macros_lote(calorias: ArrayLike, objetivo: ArrayLike) -> np.ndarray:
+    """Retorna uma matriz (n, 3) com gramas de proteínas, carboidratos e gorduras."""
+    percentuais = PERCENTUAIS_MACROS[_codigos(objetivo, OBJETIVOS, 'objetivo')]
+    calorias = np.asarray(calorias, dtype=np.float64)[:, None]
+    return (calorias * percentuais / 100) / CALORIAS_POR_GRAMA
+
+def calcular_perfis_lote(perfis: pd.DataFrame) -> pd.DataFrame:
+    """Calcula TMB, calorias e macros (g) para um DataFrame de perfis.
+
+    O DataFrame deve conter as colunas do formulário: peso, altura, idade,
+    sexo, nivel_atividade e objetivo. As colunas calculadas são adicionadas
+    a uma cópia, preservando o índice original; nivel_atividade e objetivo
+    voltam como as opções do formulário.
+    """
+    colunas = ['peso', 'altura', 'idade', 'sexo', 'nivel_atividade', 'objetivo']
+    faltando = [c for c in colunas if c not in perfis.columns]
+    if faltando:
+        raise ValueError(f"Colunas ausentes no DataFrame de perfis: {faltando}")
+
+    # Rótulos sem emoji passam a ser as opções do formulário (ex.: chaves de GOALS)
+    niveis = np.asarray(NIVEIS_ATIVIDADE, dtype=object)[_codigos(perfis['nivel_atividade'], NIVEIS_ATIVIDADE, 'nivel_atividade')]
+    objetivos = np.asarray(OBJETIVOS, dtype=object)[_codigos(perfis['objetivo'], OBJETIVOS, 'objetivo')]
+    tmb = calcular_tmb_lote(perfis['peso'], perfis['altura'], perfis['idade'], perfis['sexo'])
+    calorias = calcular_calorias_lote(tmb, niveis, objetivos)
+    macros = calcular_macros_lote(calorias, objetivos)
+
+    resultado = perfis.copy()
+    resultado['nivel_atividade'] = niveis
+    resultado['objetivo'] = objetivos
+    resultado['tmb'] = tmb
+    resultado['calorias'] = calorias
+    resultado['proteinas_g'] = macros[:, 0]
+    resultado['carboidratos_g'] = macros[:, 1]
+    resultado['gorduras_g'] = macros[:, 2]
+    return resultado
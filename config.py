@@ -1,3 +1,5 @@
+import os
+import threading
 import yaml
 from typing import Dict, List
 
@@ -32,6 +34,14 @@ GOALS = {
     'Performance 🎯': {'protein': 30, 'carbs': 55, 'fats': 15}
 }
 
+# Ajuste calórico diário (kcal) aplicado sobre o gasto total para cada objetivo
+GOAL_CALORIE_ADJUSTMENTS = {
+    'Emagrecimento 📉': -500,
+    'Ganho de Massa 💪': 500,
+    'Manutenção ⚖️': 0,
+    'Performance 🎯': 300
+}
+
 DIETARY_RESTRICTIONS = [
     'Nenhuma 🍽️',
     'Vegetariano 🥗',
@@ -56,11 +66,140 @@ PHYSICAL_ACTIVITIES = [
     'Artes Marciais 🥋'
 ]
 
+# Exibe as recomendações da IA em streaming (pode ser sobrescrito pela chave AI_STREAMING do config.yaml)
+AI_STREAMING = True
+
+# Divide o prompt em uma sub-requisição paralela por seção (chave AI_PARALLEL_SECTIONS do config.yaml)
+AI_PARALLEL_SECTIONS = False
+
+# Pede a resposta da IA como JSON estruturado em vez de Markdown (chave AI_JSON_OUTPUT do config.yaml)
+AI_JSON_OUTPUT = False
+
+# Responde localmente as partes padrão das recomendações (modelos_secoes) e pede à IA só as
+# personalizadas (chave AI_TEMPLATE_SECTIONS do config.yaml)
+AI_TEMPLATE_SECTIONS = True
+
+# Orçamento de tokens de saída da IA: base por seção pedida (para planos de 30 dias ou mais;
+# planos curtos recebem proporcionalmente menos), limitado ao intervalo [minimo, maximo];
+# personalizado_<secao> são as bases das partes pedidas com AI_TEMPLATE_SECTIONS
+AI_OUTPUT_TOKENS = {
+    'nutricao': 600,
+    'treino': 350,
+    'recomendacoes': 350,
+    'metas': 250,
+    'personalizado_nutricao': 500,
+    'personalizado_treino': 150,
+    'minimo': 256,
+    'maximo': 2048
+}
+
+# Limite de chamadas ao modelo compartilhado por todas as sessões (chave AI_RATE_LIMIT do
+# config.yaml): requisições e tokens (entrada + saída reservada) por minuto; 0 desativa.
+# Requisições que esperarem mais que max_espera_segundos na fila falham com erro.
+AI_RATE_LIMIT = {
+    'rpm': 60,
+    'tpm': 120000,
+    'max_espera_segundos': 300
+}
+
+# Resiliência das chamadas ao modelo (chave AI_RESILIENCE do config.yaml): prazo total de cada
+# chamada e de cada tentativa (no streaming, entre chunks), tentativas com espera exponencial e
+# jitter, requisição duplicada (hedge) quando a resposta passa do percentil de latência recente, e
+# disjuntor que após falhas_para_abrir falhas seguidas recusa chamadas por aberto_segundos (as
+# sessões recebem na hora o plano local com as recomendações padrão)
+AI_RESILIENCE = {
+    'prazo_segundos': 120,
+    'timeout_tentativa_segundos': 45,
+    'tentativas': 3,
+    'espera_base_segundos': 0.5,
+    'espera_max_segundos': 8,
+    'hedge': False,
+    'hedge_percentil': 0.95,
+    'hedge_min_amostras': 20,
+    'falhas_para_abrir': 5,
+    'aberto_segundos': 30,
+    'max_chamadas_simultaneas': 64
+}
+
+# Cache persistente de respostas da IA (pode ser sobrescrito pela chave LLM_CACHE do config.yaml)
+LLM_CACHE_SETTINGS = {
+    'enabled': True,
+    'path': '.cache/llm_cache.sqlite',
+    'ttl_seconds': 7 * 24 * 3600,
+    'max_entries': 5000,
+    'faixa_idade': 5,              # idade agrupada em faixas de 5 anos
+    'arredondamento_peso': 1.0,    # peso arredondado para 1 kg
+    'arredondamento_altura': 1.0,  # altura arredondada para 1 cm
+    'versao': '3'                  # alterar invalida todas as entradas
+}
+
+# Histórico local de perfis, planos, respostas da IA e feedback (chave STORE do config.yaml);
+# as escritas são gravadas em segundo plano em lotes de até lote_max, a cada intervalo_segundos
+STORE_SETTINGS = {
+    'enabled': True,
+    'path': '.cache/fitia.sqlite',
+    'lote_max': 200,
+    'intervalo_segundos': 0.5
+}
+
+# Métricas de latência e contadores (chave METRICS do config.yaml): arquivos de exportação
+# periódica (Prometheus textfile e/ou log JSONL; None desativa) e painel de administração
+METRICS_SETTINGS = {
+    'prometheus_path': None,
+    'jsonl_path': None,
+    'intervalo_segundos': 60,
+    'admin_panel': False
+}
+
+# Fila de tarefas da IA (chave JOBS do config.yaml): threads que atendem as gerações, tempo
+# que tarefas concluídas ficam disponíveis para serem retomadas e intervalo de consulta das sessões
+JOB_SETTINGS = {
+    'workers': 16,
+    'ttl_segundos': 1800,
+    'intervalo_polling_segundos': 1.0
+}
+
+# Gráficos do plano: pontos máximos enviados ao navegador por série, a partir de
+# quantos dias usar WebGL (Scattergl) e quantos conjuntos de figuras manter em cache
+CHART_MAX_POINTS = 400
+CHART_WEBGL_MIN_POINTS = 365
+CHART_CACHE_MAX_ENTRIES = 256
+
+# Reprojeção do peso a partir das pesagens registradas (chave WEIGHT_TREND do config.yaml):
+# suavização exponencial dupla (Holt) com pesos alpha (nível) e beta (tendência); a
+# tendência ajustada é limitada a max_variacao_semanal kg por semana
+WEIGHT_TREND_SETTINGS = {
+    'alpha': 0.5,
+    'beta': 0.3,
+    'max_variacao_semanal': 1.0
+}
+
+# Cardápio calculado localmente (cardapio): quantas opções de cada refeição se alternam ao
+# longo do plano e arredondamento das porções (g)
+MEAL_PLAN_VARIETY = 7
+MEAL_PLAN_ROUNDING_G = 5
+
+# Arquivos de exportação (CSV, XLSX, Parquet, PDF...) mantidos em cache, por plano e formato
+EXPORT_CACHE_MAX_ENTRIES = 128
+
+# Caminho padrão do arquivo de configuração
+CONFIG_PATH = 'config.yaml'
+
+# Cache da configuração compartilhado pelo processo (invalidado pelo mtime do arquivo)
+_config_lock = threading.Lock()
+_config_cache: Dict = {'path': None, 'mtime': None, 'data': None}
+
 # Função para carregar configuração do YAML
-def load_config() -> Dict:
+def load_config(path: str = CONFIG_PATH) -> Dict:
     try:
-        with open('config.yaml', 'r') as config_file:
-            return yaml.safe_load(config_file)
+        mtime = os.stat(path).st_mtime_ns
+        with _config_lock:
+            if _config_cache['path'] != path or _config_cache['mtime'] != mtime:
+                with open(path, 'r') as config_file:
+                    _config_cache['data'] = yaml.safe_load(config_file)
+                _config_cache['path'] = path
+                _config_cache['mtime'] = mtime
+            return dict(_config_cache['data'])
     except Exception as e:
         raise Exception(f"Erro ao carregar a configuração: {e}")
 
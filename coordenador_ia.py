@@ -0,0 +1,198 @@
+"""Coordenação das chamadas ao modelo entre todas as sessões do processo.
+
+- `ChamadasUnicas` (single-flight): chamadas concorrentes com a mesma chave
+  (prompt e configuração de geração) compartilham uma única requisição.
+- `LimitadorTokens`: token bucket duplo (requisições e tokens por minuto) com
+  fila FIFO; quem espera pode acompanhar a própria posição na fila.
+"""
+import hashlib
+import json
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Callable, Dict, Optional
+
+from config import AI_RATE_LIMIT
+from metricas import incrementar, observar
+
+def chave_chamada(prompt: str, geracao: Optional[Dict] = None) -> str:
+    """Chave de deduplicação: prompt exato e parâmetros de geração."""
+    conteudo = json.dumps([prompt, geracao or {}], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(conteudo.encode('utf-8')).hexdigest()
+
+class ChamadasUnicas:
+    """Executa no máximo uma chamada por chave ao mesmo tempo; as demais aguardam o resultado dela."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._em_andamento: Dict[str, Future] = {}
+
+    def executar(self, chave: str, funcao: Callable):
+        with self._lock:
+            futuro = self._em_andamento.get(chave)
+            lider = futuro is None
+            if lider:
+                futuro = self._em_andamento[chave] = Future()
+        if not lider:
+            incrementar('ia_deduplicadas')
+            return futuro.result()
+
+        try:
+            resultado = funcao()
+        except BaseException as e:
+            futuro.set_exception(e)
+            raise
+        else:
+            futuro.set_result(resultado)
+            return resultado
+        finally:
+            with self._lock:
+                del self._em_andamento[chave]
+
+    def compartilhar(self, chave: str, criar: Callable):
+        """Retorna (objeto, lider): o objeto em andamento para a chave, ou o criado por `criar`.
+
+        Usado no streaming, em que o objeto compartilhado é um buffer reproduzível;
+        o líder deve chamar `liberar` quando a transmissão terminar.
+        """
+        with self._lock:
+            existente = self._em_andamento.get(chave)
+            if existente is not None:
+                incrementar('ia_deduplicadas')
+                return existente, False
+            self._em_andamento[chave] = criar()
+            return self._em_andamento[chave], True
+
+    def liberar(self, chave: str) -> None:
+        with self._lock:
+            self._em_andamento.pop(chave, None)
+
+class LimitadorTokens:
+    """Token bucket de requisições (rpm) e tokens (tpm) por minuto, atendido em ordem de chegada.
+
+    `rpm` ou `tpm` iguais a 0/None desativam o respectivo limite. Os baldes começam
+    cheios, o que permite uma rajada inicial de até um minuto de cota.
+    """
+
+    def __init__(self, rpm: Optional[float], tpm: Optional[float], max_espera: Optional[float] = None):
+        self._condicao = threading.Condition()
+        self._fila: deque = deque()
+        self._proximo_ticket = 0
+        self.configurar(rpm, tpm, max_espera)
+
+    def configurar(self, rpm: Optional[float], tpm: Optional[float], max_espera: Optional[float] = None) -> None:
+        with self._condicao:
+            self.rpm = rpm or 0
+            self.tpm = tpm or 0
+            self.max_espera = max_espera
+            self._requisicoes = float(self.rpm)
+            self._tokens = float(self.tpm)
+            self._atualizado = time.monotonic()
+            self._condicao.notify_all()
+
+    def _reabastecer(self) -> None:
+        agora = time.monotonic()
+        decorrido = agora - self._atualizado
+        self._atualizado = agora
+        if self.rpm:
+            self._requisicoes = min(self.rpm, self._requisicoes + decorrido * self.rpm / 60)
+        if self.tpm:
+            self._tokens = min(self.tpm, self._tokens + decorrido * self.tpm / 60)
+
+    def _espera(self, tokens: float) -> float:
+        """Segundos até haver cota para a requisição na cabeça da fila."""
+        esperas = [0.0]
+        if self.rpm and self._requisicoes < 1:
+            esperas.append((1 - self._requisicoes) * 60 / self.rpm)
+        if self.tpm and self._tokens < min(tokens, self.tpm):
+            esperas.append((min(tokens, self.tpm) - self._tokens) * 60 / self.tpm)
+        return max(esperas)
+
+    def adquirir(self, tokens: float, ao_aguardar: Optional[Callable[[int], None]] = None) -> None:
+        """Bloqueia até haver cota para uma requisição de `tokens` tokens.
+
+        `ao_aguardar(posicao)` é chamado sempre que a posição na fila muda
+        (1 = próxima a ser atendida) e com 0 quando a requisição é liberada.
+        """
+        inicio = time.monotonic()
+        with self._condicao:
+            ticket = self._proximo_ticket
+            self._proximo_ticket += 1
+            self._fila.append(ticket)
+            posicao = 0
+            try:
+                while True:
+                    self._reabastecer()
+                    espera = None
+                    if self._fila[0] == ticket:
+                        espera = self._espera(tokens)
+                        if espera <= 0:
+                            if self.rpm:
+                                self._requisicoes -= 1
+                            if self.tpm:
+                                self._tokens -= min(tokens, self.tpm)
+                            break
+                    atual = self._fila.index(ticket) + 1
+                    if atual != posicao:
+                        posicao = atual
+                        if ao_aguardar is not None:
+                            ao_aguardar(posicao)
+                    if self.max_espera:
+                        restante = inicio + self.max_espera - time.monotonic()
+                        if restante <= 0:
+                            incrementar('erros', etapa='fila_ia')
+                            raise Exception(
+                                f"Erro: tempo máximo de espera na fila da IA ({self.max_espera:.0f}s) excedido"
+                            )
+                        espera = restante if espera is None else min(espera, restante)
+                    self._condicao.wait(espera)
+            finally:
+                self._fila.remove(ticket)
+                self._condicao.notify_all()
+        if posicao:
+            incrementar('ia_enfileiradas')
+            if ao_aguardar is not None:
+                ao_aguardar(0)
+        observar('fila_ia', time.monotonic() - inicio)
+
+    def tentar_adquirir(self, tokens: float) -> bool:
+        """Reserva a cota só se houver para já e ninguém na fila (não bloqueia)."""
+        with self._condicao:
+            self._reabastecer()
+            if self._fila or self._espera(tokens) > 0:
+                return False
+            if self.rpm:
+                self._requisicoes -= 1
+            if self.tpm:
+                self._tokens -= min(tokens, self.tpm)
+            return True
+
+    def devolver(self, tokens: float) -> None:
+        """Devolve ao balde os tokens reservados e não usados pela resposta."""
+        if tokens <= 0 or not self.tpm:
+            return
+        with self._condicao:
+            self._reabastecer()
+            self._tokens = min(self.tpm, self._tokens + tokens)
+            self._condicao.notify_all()
+
+    def tamanho_fila(self) -> int:
+        with self._condicao:
+            return len(self._fila)
+
+# Instâncias compartilhadas pelo processo
+chamadas_unicas = ChamadasUnicas()
+limitador = LimitadorTokens(AI_RATE_LIMIT['rpm'], AI_RATE_LIMIT['tpm'], AI_RATE_LIMIT['max_espera_segundos'])
+
+_limitador_lock = threading.Lock()
+_limitador_settings: Dict = {'settings': dict(AI_RATE_LIMIT)}
+
+def configurar_limitador(config: Optional[Dict] = None, **sobrescritas) -> None:
+    """Aplica AI_RATE_LIMIT do config.yaml (e `sobrescritas`, ex. rpm=30) ao limitador do processo."""
+    settings = {**AI_RATE_LIMIT, **((config or {}).get('AI_RATE_LIMIT') or {}), **sobrescritas}
+    with _limitador_lock:
+        if _limitador_settings['settings'] == settings:
+            return
+        limitador.configurar(settings['rpm'], settings['tpm'], settings['max_espera_segundos'])
+        _limitador_settings['settings'] = settings
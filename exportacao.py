@@ -0,0 +1,274 @@
+"""Exportação do plano em vários formatos, gerada sob demanda e em cache.
+
+Os arquivos só são produzidos quando alguém pede o download e ficam em cache
+pelo hash do conteúdo (plano + recomendações). `exportar_lote_stream` grava os
+planos de muitas pessoas em Parquet por lotes, sem montar tudo em memória.
+"""
+import hashlib
+import importlib.util
+import io
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from config import EXPORT_CACHE_MAX_ENTRIES, GOALS
+from metricas import incrementar, medir
+
+if TYPE_CHECKING:
+    import pyarrow as pa
+
+# formato -> (rótulo, mime, extensão, módulo opcional necessário)
+FORMATOS = {
+    'csv': ('CSV', 'text/csv', 'csv', None),
+    'xlsx': ('Excel (XLSX)', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', 'xlsx', 'xlsxwriter'),
+    'parquet': ('Parquet', 'application/vnd.apache.parquet', 'parquet', 'pyarrow'),
+    'arrow': ('Arrow (Feather)', 'application/vnd.apache.arrow.file', 'arrow', 'pyarrow'),
+    'pdf': ('Relatório PDF', 'application/pdf', 'pdf', 'fpdf'),
+    'md': ('Recomendações (Markdown)', 'text/markdown', 'md', None)
+}
+
+COLUNAS_TABELA = ['data', 'dia_semana', 'exercicio', 'intensidade', 'duracao', 'peso_projetado']
+
+def formatos_disponiveis() -> List[str]:
+    """Formatos cujas dependências opcionais estão instaladas."""
+    return [f for f, (_, _, _, modulo) in FORMATOS.items() if modulo is None or importlib.util.find_spec(modulo)]
+
+def tabela_exibicao(plano_df: pd.DataFrame) -> pd.DataFrame:
+    """Plano com as datas no formato brasileiro (dd/mm/aaaa), como exibido no app."""
+    if pd.api.types.is_datetime64_any_dtype(plano_df['data']):
+        return plano_df.assign(data=plano_df['data'].dt.strftime('%d/%m/%Y'))
+    return plano_df
+
+def chave_exportacao(plano_df: pd.DataFrame, *extras) -> str:
+    """Hash do plano e dos demais dados do arquivo (perfil, calorias, recomendações)."""
+    digest = hashlib.sha256(pd.util.hash_pandas_object(plano_df, index=False).values.tobytes())
+    digest.update(json.dumps(extras, sort_keys=True, ensure_ascii=False, default=str).encode('utf-8'))
+    return digest.hexdigest()
+
+def _gerar_csv(plano_df: pd.DataFrame, **_) -> bytes:
+    return tabela_exibicao(plano_df).to_csv(index=False).encode('utf-8')
+
+def _gerar_xlsx(plano_df: pd.DataFrame, dados_usuario: Dict, calorias: float, recomendacoes: str) -> bytes:
+    buffer = io.BytesIO()
+    with pd.ExcelWriter(buffer, engine='xlsxwriter') as writer:
+        tabela_exibicao(plano_df).to_excel(writer, sheet_name='Plano', index=False)
+        resumo = pd.DataFrame({
+            'campo': ['Nome', 'Objetivo', 'Calorias diárias (kcal)', 'Duração (dias)'],
+            'valor': [dados_usuario.get('nome'), dados_usuario.get('objetivo'), int(calorias), len(plano_df)]
+        })
+        resumo.to_excel(writer, sheet_name='Resumo', index=False)
+        if recomendacoes:
+            pd.DataFrame({'recomendacoes': recomendacoes.splitlines()}).to_excel(
+                writer, sheet_name='Recomendações', index=False)
+    return buffer.getvalue()
+
+def _gerar_parquet(plano_df: pd.DataFrame, **_) -> bytes:
+    # Mantém os tipos do plano (datas reais, categorias, int16) para o pipeline de análise
+    return plano_df.to_parquet(index=False)
+
+def _gerar_arrow(plano_df: pd.DataFrame, **_) -> bytes:
+    buffer = io.BytesIO()
+    plano_df.reset_index(drop=True).to_feather(buffer)
+    return buffer.getvalue()
+
+def _gerar_md(plano_df: pd.DataFrame, recomendacoes: str, **_) -> bytes:
+    return (recomendacoes or '').encode('utf-8')
+
+def _latin1(texto) -> str:
+    """As fontes padrão do PDF são Latin-1: remove emojis e marcações de Markdown."""
+    texto = re.sub(r'[*#`]+', '', str(texto))
+    return texto.encode('latin-1', 'ignore').decode('latin-1').strip()
+
+def _grafico_linha(pdf, x: float, y: float, largura: float, altura: float, valores: np.ndarray, titulo: str) -> None:
+    pdf.set_font('Helvetica', 'B', 10)
+    pdf.text(x, y - 2, _latin1(titulo))
+    pdf.set_draw_color(200, 200, 200)
+    pdf.rect(x, y, largura, altura)
+    minimo, maximo = float(valores.min()), float(valores.max())
+    faixa = (maximo - minimo) or 1.0
+    xs = x + np.linspace(0, largura, len(valores)) if len(valores) > 1 else np.array([x])
+    ys = y + altura - (valores - minimo) / faixa * (altura - 4) - 2
+    pdf.set_draw_color(255, 107, 107)
+    pdf.set_line_width(0.6)
+    for i in range(1, len(valores)):
+        pdf.line(xs[i - 1], ys[i - 1], xs[i], ys[i])
+    pdf.set_line_width(0.2)
+    pdf.set_font('Helvetica', '', 7)
+    pdf.text(x + 1, y + 4, f"{maximo:.1f} kg")
+    pdf.text(x + 1, y + altura - 1, f"{minimo:.1f} kg")
+
+def _grafico_barras(pdf, x: float, y: float, largura: float, altura: float, rotulos: List[str],
+                    valores: List[float], titulo: str) -> None:
+    pdf.set_font('Helvetica', 'B', 10)
+    pdf.text(x, y - 2, _latin1(titulo))
+    pdf.set_draw_color(200, 200, 200)
+    pdf.rect(x, y, largura, altura)
+    maximo = max(valores) if valores and max(valores) > 0 else 1.0
+    passo = largura / max(len(valores), 1)
+    pdf.set_fill_color(78, 205, 196)
+    pdf.set_font('Helvetica', '', 6)
+    for i, (rotulo, valor) in enumerate(zip(rotulos, valores)):
+        h = valor / maximo * (altura - 8)
+        pdf.rect(x + i * passo + passo * 0.15, y + altura - 5 - h, passo * 0.7, h, style='F')
+        pdf.text(x + i * passo + passo * 0.15, y + altura - 1, _latin1(rotulo)[:6])
+
+def _gerar_pdf(plano_df: pd.DataFrame, dados_usuario: Dict, calorias: float, recomendacoes: str) -> bytes:
+    """Relatório com métricas, gráficos (desenhados direto no PDF), plano e recomendações."""
+    from fpdf import FPDF
+
+    pdf = FPDF(format='A4')
+    pdf.set_auto_page_break(auto=True, margin=15)
+    pdf.add_page()
+    pdf.set_font('Helvetica', 'B', 16)
+    pdf.cell(0, 10, _latin1(f"Plano Personalizado - {dados_usuario.get('nome', '')}"), new_x='LMARGIN', new_y='NEXT')
+    pdf.set_font('Helvetica', '', 10)
+    macros = GOALS.get(dados_usuario.get('objetivo'), {})
+    pdf.cell(0, 6, _latin1(
+        f"Objetivo: {dados_usuario.get('objetivo', '')} | Calorias diárias: {int(calorias)} kcal | "
+        f"Proteínas {macros.get('protein', '-')}% | Carboidratos {macros.get('carbs', '-')}% | "
+        f"Gorduras {macros.get('fats', '-')}%"
+    ), new_x='LMARGIN', new_y='NEXT')
+
+    topo = pdf.get_y() + 8
+    _grafico_linha(pdf, 10, topo, 120, 45, plano_df['peso_projetado'].to_numpy(dtype=np.float64),
+                   'Projeção de Peso')
+    semanas = plano_df.groupby(np.arange(len(plano_df)) // 7)['duracao'].sum()
+    _grafico_barras(pdf, 138, topo, 62, 45, [f"S{i + 1}" for i in semanas.index], semanas.tolist(),
+                    'Minutos de treino por semana')
+    pdf.set_y(topo + 52)
+
+    pdf.set_font('Helvetica', 'B', 12)
+    pdf.cell(0, 8, 'Plano de Treino', new_x='LMARGIN', new_y='NEXT')
+    larguras = [24, 22, 48, 26, 22, 30]
+    pdf.set_font('Helvetica', 'B', 8)
+    for coluna, largura in zip(['Data', 'Dia', 'Exercício', 'Intensidade', 'Duração', 'Peso (kg)'], larguras):
+        pdf.cell(largura, 6, _latin1(coluna), border=1)
+    pdf.ln()
+    pdf.set_font('Helvetica', '', 8)
+    tabela = tabela_exibicao(plano_df)
+    for linha in zip(*(tabela[c].tolist() for c in COLUNAS_TABELA)):
+        for valor, largura in zip(linha, larguras):
+            pdf.cell(largura, 5, _latin1(f"{valor:.1f}" if isinstance(valor, float) else valor), border=1)
+        pdf.ln()
+
+    if recomendacoes:
+        pdf.add_page()
+        pdf.set_font('Helvetica', 'B', 12)
+        pdf.cell(0, 8, _latin1('Recomendações da IA'), new_x='LMARGIN', new_y='NEXT')
+        pdf.set_font('Helvetica', '', 9)
+        for linha in recomendacoes.splitlines():
+            pdf.multi_cell(0, 5, _latin1(linha) or ' ', new_x='LMARGIN', new_y='NEXT')
+    return bytes(pdf.output())
+
+_GERADORES = {
+    'csv': _gerar_csv,
+    'xlsx': _gerar_xlsx,
+    'parquet': _gerar_parquet,
+    'arrow': _gerar_arrow,
+    'pdf': _gerar_pdf,
+    'md': _gerar_md
+}
+
+# Cache LRU dos arquivos gerados, compartilhado pelo processo
+_exportacoes_lock = threading.Lock()
+_exportacoes_cache: 'OrderedDict[str, bytes]' = OrderedDict()
+
+def gerar_exportacao(
+    formato: str,
+    plano_df: pd.DataFrame,
+    dados_usuario: Optional[Dict] = None,
+    calorias: float = 0.0,
+    recomendacoes: str = ''
+) -> bytes:
+    """Gera (ou busca no cache) o arquivo do plano no formato pedido."""
+    if formato not in _GERADORES:
+        raise ValueError(f"Formato de exportação desconhecido: {formato}")
+    dados_usuario = dados_usuario or {}
+    chave = f"{formato}:{chave_exportacao(plano_df, dados_usuario, calorias, recomendacoes)}"
+    with _exportacoes_lock:
+        if chave in _exportacoes_cache:
+            _exportacoes_cache.move_to_end(chave)
+            incrementar('cache_exportacao_acertos')
+            return _exportacoes_cache[chave]
+
+    incrementar('cache_exportacao_falhas')
+    with medir(f'exportar_{formato}'):
+        conteudo = _GERADORES[formato](
+            plano_df, dados_usuario=dados_usuario, calorias=calorias, recomendacoes=recomendacoes
+        )
+    with _exportacoes_lock:
+        _exportacoes_cache[chave] = conteudo
+        while len(_exportacoes_cache) > EXPORT_CACHE_MAX_ENTRIES:
+            _exportacoes_cache.popitem(last=False)
+    return conteudo
+
+def nome_arquivo(formato: str, prefixo: str = 'plano_fitia', data: Optional[str] = None) -> str:
+    return f"{prefixo}_{data or datetime.now().strftime('%Y%m%d')}.{FORMATOS[formato][2]}"
+
+def exportar_lote_stream(
+    registros: Iterable[Dict],
+    pasta_saida: str,
+    tamanho_lote: int = 500,
+    ao_exportar=None,
+    esquemas: Optional[Dict[str, 'pa.Schema']] = None
+) -> int:
+    """Grava perfis.parquet e planos.parquet percorrendo os registros uma única vez.
+
+    Cada registro tem os campos de um perfil processado e `plano` (lista de dias).
+    Os registros são agrupados em lotes de `tamanho_lote` pessoas e cada lote vira
+    um row group, então a memória usada não depende do total de pessoas.
+    `ao_exportar(registro)` é chamado para cada registro (ex.: gravar o Markdown).
+    `esquemas` ('perfis' e/ou 'planos') fixa as colunas de cada arquivo; sem ele o
+    esquema vem do primeiro lote. Um lote com colunas fora do esquema gera erro em
+    vez de perdê-las. Retorna o número de registros exportados.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    os.makedirs(pasta_saida, exist_ok=True)
+    esquemas = dict(esquemas or {})
+    escritores: Dict[str, pq.ParquetWriter] = {}
+    total = 0
+
+    def gravar(nome: str, linhas: List[Dict]) -> None:
+        if not linhas:
+            return
+        if nome not in esquemas:
+            # Colunas só com nulos no primeiro lote são tratadas como texto
+            inferido = pa.Table.from_pylist(linhas).schema
+            esquemas[nome] = pa.schema([c.with_type(pa.string()) if pa.types.is_null(c.type) else c for c in inferido])
+        esquema = esquemas[nome]
+        fora = set().union(*linhas) - set(esquema.names)
+        if fora:
+            raise ValueError(f"Erro: colunas fora do esquema de {nome}.parquet: {sorted(fora)}")
+        if nome not in escritores:
+            escritores[nome] = pq.ParquetWriter(os.path.join(pasta_saida, f'{nome}.parquet'), esquema)
+        # Colunas do esquema ausentes no lote viram nulas
+        escritores[nome].write_table(pa.Table.from_pylist(linhas, schema=esquema))
+
+    perfis: List[Dict] = []
+    planos: List[Dict] = []
+    try:
+        for registro in registros:
+            perfis.append({k: v for k, v in registro.items() if k != 'plano'})
+            planos.extend({'id': registro['id'], **dia} for dia in registro['plano'])
+            if ao_exportar is not None:
+                ao_exportar(registro)
+            total += 1
+            if len(perfis) >= tamanho_lote:
+                gravar('perfis', perfis)
+                gravar('planos', planos)
+                perfis, planos = [], []
+        gravar('perfis', perfis)
+        gravar('planos', planos)
+    finally:
+        for escritor in escritores.values():
+            escritor.close()
+    return total
@@ -0,0 +1,76 @@
+import random
+import time
+from typing import Callable, Dict, Iterator, Optional
+
+class FakeMessage:
+    """Mensagem no formato mínimo usado pelo app (atributo `content`)."""
+
+    def __init__(self, content: str, usage_metadata: Optional[Dict] = None):
+        self.content = content
+        self.usage_metadata = usage_metadata
+
+class FakeChatModel:
+    """Substituto local e determinístico do ChatGoogleGenerativeAI.
+
+    Simula a latência até o primeiro token e a velocidade de geração, sem rede
+    nem chave de API. A resposta depende apenas do prompt e da semente e é
+    truncada em `generation_config['max_output_tokens']`, como no modelo real.
+    `sortear_latencia`, se informado, sorteia a latência até o primeiro token a
+    cada chamada (ex.: uma distribuição lognormal nos testes de carga).
+    """
+
+    def __init__(
+        self,
+        latencia_primeiro_token: float = 0.0,
+        tokens_por_segundo: Optional[float] = None,
+        tokens_resposta: int = 400,
+        seed: int = 42,
+        sortear_latencia: Optional[Callable[[], float]] = None
+    ):
+        self.latencia_primeiro_token = latencia_primeiro_token
+        self.tokens_por_segundo = tokens_por_segundo
+        self.tokens_resposta = tokens_resposta
+        self.seed = seed
+        self.sortear_latencia = sortear_latencia
+        self.chamadas = 0
+
+    def _latencia(self) -> float:
+        if self.sortear_latencia is not None:
+            return max(0.0, self.sortear_latencia())
+        return self.latencia_primeiro_token
+
+    def _tokens(self, prompt: str, generation_config: Optional[Dict] = None) -> list:
+        limite = (generation_config or {}).get('max_output_tokens') or self.tokens_resposta
+        rng = random.Random(f"{self.seed}:{prompt}")
+        vocabulario = ['proteína', 'treino', 'hidratação', 'descanso', 'meta', 'semana',
+                       'refeição', 'frango', 'arroz', 'legumes', 'caminhada', 'sono']
+        tokens = ['## Recomendações\n']
+        for i in range(1, min(self.tokens_resposta, limite)):
+            tokens.append(rng.choice(vocabulario) + ('\n' if i % 12 == 0 else ' '))
+        return tokens
+
+    @staticmethod
+    def _uso(prompt: str, tokens: list) -> Dict:
+        return {'input_tokens': len(prompt.split()), 'output_tokens': len(tokens)}
+
+    def invoke(self, prompt: str, generation_config: Optional[Dict] = None, **kwargs) -> FakeMessage:
+        self.chamadas += 1
+        tokens = self._tokens(prompt, generation_config)
+        espera = self._latencia()
+        if self.tokens_por_segundo:
+            espera += len(tokens) / self.tokens_por_segundo
+        if espera:
+            time.sleep(espera)
+        return FakeMessage(''.join(tokens), self._uso(prompt, tokens))
+
+    def stream(self, prompt: str, generation_config: Optional[Dict] = None, **kwargs) -> Iterator[FakeMessage]:
+        self.chamadas += 1
+        latencia = self._latencia()
+        if latencia:
+            time.sleep(latencia)
+        intervalo = 1.0 / self.tokens_por_segundo if self.tokens_por_segundo else 0.0
+        tokens = self._tokens(prompt, generation_config)
+        for i, token in enumerate(tokens, 1):
+            if intervalo:
+                time.sleep(intervalo)
+            yield FakeMessage(token, self._uso(prompt, tokens) if i == len(tokens) else None)
@@ -0,0 +1,197 @@
+"""Gráficos do plano (plotly), importados apenas quando um plano é exibido."""
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+import plotly.io as pio
+
+from config import CHART_MAX_POINTS, CHART_WEBGL_MIN_POINTS, CHART_CACHE_MAX_ENTRIES
+from metricas import incrementar, medir
+
+# Cache de figuras por hash dos dados do plano (LRU, compartilhado pelo processo).
+# As figuras em cache nunca saem dele: cada chamada recebe cópias (_copiar_figuras).
+_graficos_lock = threading.Lock()
+_graficos_cache: 'OrderedDict[str, Tuple[go.Figure, go.Figure, go.Figure]]' = OrderedDict()
+
+# plotly_white reduzido aos tipos de traço usados: aplicar o template completo custa
+# ~15 ms por figura (cópia e validação) e o resultado visual é o mesmo
+_TEMPLATE_GRAFICO = go.layout.Template(
+    layout=pio.templates['plotly_white'].layout,
+    data={tipo: getattr(pio.templates['plotly_white'].data, tipo) for tipo in ('scatter', 'scattergl', 'bar', 'pie')}
+)
+
+_LAYOUT_GRAFICO = dict(
+    template=_TEMPLATE_GRAFICO,
+    plot_bgcolor='rgba(0,0,0,0)',
+    paper_bgcolor='rgba(0,0,0,0)'
+)
+
+def _reduzir_serie(x: np.ndarray, y: np.ndarray, max_pontos: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Reduz a série a no máximo ~max_pontos, mantendo o mínimo e o máximo de cada bloco."""
+    n = len(y)
+    if n <= max_pontos:
+        return x, y
+    blocos = max(1, max_pontos // 2)
+    tamanho = int(np.ceil(n / blocos))
+    completos = (n // tamanho) * tamanho
+    y_blocos = y[:completos].reshape(-1, tamanho)
+    inicio = np.arange(0, completos, tamanho)
+    idx = np.concatenate([inicio + y_blocos.argmin(axis=1), inicio + y_blocos.argmax(axis=1)])
+    if completos < n:
+        idx = np.append(idx, [completos + y[completos:].argmin(), completos + y[completos:].argmax()])
+    idx = np.unique(np.append(idx, [0, n - 1]))
+    return x[idx], y[idx]
+
+def _chave_graficos(plano_df: pd.DataFrame, assinatura: Optional[str], *parametros) -> str:
+    """Hash dos dados do plano usados nos gráficos (ou a assinatura já calculada) e dos parâmetros."""
+    if assinatura is not None:
+        digest = hashlib.sha256(assinatura.encode('ascii'))
+    else:
+        colunas = [c for c in ['data', 'duracao', 'intensidade', 'peso_projetado'] if c in plano_df.columns]
+        digest = hashlib.sha256(pd.util.hash_pandas_object(plano_df[colunas], index=False).values.tobytes())
+    digest.update(json.dumps(parametros, sort_keys=True, default=str).encode('utf-8'))
+    return digest.hexdigest()
+
+def _copiar_figuras(figuras: Tuple[go.Figure, ...]) -> Tuple[go.Figure, ...]:
+    """Cópias independentes das figuras; sem revalidar (já validadas na construção), ~5x mais rápido que go.Figure(fig)."""
+    return tuple(go.Figure(fig.to_dict(), _validate=False) for fig in figuras)
+
+def gerar_graficos_plano(
+    plano_df: pd.DataFrame,
+    peso_inicial: float,
+    objetivo: str,
+    macronutrientes: Dict,
+    webgl: Optional[bool] = None,
+    max_pontos: int = CHART_MAX_POINTS,
+    pesagens: Optional[List[Dict]] = None,
+    assinatura: Optional[str] = None
+) -> Tuple[go.Figure, go.Figure, go.Figure]:
+    """Gera os gráficos do plano.
+
+    Planos longos são reduzidos no servidor (peso por blocos de mín./máx., treinos
+    somados por semana) para que construção e serialização não cresçam com a
+    duração. `webgl=None` usa Scattergl automaticamente a partir de
+    CHART_WEBGL_MIN_POINTS dias. `pesagens` (dicts com data e peso) aparecem como
+    pontos no gráfico de peso. O resultado fica em cache pelo hash dos dados e cada
+    chamada recebe cópias, que podem ser alteradas sem afetar outras sessões;
+    `assinatura` (PlanoCompacto.assinatura) evita re-hashear o DataFrame a cada rerun.
+    """
+    if webgl is None:
+        webgl = len(plano_df) >= CHART_WEBGL_MIN_POINTS
+    chave = _chave_graficos(plano_df, assinatura, peso_inicial, objetivo, macronutrientes, webgl, max_pontos, pesagens)
+    with _graficos_lock:
+        figuras = _graficos_cache.get(chave)
+        if figuras is not None:
+            _graficos_cache.move_to_end(chave)
+    if figuras is not None:
+        incrementar('cache_graficos_acertos')
+        return _copiar_figuras(figuras)
+
+    incrementar('cache_graficos_falhas')
+    with medir('construir_graficos'):
+        figuras = construir_graficos_plano(plano_df, macronutrientes, webgl, max_pontos, pesagens)
+    with _graficos_lock:
+        _graficos_cache[chave] = figuras
+        while len(_graficos_cache) > CHART_CACHE_MAX_ENTRIES:
+            _graficos_cache.popitem(last=False)
+    return _copiar_figuras(figuras)
+
+def construir_graficos_plano(
+    plano_df: pd.DataFrame,
+    macronutrientes: Dict,
+    webgl: Optional[bool] = None,
+    max_pontos: int = CHART_MAX_POINTS,
+    pesagens: Optional[List[Dict]] = None
+) -> Tuple[go.Figure, go.Figure, go.Figure]:
+    """Constrói os gráficos do plano sem passar pelo cache (ver gerar_graficos_plano)."""
+    if webgl is None:
+        webgl = len(plano_df) >= CHART_WEBGL_MIN_POINTS
+    datas = plano_df['data'].to_numpy()
+    pesos = plano_df['peso_projetado'].to_numpy(dtype=np.float64)
+
+    # Gráfico de projeção de peso
+    x_peso, y_peso = _reduzir_serie(datas, pesos, max_pontos)
+    traco = go.Scattergl if webgl else go.Scatter
+    fig_peso = go.Figure(traco(x=x_peso, y=y_peso, mode='lines', name='peso_projetado'))
+    if pesagens:
+        fig_peso.add_trace(go.Scatter(
+            x=pd.to_datetime([p['data'] for p in pesagens]).to_numpy(),
+            y=[p['peso'] for p in pesagens],
+            mode='markers', name='peso_registrado', marker={'color': '#FF6B6B', 'size': 9}
+        ))
+    fig_peso.update_layout(
+        title='📈 Projeção de Evolução do Peso',
+        xaxis_title='Data',
+        yaxis_title='Peso (kg)',
+        showlegend=True,
+        **_LAYOUT_GRAFICO
+    )
+
+    # Gráfico de macronutrientes
+    fig_macro = go.Figure(data=[go.Pie(
+        labels=list(macronutrientes.keys()),
+        values=list(macronutrientes.values()),
+        hole=.3,
+        marker_colors=['#FF6B6B', '#4ECDC4', '#45B7D1']
+    )])
+    fig_macro.update_layout(
+        title='🥗 Distribuição de Macronutrientes',
+        **_LAYOUT_GRAFICO
+    )
+
+    # Gráfico de intensidade dos treinos (somado por semana quando há dias demais para barras diárias)
+    treinos = plano_df[['data', 'intensidade', 'duracao']]
+    titulo_y = 'Duração (minutos)'
+    if len(treinos) > max_pontos and pd.api.types.is_datetime64_any_dtype(treinos['data']):
+        # Blocos de semanas inteiras, tantas quantas forem necessárias para caber em max_pontos
+        semanas = int(np.ceil(len(treinos) / (7 * max_pontos)))
+        treinos = (
+            treinos.groupby([pd.Grouper(key='data', freq=f'{7 * semanas}D'), 'intensidade'],
+                            observed=True)['duracao'].sum().reset_index()
+        )
+        titulo_y = 'Duração semanal (minutos)' if semanas == 1 else f'Duração a cada {semanas} semanas (minutos)'
+    fig_treinos = go.Figure([
+        go.Bar(x=grupo['data'].to_numpy(), y=grupo['duracao'].to_numpy(), name=str(intensidade))
+        for intensidade, grupo in treinos.groupby('intensidade', observed=True, sort=False)
+    ])
+    fig_treinos.update_layout(
+        title='💪 Intensidade dos Treinos',
+        xaxis_title='Data',
+        yaxis_title=titulo_y,
+        legend_title_text='intensidade',
+        barmode='relative',
+        showlegend=True,
+        **_LAYOUT_GRAFICO
+    )
+
+    return fig_peso, fig_macro, fig_treinos
+
+def gerar_grafico_comparacao_peso(
+    planos_df: pd.DataFrame,
+    rotulos: Optional[Dict] = None,
+    max_pontos: int = CHART_MAX_POINTS
+) -> go.Figure:
+    """Compara a projeção de peso de vários usuários (saída de plano.criar_planos_lote).
+
+    Usa sempre WebGL e reduz cada série a `max_pontos`, mantendo o gráfico leve
+    mesmo com coortes grandes e planos longos.
+    """
+    fig = go.Figure()
+    for usuario, grupo in planos_df.groupby('usuario', sort=True):
+        x, y = _reduzir_serie(
+            grupo['data'].to_numpy(), grupo['peso_projetado'].to_numpy(dtype=np.float64), max_pontos
+        )
+        nome = (rotulos or {}).get(usuario, str(usuario))
+        fig.add_trace(go.Scattergl(x=x, y=y, mode='lines', name=nome))
+    fig.update_layout(
+        title='📈 Comparação da Projeção de Peso',
+        xaxis_title='Data',
+        yaxis_title='Peso (kg)',
+        **_LAYOUT_GRAFICO
+    )
+    return fig
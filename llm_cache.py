@@ -0,0 +1,169 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+from config import LLM_CACHE_SETTINGS
+
+# Marcador gravado no lugar do nome do usuário, para que a resposta possa ser reaproveitada
+NOME_PLACEHOLDER = '{{nome}}'
+
+def _normalizar_texto(texto: str) -> str:
+    """Normaliza texto livre (caixa e espaços) para compor a chave do cache."""
+    return ' '.join((texto or '').lower().split())
+
+class LLMResponseCache:
+    """Cache persistente (SQLite) de respostas da IA, endereçado pelo perfil normalizado."""
+
+    def __init__(
+        self,
+        path: str,
+        ttl_seconds: float,
+        max_entries: int,
+        faixa_idade: int = 5,
+        arredondamento_peso: float = 1.0,
+        arredondamento_altura: float = 1.0,
+        versao: str = '3'
+    ):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.faixa_idade = faixa_idade
+        self.arredondamento_peso = arredondamento_peso
+        self.arredondamento_altura = arredondamento_altura
+        self.versao = versao
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+        diretorio = os.path.dirname(path)
+        if diretorio:
+            os.makedirs(diretorio, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS respostas (
+                    chave TEXT PRIMARY KEY,
+                    resposta TEXT NOT NULL,
+                    criado_em REAL NOT NULL,
+                    acessado_em REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_respostas_acessado ON respostas (acessado_em)")
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.path, timeout=10)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _arredondar(self, valor: float, passo: float) -> float:
+        return round(round(float(valor) / passo) * passo, 2) if passo else float(valor)
+
+    def perfil_normalizado(self, dados_usuario: Dict) -> Dict:
+        """Agrupa o perfil em faixas para que perfis quase idênticos compartilhem a chave."""
+        idade = int(dados_usuario['idade'])
+        return {
+            'versao': self.versao,
+            'faixa_idade': idade - idade % self.faixa_idade if self.faixa_idade else idade,
+            'sexo': dados_usuario['sexo'].split(' ')[0],
+            'altura': self._arredondar(dados_usuario['altura'], self.arredondamento_altura),
+            'peso': self._arredondar(dados_usuario['peso'], self.arredondamento_peso),
+            'nivel_atividade': dados_usuario['nivel_atividade'],
+            'objetivo': dados_usuario['objetivo'],
+            'restricoes': sorted(dados_usuario.get('restricoes') or []),
+            'preferencias_alimentares': _normalizar_texto(dados_usuario.get('preferencias_alimentares')),
+            'limitacoes': _normalizar_texto(dados_usuario.get('limitacoes'))
+        }
+
+    def chave(self, dados_usuario: Dict, variante: str = '') -> str:
+        """Gera a chave SHA-256 do perfil normalizado (e da variante da resposta, se houver)."""
+        perfil = self.perfil_normalizado(dados_usuario)
+        if variante:
+            perfil['variante'] = variante
+        perfil = json.dumps(perfil, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(perfil.encode('utf-8')).hexdigest()
+
+    def get(self, dados_usuario: Dict, variante: str = '') -> Optional[str]:
+        """Retorna a resposta armazenada para o perfil, ou None se ausente/expirada."""
+        chave = self.chave(dados_usuario, variante)
+        agora = time.time()
+        with self._lock, self._connect() as conn:
+            linha = conn.execute(
+                "SELECT resposta, criado_em FROM respostas WHERE chave = ?", (chave,)
+            ).fetchone()
+            if linha is None or agora - linha[1] > self.ttl_seconds:
+                if linha is not None:
+                    conn.execute("DELETE FROM respostas WHERE chave = ?", (chave,))
+                self._stats['misses'] += 1
+                return None
+            conn.execute("UPDATE respostas SET acessado_em = ? WHERE chave = ?", (agora, chave))
+            self._stats['hits'] += 1
+        return linha[0].replace(NOME_PLACEHOLDER, dados_usuario.get('nome') or '')
+
+    def set(self, dados_usuario: Dict, resposta: str, variante: str = '') -> None:
+        """Armazena a resposta e remove as entradas menos usadas além do limite."""
+        chave = self.chave(dados_usuario, variante)
+        nome = dados_usuario.get('nome')
+        if nome:
+            # Só a palavra inteira: 'Ana' não pode virar marcador dentro de 'Anabolismo'
+            resposta = re.sub(rf'(?<!\w){re.escape(nome)}(?!\w)', NOME_PLACEHOLDER, resposta)
+        agora = time.time()
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO respostas (chave, resposta, criado_em, acessado_em) VALUES (?, ?, ?, ?)",
+                (chave, resposta, agora, agora)
+            )
+            excedente = conn.execute("SELECT COUNT(*) FROM respostas").fetchone()[0] - self.max_entries
+            if excedente > 0:
+                conn.execute(
+                    "DELETE FROM respostas WHERE chave IN "
+                    "(SELECT chave FROM respostas ORDER BY acessado_em ASC LIMIT ?)",
+                    (excedente,)
+                )
+                self._stats['evictions'] += excedente
+
+    def clear(self) -> None:
+        """Remove todas as entradas do cache."""
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM respostas")
+
+    def stats(self) -> Dict:
+        """Retorna os contadores de acertos/falhas e o número de entradas."""
+        with self._lock, self._connect() as conn:
+            entradas = conn.execute("SELECT COUNT(*) FROM respostas").fetchone()[0]
+            total = self._stats['hits'] + self._stats['misses']
+            return {
+                **self._stats,
+                'entries': entradas,
+                'hit_rate': self._stats['hits'] / total if total else 0.0
+            }
+
+# Instância única por processo, recriada apenas se as configurações mudarem
+_cache_lock = threading.Lock()
+_cache_instancia: Dict = {'settings': None, 'cache': None}
+
+def get_llm_cache(config: Optional[Dict] = None) -> Optional[LLMResponseCache]:
+    """Retorna o cache compartilhado, ou None se desativado (LLM_CACHE.enabled: false)."""
+    settings = {**LLM_CACHE_SETTINGS, **((config or {}).get('LLM_CACHE') or {})}
+    if not settings['enabled']:
+        return None
+    with _cache_lock:
+        if _cache_instancia['settings'] != settings:
+            _cache_instancia['cache'] = LLMResponseCache(
+                path=settings['path'],
+                ttl_seconds=settings['ttl_seconds'],
+                max_entries=settings['max_entries'],
+                faixa_idade=settings['faixa_idade'],
+                arredondamento_peso=settings['arredondamento_peso'],
+                arredondamento_altura=settings['arredondamento_altura'],
+                versao=settings['versao']
+            )
+            _cache_instancia['settings'] = settings
+        return _cache_instancia['cache']
@@ -0,0 +1,206 @@
+"""Métricas de latência e contadores do processo (sem dependências externas).
+
+Cada etapa do envio (cálculos, plano, IA, gráficos, renderização) é medida com
+`medir('etapa')`; as durações vão para histogramas de buckets fixos, com custo
+constante por observação, e os contadores (tokens, acertos de cache, erros)
+são somados em memória. `resumo()` traz p50/p95/p99 por etapa e
+`exportar_prometheus` / `exportar_jsonl` gravam os valores em arquivo.
+"""
+import bisect
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from config import METRICS_SETTINGS
+
+# Limites superiores dos buckets (segundos), no estilo do Prometheus
+BUCKETS_SEGUNDOS = [
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+    0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0
+]
+
+PREFIXO = 'fitia'
+
+class Histograma:
+    """Histograma de durações com buckets fixos; quantis estimados por interpolação."""
+
+    def __init__(self, limites: List[float] = BUCKETS_SEGUNDOS):
+        self.limites = limites
+        self.contagens = [0] * (len(limites) + 1)  # último bucket: acima do maior limite
+        self.total = 0
+        self.soma = 0.0
+        self.minimo = float('inf')
+        self.maximo = 0.0
+
+    def observar(self, valor: float) -> None:
+        self.contagens[bisect.bisect_left(self.limites, valor)] += 1
+        self.total += 1
+        self.soma += valor
+        self.minimo = min(self.minimo, valor)
+        self.maximo = max(self.maximo, valor)
+
+    def quantil(self, q: float) -> float:
+        """Estima o quantil `q` (0-1) interpolando linearmente dentro do bucket."""
+        if not self.total:
+            return 0.0
+        alvo = q * self.total
+        acumulado = 0
+        for i, contagem in enumerate(self.contagens):
+            if contagem and acumulado + contagem >= alvo:
+                inferior = self.limites[i - 1] if i else 0.0
+                superior = self.limites[i] if i < len(self.limites) else self.maximo
+                estimativa = inferior + (superior - inferior) * (alvo - acumulado) / contagem
+                return min(max(estimativa, self.minimo), self.maximo)
+            acumulado += contagem
+        return self.maximo
+
+class Metricas:
+    """Agregador de métricas do processo, compartilhado por todas as sessões."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histogramas: Dict[str, Histograma] = {}
+        self._contadores: Dict[Tuple[str, str], float] = {}
+        self.inicio = time.time()
+
+    def observar(self, etapa: str, segundos: float) -> None:
+        with self._lock:
+            histograma = self._histogramas.get(etapa)
+            if histograma is None:
+                histograma = self._histogramas[etapa] = Histograma()
+            histograma.observar(segundos)
+
+    def incrementar(self, nome: str, valor: float = 1, etapa: str = '') -> None:
+        with self._lock:
+            self._contadores[(nome, etapa)] = self._contadores.get((nome, etapa), 0) + valor
+
+    @contextmanager
+    def medir(self, etapa: str) -> Iterator[None]:
+        """Mede a duração do bloco; exceções são contadas em `erros` e propagadas."""
+        inicio = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.incrementar('erros', etapa=etapa)
+            raise
+        finally:
+            self.observar(etapa, time.perf_counter() - inicio)
+
+    def resumo(self) -> Dict:
+        """Retorna durações por etapa (ms, com p50/p95/p99), contadores e uso de recursos."""
+        with self._lock:
+            etapas = {
+                etapa: {
+                    'chamadas': h.total,
+                    'media_ms': round(h.soma / h.total * 1000, 3),
+                    'p50_ms': round(h.quantil(0.50) * 1000, 3),
+                    'p95_ms': round(h.quantil(0.95) * 1000, 3),
+                    'p99_ms': round(h.quantil(0.99) * 1000, 3),
+                    'max_ms': round(h.maximo * 1000, 3)
+                }
+                for etapa, h in sorted(self._histogramas.items())
+            }
+            contadores = {
+                (f'{nome}[{etapa}]' if etapa else nome): valor
+                for (nome, etapa), valor in sorted(self._contadores.items())
+            }
+        return {'etapas': etapas, 'contadores': contadores, 'recursos': recursos_processo()}
+
+    def para_prometheus(self) -> str:
+        """Formata as métricas no formato texto de exposição do Prometheus."""
+        linhas = [f'# TYPE {PREFIXO}_etapa_segundos histogram']
+        with self._lock:
+            for etapa, h in sorted(self._histogramas.items()):
+                acumulado = 0
+                for limite, contagem in zip(h.limites + ['+Inf'], h.contagens):
+                    acumulado += contagem
+                    linhas.append(f'{PREFIXO}_etapa_segundos_bucket{{etapa="{etapa}",le="{limite}"}} {acumulado}')
+                linhas.append(f'{PREFIXO}_etapa_segundos_sum{{etapa="{etapa}"}} {h.soma}')
+                linhas.append(f'{PREFIXO}_etapa_segundos_count{{etapa="{etapa}"}} {h.total}')
+            nomes = sorted({nome for nome, _ in self._contadores})
+            for nome in nomes:
+                linhas.append(f'# TYPE {PREFIXO}_{nome}_total counter')
+                for (n, etapa), valor in sorted(self._contadores.items()):
+                    if n == nome:
+                        rotulo = f'{{etapa="{etapa}"}}' if etapa else ''
+                        linhas.append(f'{PREFIXO}_{nome}_total{rotulo} {valor}')
+        for nome, valor in recursos_processo().items():
+            linhas.append(f'# TYPE {PREFIXO}_processo_{nome} gauge')
+            linhas.append(f'{PREFIXO}_processo_{nome} {valor}')
+        return '\n'.join(linhas) + '\n'
+
+    def exportar_prometheus(self, caminho: str) -> None:
+        """Grava o arquivo para o textfile collector do node_exporter (escrita atômica)."""
+        pasta = os.path.dirname(caminho)
+        if pasta:
+            os.makedirs(pasta, exist_ok=True)
+        temporario = f'{caminho}.tmp'
+        with open(temporario, 'w', encoding='utf-8') as arquivo:
+            arquivo.write(self.para_prometheus())
+        os.replace(temporario, caminho)
+
+    def exportar_jsonl(self, caminho: str) -> None:
+        """Acrescenta um registro com o resumo atual ao log JSONL."""
+        pasta = os.path.dirname(caminho)
+        if pasta:
+            os.makedirs(pasta, exist_ok=True)
+        registro = {'timestamp': round(time.time(), 3), **self.resumo()}
+        with open(caminho, 'a', encoding='utf-8') as arquivo:
+            arquivo.write(json.dumps(registro, ensure_ascii=False) + '\n')
+
+    def limpar(self) -> None:
+        with self._lock:
+            self._histogramas.clear()
+            self._contadores.clear()
+
+def recursos_processo() -> Dict[str, float]:
+    """Memória máxima (MB), tempo de CPU (s) e threads ativas do processo.
+
+    `resource` só existe em POSIX: sem ele (ex.: Windows) a memória não é informada.
+    """
+    recursos = {
+        'cpu_segundos': round(time.process_time(), 3),
+        'threads': threading.active_count()
+    }
+    try:
+        import resource
+    except ImportError:
+        return recursos
+    uso = resource.getrusage(resource.RUSAGE_SELF)
+    return {'memoria_max_mb': round(uso.ru_maxrss / 1024, 1), **recursos}  # ru_maxrss em KB no Linux
+
+# Instância única do processo e atalhos usados pelos demais módulos
+METRICAS = Metricas()
+medir = METRICAS.medir
+observar = METRICAS.observar
+incrementar = METRICAS.incrementar
+resumo = METRICAS.resumo
+
+_exportacao_lock = threading.Lock()
+_exportacao: Dict = {'thread': None, 'settings': None}
+
+def iniciar_exportacao(config: Optional[Dict] = None) -> None:
+    """Inicia (uma vez por processo) a exportação periódica configurada em METRICS do config.yaml."""
+    settings = {**METRICS_SETTINGS, **((config or {}).get('METRICS') or {})}
+    with _exportacao_lock:
+        _exportacao['settings'] = settings
+        if _exportacao['thread'] is not None or not (settings['prometheus_path'] or settings['jsonl_path']):
+            return
+
+        def exportar():
+            while True:
+                time.sleep(_exportacao['settings']['intervalo_segundos'])
+                atual = _exportacao['settings']
+                try:
+                    if atual['prometheus_path']:
+                        METRICAS.exportar_prometheus(atual['prometheus_path'])
+                    if atual['jsonl_path']:
+                        METRICAS.exportar_jsonl(atual['jsonl_path'])
+                except Exception as e:
+                    print(f"Erro ao exportar métricas: {e}")
+
+        _exportacao['thread'] = threading.Thread(target=exportar, name='fitia-metricas', daemon=True)
+        _exportacao['thread'].start()
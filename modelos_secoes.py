@@ -0,0 +1,175 @@
+"""Biblioteca de conteúdo padrão das recomendações, respondida localmente.
+
+Hidratação, descanso, orientações de treino por objetivo, precauções por
+atividade, alimentos a evitar por restrição e metas dependem só das opções do
+formulário (GOALS, DIETARY_RESTRICTIONS, PHYSICAL_ACTIVITIES e
+ACTIVITY_LEVELS), então são montadas aqui sem chamar o modelo. A IA recebe
+apenas os pedidos que dependem do texto livre do usuário (preferências
+alimentares e limitações físicas): PEDIDOS_PERSONALIZADOS.
+"""
+import re
+from functools import lru_cache
+from typing import Dict, List, Tuple
+
+from config import ACTIVITY_LEVELS, DIETARY_RESTRICTIONS, GOALS, PHYSICAL_ACTIVITIES
+from resposta_ia import renderizar_secao, secoes_vazias
+
+def nome_opcao(opcao: str) -> str:
+    """Opção do formulário sem o emoji final (ex.: 'Emagrecimento 📉' -> 'Emagrecimento')."""
+    return re.sub(r'[^\w)]+$', '', opcao)
+
+TREINO_POR_OBJETIVO = {
+    'Emagrecimento': [
+        'Melhores exercícios: combine treino de força (3x por semana) com aeróbicos contínuos ou intervalados',
+        'Frequência recomendada: 4 a 6 sessões por semana, com pelo menos 150 minutos de aeróbico',
+        'Intensidade ideal: moderada na maior parte dos treinos (consegue falar frases curtas)'
+    ],
+    'Ganho de Massa': [
+        'Melhores exercícios: exercícios multiarticulares (agachamento, supino, remada, levantamento terra)',
+        'Frequência recomendada: 3 a 5 sessões de força por semana, cada grupo muscular 2x por semana',
+        'Intensidade ideal: 6 a 12 repetições por série, terminando a 1-3 repetições da falha'
+    ],
+    'Manutenção': [
+        'Melhores exercícios: variedade entre força, aeróbico e mobilidade',
+        'Frequência recomendada: 3 a 5 sessões por semana',
+        'Intensidade ideal: moderada, com 1 a 2 treinos mais intensos por semana'
+    ],
+    'Performance': [
+        'Melhores exercícios: treinos específicos da modalidade, força e potência',
+        'Frequência recomendada: 5 a 6 sessões por semana, alternando estímulos fortes e leves',
+        'Intensidade ideal: periodize a carga, com blocos de volume e semanas de recuperação'
+    ]
+}
+
+PRECAUCOES_POR_ATIVIDADE = {
+    'Caminhada': 'Caminhada: use tênis com bom amortecimento e aumente a distância aos poucos',
+    'Corrida': 'Corrida: aumente o volume semanal em no máximo 10% e alterne dias de impacto',
+    'Natação': 'Natação: cuide da técnica da braçada para evitar sobrecarga nos ombros',
+    'Ciclismo': 'Ciclismo: ajuste a altura do selim e mantenha cadência confortável',
+    'Musculação': 'Musculação: priorize a execução correta antes de aumentar a carga',
+    'Yoga': 'Yoga: respeite a amplitude do corpo e evite forçar posturas',
+    'Pilates': 'Pilates: mantenha o core ativado e a respiração coordenada',
+    'Esportes Coletivos': 'Esportes coletivos: aqueça bem e fortaleça tornozelos e joelhos',
+    'Dança': 'Dança: aqueça as articulações e hidrate-se durante as aulas',
+    'Artes Marciais': 'Artes marciais: use proteções e evolua a intensidade dos treinos de contato aos poucos'
+}
+
+HIDRATACAO_POR_NIVEL = {
+    'Sedentário': 'Hidratação: cerca de 30 ml de água por kg de peso ao dia',
+    'Levemente ativo': 'Hidratação: cerca de 35 ml por kg ao dia, mais 500 ml nos dias de treino',
+    'Moderadamente ativo': 'Hidratação: cerca de 35 ml por kg ao dia, mais 500 a 750 ml por hora de treino',
+    'Muito ativo': 'Hidratação: cerca de 40 ml por kg ao dia; reponha eletrólitos em treinos acima de 1 hora',
+    'Extremamente ativo': 'Hidratação: cerca de 40 a 45 ml por kg ao dia, com reposição de eletrólitos nos treinos longos'
+}
+
+RECOMENDACOES_POR_OBJETIVO = {
+    'Emagrecimento': [
+        'Suplementação: em geral desnecessária; proteína em pó apenas se não atingir a meta de proteínas',
+        'Descanso e recuperação: durma de 7 a 9 horas; sono curto aumenta a fome',
+    ],
+    'Ganho de Massa': [
+        'Suplementação: creatina (3-5 g/dia) e proteína em pó podem ajudar a atingir as metas',
+        'Descanso e recuperação: 48 horas entre treinos do mesmo grupo muscular e 7 a 9 horas de sono',
+    ],
+    'Manutenção': [
+        'Suplementação: normalmente desnecessária com alimentação variada',
+        'Descanso e recuperação: ao menos 1 a 2 dias leves por semana e 7 a 9 horas de sono',
+    ],
+    'Performance': [
+        'Suplementação: cafeína e carboidratos durante provas longas podem ajudar; consulte um profissional',
+        'Descanso e recuperação: planeje semanas de descarga e durma de 8 a 9 horas',
+    ]
+}
+
+MOTIVACAO = [
+    'Motivação: registre treinos e pesagens para acompanhar o progresso',
+    'Motivação: defina horários fixos para treinar e celebre cada meta semanal'
+]
+
+METAS_POR_OBJETIVO = {
+    'Emagrecimento': [
+        'Meta semanal: perder cerca de 0,5 kg por semana',
+        'Indicadores de progresso: peso, medida da cintura e disposição nos treinos',
+        'Ajustes: se o peso estabilizar por 2 semanas, reduza 100-200 kcal ou aumente a atividade'
+    ],
+    'Ganho de Massa': [
+        'Meta semanal: ganhar cerca de 0,25 kg por semana',
+        'Indicadores de progresso: peso, cargas nos exercícios e medidas de braço e coxa',
+        'Ajustes: se o peso não subir em 2 semanas, acrescente 150-200 kcal'
+    ],
+    'Manutenção': [
+        'Meta semanal: manter o peso em uma faixa de 1 kg',
+        'Indicadores de progresso: regularidade dos treinos, energia e qualidade do sono',
+        'Ajustes: revise as calorias se o peso sair da faixa por mais de 2 semanas'
+    ],
+    'Performance': [
+        'Meta semanal: completar os treinos planejados com boa recuperação',
+        'Indicadores de progresso: tempos, cargas e frequência cardíaca de repouso',
+        'Ajustes: reduza o volume se a recuperação piorar por vários dias'
+    ]
+}
+
+EVITAR_POR_RESTRICAO = {
+    'Nenhuma': ['Ultraprocessados, bebidas açucaradas e excesso de frituras'],
+    'Vegetariano': ['Carnes, peixes e frutos do mar', 'Gelatina e caldos de origem animal'],
+    'Vegano': ['Carnes, peixes, ovos, leite e derivados', 'Mel, gelatina e caldos de origem animal'],
+    'Sem Glúten': ['Trigo, cevada, centeio e malte', 'Pães, massas e biscoitos comuns; atenção à aveia não certificada'],
+    'Sem Lactose': ['Leite, creme de leite, requeijão e queijos frescos', 'Preparações com leite em pó'],
+    'Baixo Carboidrato': ['Açúcar, doces e refrigerantes', 'Pães, massas, arroz branco e farinhas refinadas'],
+    'Alergia a Nozes': ['Nozes, castanhas, amêndoas e avelãs', 'Pastas, granolas e doces que possam conter traços'],
+    'Alergia a Frutos do Mar': ['Camarão, lagosta, caranguejo, lula e mariscos', 'Molhos e caldos à base de frutos do mar']
+}
+
+ORDEM_SECOES = ['treino', 'recomendacoes', 'metas', 'nutricao']
+
+# Pedidos que continuam com a IA, por seção (a seção de treino só quando há limitações)
+PEDIDOS_PERSONALIZADOS = {
+    'nutricao': """RECOMENDAÇÕES NUTRICIONAIS:
+    - 3 opções de café da manhã, 3 de almoço, 3 de jantar e 5 lanches saudáveis
+    - Respeite as restrições e aproveite as preferências alimentares""",
+    'treino': """ADAPTAÇÕES DO TREINO:
+    - Ajustes e exercícios a evitar por causa das limitações físicas"""
+}
+
+# Refeições do pedido personalizado de nutrição (os alimentos a evitar vêm do conteúdo padrão)
+REFEICOES_PERSONALIZADAS = ('cafe_da_manha', 'almoco', 'jantar', 'lanches')
+
+# Tabelas indexadas pelas opções exatas do formulário: uma opção sem conteúdo falha já na importação
+_TREINO = {o: TREINO_POR_OBJETIVO[nome_opcao(o)] for o in GOALS}
+_RECOMENDACOES = {o: RECOMENDACOES_POR_OBJETIVO[nome_opcao(o)] for o in GOALS}
+_METAS = {o: METAS_POR_OBJETIVO[nome_opcao(o)] for o in GOALS}
+_HIDRATACAO = {o: HIDRATACAO_POR_NIVEL[nome_opcao(o)] for o in ACTIVITY_LEVELS}
+_PRECAUCOES = {o: PRECAUCOES_POR_ATIVIDADE[nome_opcao(o)] for o in PHYSICAL_ACTIVITIES}
+_EVITAR = {o: EVITAR_POR_RESTRICAO[nome_opcao(o)] for o in DIETARY_RESTRICTIONS}
+
+def secoes_personalizadas(dados_usuario: Dict) -> List[str]:
+    """Seções que ainda precisam da IA para o perfil."""
+    return ['nutricao', 'treino'] if (dados_usuario.get('limitacoes') or '').strip() else ['nutricao']
+
+@lru_cache(maxsize=4096)
+def _montar(objetivo: str, nivel_atividade: str, restricoes: Tuple[str, ...], atividades: Tuple[str, ...]) -> str:
+    secoes = secoes_vazias()
+    secoes['nutricao'] = {'evitar': [item for r in restricoes or ('Nenhuma 🍽️',) for item in _EVITAR.get(r, [])]}
+    secoes['treino'] = _TREINO[objetivo] + [_PRECAUCOES[a] for a in atividades if _PRECAUCOES.get(a)]
+    secoes['recomendacoes'] = [_HIDRATACAO[nivel_atividade]] + _RECOMENDACOES[objetivo] + MOTIVACAO
+    secoes['metas'] = _METAS[objetivo]
+    # Nutrição por último: a resposta da IA vem logo em seguida e começa pelas refeições
+    return '\n\n'.join(renderizar_secao(secoes, secao) for secao in ORDEM_SECOES)
+
+AVISO_SEM_IA = (
+    "> ⚠️ O assistente de IA está indisponível no momento. Estas são as recomendações padrão "
+    "para o seu perfil; envie o formulário novamente mais tarde para receber as sugestões personalizadas."
+)
+
+def conteudo_padrao(dados_usuario: Dict) -> str:
+    """Markdown das partes padrão das quatro seções para o perfil (em cache por combinação de opções)."""
+    return _montar(
+        dados_usuario['objetivo'],
+        dados_usuario['nivel_atividade'],
+        tuple(sorted(dados_usuario.get('restricoes') or [])),
+        tuple(dados_usuario.get('atividades') or [])
+    )
+
+def recomendacoes_locais(dados_usuario: Dict) -> str:
+    """Recomendações exibidas quando a IA falha ou está indisponível (sem nenhuma chamada ao modelo)."""
+    return f"{AVISO_SEM_IA}\n\n{conteudo_padrao(dados_usuario)}"
@@ -0,0 +1,270 @@
+import hashlib
+import numpy as np
+import pandas as pd
+import warnings
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+from config import PHYSICAL_ACTIVITIES, WEIGHT_TREND_SETTINGS
+from modelos_secoes import nome_opcao
+
+DIAS_SEMANA = ['Segunda', 'Terça', 'Quarta', 'Quinta', 'Sexta', 'Sábado', 'Domingo']
+INTENSIDADES = ['Leve', 'Moderada', 'Alta']
+EXERCICIO_PADRAO = 'Caminhada 🚶‍♂️'
+
+# Variação de peso semanal (kg) por objetivo; objetivos ausentes mantêm o peso
+VARIACAO_PESO_SEMANAL = {
+    'Emagrecimento': -0.5,
+    'Ganho de Massa': 0.25
+}
+
+# Tipos categóricos fixos: os códigos são estáveis entre planos e usuários
+TIPO_DIA_SEMANA = pd.CategoricalDtype(DIAS_SEMANA)
+TIPO_INTENSIDADE = pd.CategoricalDtype(INTENSIDADES)
+TIPO_EXERCICIO = pd.CategoricalDtype(
+    PHYSICAL_ACTIVITIES + ([EXERCICIO_PADRAO] if EXERCICIO_PADRAO not in PHYSICAL_ACTIVITIES else [])
+)
+CODIGO_EXERCICIO = {nome: codigo for codigo, nome in enumerate(TIPO_EXERCICIO.categories)}
+_OPCAO_POR_NOME = {nome_opcao(nome).lower(): nome for nome in TIPO_EXERCICIO.categories}
+
+class PlanoCompacto:
+    """Plano de uma sessão guardado em arrays: 8 bytes por dia, sem strings repetidas.
+
+    Os dias são consecutivos a partir de `data_inicio`, então as datas e os dias
+    da semana não são guardados; exercício e intensidade são os códigos dos tipos
+    categóricos fixos (int8), a duração é int16 e o peso projetado float32.
+    `para_dataframe` monta o DataFrame tipado apenas na hora de exibir ou exportar.
+    """
+
+    __slots__ = ('data_inicio', 'exercicio', 'intensidade', 'duracao', 'peso_projetado', 'assinatura')
+
+    def __init__(
+        self,
+        data_inicio: np.datetime64,
+        exercicio: np.ndarray,
+        intensidade: np.ndarray,
+        duracao: np.ndarray,
+        peso_projetado: np.ndarray
+    ):
+        self.data_inicio = np.datetime64(data_inicio, 'D')
+        self.exercicio = np.asarray(exercicio, dtype=np.int8)
+        self.intensidade = np.asarray(intensidade, dtype=np.int8)
+        self.duracao = np.asarray(duracao, dtype=np.int16)
+        self.peso_projetado = np.asarray(peso_projetado, dtype=np.float32)
+        # Identifica o conteúdo do plano (ex.: cache dos gráficos) sem re-hashear um DataFrame
+        digest = hashlib.sha256(str(self.data_inicio).encode('ascii'))
+        for valores in (self.exercicio, self.intensidade, self.duracao, self.peso_projetado):
+            digest.update(valores.tobytes())
+        self.assinatura = digest.hexdigest()
+
+    @classmethod
+    def de_dataframe(cls, plano_df: pd.DataFrame) -> 'PlanoCompacto':
+        """Converte um plano (de criar_plano_treino_df, do histórico ou com colunas de texto)."""
+        datas = pd.to_datetime(plano_df['data'], dayfirst=True)
+        return cls(
+            datas.iloc[0].to_datetime64() if len(datas) else np.datetime64(date.today()),
+            pd.Categorical(plano_df['exercicio'], dtype=TIPO_EXERCICIO).codes,
+            pd.Categorical(plano_df['intensidade'], dtype=TIPO_INTENSIDADE).codes,
+            plano_df['duracao'].to_numpy(),
+            plano_df['peso_projetado'].to_numpy()
+        )
+
+    def __len__(self) -> int:
+        return len(self.duracao)
+
+    def para_dataframe(self) -> pd.DataFrame:
+        """DataFrame tipado do plano (datas reais, categorias, int16), como criar_plano_treino_df."""
+        datas = pd.date_range(self.data_inicio, periods=len(self), freq='D')
+        return pd.DataFrame({
+            'data': datas.values,
+            'dia_semana': pd.Categorical.from_codes(datas.weekday.values, dtype=TIPO_DIA_SEMANA),
+            'exercicio': pd.Categorical.from_codes(self.exercicio, dtype=TIPO_EXERCICIO),
+            'intensidade': pd.Categorical.from_codes(self.intensidade, dtype=TIPO_INTENSIDADE),
+            'duracao': self.duracao,
+            'peso_projetado': np.round(self.peso_projetado.astype(np.float64), 2)
+        })
+
+def variacao_semanal(objetivo: str) -> float:
+    """Retorna a variação de peso semanal (kg) associada ao objetivo."""
+    for chave, variacao in VARIACAO_PESO_SEMANAL.items():
+        if chave in objetivo:
+            return variacao
+    return 0.0
+
+def calcular_peso_projetado_lote(
+    peso_inicial: Union[float, np.ndarray],
+    objetivo: Union[str, Sequence[str]],
+    dia: Union[int, np.ndarray]
+) -> np.ndarray:
+    """Versão vetorizada de utils.calcular_peso_projetado (aceita arrays com broadcast)."""
+    if isinstance(objetivo, str):
+        variacao = variacao_semanal(objetivo)
+    else:
+        variacao = np.array([variacao_semanal(o) for o in objetivo], dtype=np.float64)
+    return np.asarray(peso_inicial, dtype=np.float64) + (variacao * np.asarray(dia, dtype=np.float64) / 7)
+
+def _validar_preferencias(preferencias: Optional[List[str]]) -> List[str]:
+    """Mapeia as atividades para o tipo categórico de exercícios.
+
+    Atividades sem o emoji do formulário (ex.: 'Corrida') usam a opção correspondente;
+    as que não existem no tipo são descartadas com um aviso (o formulário já só oferece
+    as opções válidas; perfis em lote sem nenhuma atividade conhecida usam EXERCICIO_PADRAO).
+    """
+    validas = []
+    for atividade in preferencias or []:
+        opcao = atividade if atividade in CODIGO_EXERCICIO else _OPCAO_POR_NOME.get(nome_opcao(str(atividade)).strip().lower())
+        if opcao is None:
+            warnings.warn(f"Atividade desconhecida ignorada no plano: {atividade!r}")
+        else:
+            validas.append(opcao)
+    return validas
+
+def _gerar_planos(
+    preferencias: List[List[str]],
+    duracoes: np.ndarray,
+    objetivos: List[str],
+    pesos: np.ndarray,
+    rng: np.random.Generator,
+    data_inicio: date
+) -> pd.DataFrame:
+    """Gera em uma única passada os dias de todos os planos, empilhados por usuário."""
+    duracoes = np.asarray(duracoes, dtype=np.int64)
+    usuario = np.repeat(np.arange(len(duracoes)), duracoes)
+    inicio_usuario = np.concatenate(([0], np.cumsum(duracoes)[:-1]))
+    dia = np.arange(len(usuario)) - np.repeat(inicio_usuario, duracoes)
+
+    datas = pd.date_range(data_inicio, periods=int(duracoes.max()) if len(duracoes) else 0, freq='D')
+    data = datas.values[dia]
+    dia_semana = datas.weekday.values[dia]
+    fim_de_semana = dia_semana >= 5
+
+    # Sorteios vetorizados: fim de semana é leve (30-45 min); dias úteis são moderados ou altos (45-75 min)
+    n = len(usuario)
+    intensidade = np.where(fim_de_semana, 0, rng.integers(1, 3, size=n))
+    duracao = np.where(fim_de_semana, rng.integers(30, 46, size=n), rng.integers(45, 76, size=n))
+
+    # Exercício sorteado entre as preferências de cada usuário (códigos do tipo categórico)
+    codigos_pref = [[CODIGO_EXERCICIO[e] for e in (p or [EXERCICIO_PADRAO])] for p in preferencias]
+    qtd_pref = np.array([len(c) for c in codigos_pref])
+    inicio_pref = np.concatenate(([0], np.cumsum(qtd_pref)[:-1]))
+    todos_codigos = np.fromiter((c for codigos in codigos_pref for c in codigos), dtype=np.int64)
+    sorteio = (rng.random(n) * qtd_pref[usuario]).astype(np.int64)
+    exercicio = todos_codigos[inicio_pref[usuario] + sorteio]
+
+    variacoes = np.array([variacao_semanal(o) for o in objetivos], dtype=np.float64)
+    peso_projetado = np.round(np.asarray(pesos, dtype=np.float64)[usuario] + variacoes[usuario] * dia / 7, 2)
+
+    return pd.DataFrame({
+        'usuario': usuario.astype(np.int32),
+        'dia': dia.astype(np.int16),
+        'data': data,
+        'dia_semana': pd.Categorical.from_codes(dia_semana, dtype=TIPO_DIA_SEMANA),
+        'exercicio': pd.Categorical.from_codes(exercicio, dtype=TIPO_EXERCICIO),
+        'intensidade': pd.Categorical.from_codes(intensidade, dtype=TIPO_INTENSIDADE),
+        'duracao': duracao.astype(np.int16),
+        'peso_projetado': peso_projetado
+    })
+
+def criar_plano_treino_df(
+    preferencias: List[str],
+    duracao_plano: int,
+    objetivo: str,
+    limitacoes: str,
+    peso_inicial: float,
+    seed: Optional[int] = None,
+    data_inicio: Optional[date] = None
+) -> pd.DataFrame:
+    """Cria o plano de treino já como DataFrame tipado (datas reais, categorias, int16).
+
+    Com a mesma `seed` e `data_inicio` o plano gerado é sempre idêntico.
+    """
+    rng = np.random.default_rng(seed)
+    df = _gerar_planos(
+        [_validar_preferencias(preferencias)], np.array([duracao_plano]), [objetivo], np.array([peso_inicial]),
+        rng, data_inicio or date.today()
+    )
+    return df.drop(columns=['usuario', 'dia'])
+
+def criar_planos_lote(
+    perfis: pd.DataFrame,
+    seed: Optional[int] = None,
+    data_inicio: Optional[date] = None
+) -> pd.DataFrame:
+    """Cria os planos de vários usuários de uma vez.
+
+    `perfis` deve conter as colunas atividades, duracao_plano, objetivo e peso.
+    O resultado tem uma linha por dia de cada plano; a coluna `usuario` é a
+    posição do perfil em `perfis` (e `id`, se existir, é repetida por dia).
+    """
+    rng = np.random.default_rng(seed)
+    preferencias = [_validar_preferencias(atividades) for atividades in perfis['atividades']]
+    df = _gerar_planos(
+        preferencias,
+        perfis['duracao_plano'].to_numpy(),
+        list(perfis['objetivo']),
+        perfis['peso'].to_numpy(),
+        rng,
+        data_inicio or date.today()
+    )
+    if 'id' in perfis.columns:
+        df.insert(0, 'id', perfis['id'].to_numpy()[df['usuario'].to_numpy()])
+    return df
+
+def ajustar_tendencia_peso(
+    dias: np.ndarray,
+    pesos: np.ndarray,
+    peso_inicial: float,
+    objetivo: str,
+    alpha: float = WEIGHT_TREND_SETTINGS['alpha'],
+    beta: float = WEIGHT_TREND_SETTINGS['beta'],
+    max_variacao_semanal: float = WEIGHT_TREND_SETTINGS['max_variacao_semanal']
+) -> Tuple[float, float]:
+    """Ajusta nível e tendência diária do peso às pesagens (suavização de Holt).
+
+    `dias` são os dias do plano de cada pesagem (0 = início), em ordem crescente.
+    O ponto de partida é o peso inicial com a tendência do objetivo, então poucas
+    pesagens ajustam a projeção aos poucos; intervalos irregulares entre pesagens
+    são considerados na atualização da tendência.
+    """
+    limite = max_variacao_semanal / 7
+    nivel, tendencia, dia_anterior = float(peso_inicial), variacao_semanal(objetivo) / 7, 0
+    for dia, peso in zip(dias.tolist(), pesos.tolist()):
+        intervalo = dia - dia_anterior
+        previsto = nivel + tendencia * intervalo
+        novo_nivel = alpha * peso + (1 - alpha) * previsto
+        if intervalo > 0:
+            tendencia = beta * (novo_nivel - nivel) / intervalo + (1 - beta) * tendencia
+            tendencia = min(max(tendencia, -limite), limite)
+        nivel, dia_anterior = novo_nivel, dia
+    return nivel, tendencia
+
+def reprojetar_peso(
+    plano_df: pd.DataFrame,
+    pesagens: Iterable[Dict],
+    peso_inicial: float,
+    objetivo: str,
+    parametros: Optional[Dict] = None
+) -> pd.DataFrame:
+    """Atualiza `peso_projetado` dos dias após a última pesagem, sem regerar o plano.
+
+    `pesagens` são dicts com `data` (date ou aaaa-mm-dd) e `peso` (kg). Os dias até a
+    última pesagem ficam como estavam; os seguintes seguem a tendência ajustada por
+    ajustar_tendencia_peso. Retorna um novo DataFrame (o original não é alterado).
+    """
+    pesagens = pd.DataFrame(list(pesagens), columns=['data', 'peso'])
+    if pesagens.empty:
+        return plano_df
+    datas_plano = pd.to_datetime(plano_df['data'], dayfirst=True).to_numpy()
+    inicio = datas_plano[0]
+    pesagens = pesagens.assign(data=pd.to_datetime(pesagens['data'])).sort_values('data')
+    dias = ((pesagens['data'].to_numpy() - inicio) // np.timedelta64(1, 'D')).astype(np.int64)
+    nivel, tendencia = ajustar_tendencia_peso(
+        dias, pesagens['peso'].to_numpy(dtype=np.float64), peso_inicial, objetivo,
+        **{**WEIGHT_TREND_SETTINGS, **(parametros or {})}
+    )
+
+    dias_plano = (datas_plano - inicio) // np.timedelta64(1, 'D')
+    restantes = dias_plano > dias[-1]
+    peso_projetado = plano_df['peso_projetado'].to_numpy(dtype=np.float64, copy=True)
+    peso_projetado[restantes] = np.round(nivel + tendencia * (dias_plano[restantes] - dias[-1]), 2)
+    return plano_df.assign(peso_projetado=peso_projetado)
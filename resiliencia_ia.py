@@ -0,0 +1,263 @@
+"""Camada de resiliência das chamadas ao modelo: prazos, novas tentativas, hedge e disjuntor.
+
+- Cada chamada tem um prazo total e cada tentativa um tempo máximo (no streaming,
+  entre um chunk e o próximo); tentativas que falham são repetidas com espera
+  exponencial e jitter ("full jitter"), sem passar do prazo.
+- Com `hedge`, uma chamada sem resposta após o percentil `hedge_percentil` das
+  latências recentes recebe uma requisição duplicada; vale a primeira resposta.
+- `reservar` (opcional em invoke/stream) é chamado antes de cada requisição enviada ao
+  provedor, inclusive novas tentativas e hedges, para que todas passem pelo limitador de
+  RPM/TPM; o hedge só é disparado se houver cota imediata.
+- `Disjuntor`: após `falhas_para_abrir` falhas seguidas, recusa chamadas por
+  `aberto_segundos` (erro IAIndisponivel imediato, para o app exibir o plano
+  local na hora) e depois deixa passar uma chamada de teste.
+
+Os desfechos são contados em `ia_chamadas` (por desfecho) e `ia_disjuntor`.
+"""
+import queue
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from config import AI_RESILIENCE
+from metricas import incrementar
+
+FECHADO = 'fechado'
+ABERTO = 'aberto'
+MEIO_ABERTO = 'meio_aberto'
+
+class IAIndisponivel(Exception):
+    """O disjuntor está aberto: a chamada foi recusada sem ir ao provedor."""
+
+class Disjuntor:
+    """Circuit breaker por processo: fechado -> aberto (após falhas seguidas) -> meio aberto (uma chamada de teste)."""
+
+    def __init__(self, falhas_para_abrir: int = 5, aberto_segundos: float = 30):
+        self.falhas_para_abrir = falhas_para_abrir
+        self.aberto_segundos = aberto_segundos
+        self.estado = FECHADO
+        self.falhas = 0
+        self._aberto_ate = 0.0
+        self._teste_em_andamento = False
+        self._lock = threading.Lock()
+
+    def permitir(self) -> bool:
+        """Se uma chamada pode ir ao provedor agora."""
+        with self._lock:
+            if self.estado == FECHADO:
+                return True
+            if self._teste_em_andamento or time.monotonic() < self._aberto_ate:
+                return False
+            self.estado = MEIO_ABERTO
+            self._teste_em_andamento = True
+            return True
+
+    def registrar_sucesso(self) -> None:
+        with self._lock:
+            if self.estado != FECHADO:
+                incrementar('ia_disjuntor', etapa=FECHADO)
+            self.estado = FECHADO
+            self.falhas = 0
+            self._teste_em_andamento = False
+
+    def desistir(self) -> None:
+        """A chamada liberada não chegou ao provedor: libera a vaga da chamada de teste."""
+        with self._lock:
+            self._teste_em_andamento = False
+
+    def registrar_falha(self) -> None:
+        with self._lock:
+            self.falhas += 1
+            self._teste_em_andamento = False
+            if self.estado == MEIO_ABERTO or self.falhas >= self.falhas_para_abrir:
+                if self.estado != ABERTO:
+                    incrementar('ia_disjuntor', etapa=ABERTO)
+                self.estado = ABERTO
+                self._aberto_ate = time.monotonic() + self.aberto_segundos
+
+class ModeloResiliente:
+    """Envolve o cliente do modelo (invoke/stream) com prazos, novas tentativas, hedge e disjuntor.
+
+    Tem a mesma interface usada pelo app (`invoke` e `stream`); outros atributos
+    são repassados ao cliente. As tentativas rodam em um pool próprio: uma
+    tentativa que estoura o tempo é abandonada (a resposta tardia é descartada).
+    """
+
+    def __init__(self, modelo: Any, settings: Optional[Dict] = None):
+        self.modelo = modelo
+        self.settings = {**AI_RESILIENCE, **(settings or {})}
+        self.disjuntor = Disjuntor(self.settings['falhas_para_abrir'], self.settings['aberto_segundos'])
+        self._latencias: deque = deque(maxlen=200)
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.settings['max_chamadas_simultaneas'], thread_name_prefix='fitia-ia-chamada'
+        )
+
+    def __getattr__(self, nome: str):
+        return getattr(self.modelo, nome)
+
+    # Auxiliares
+
+    def _liberar(self) -> None:
+        if not self.disjuntor.permitir():
+            incrementar('ia_chamadas', etapa='disjuntor_aberto')
+            raise IAIndisponivel("Erro: o modelo de IA está indisponível no momento")
+
+    def _reservar(self, reservar: Optional[Callable[[bool], bool]]) -> None:
+        """Espera a cota da próxima requisição (ex.: limitador de RPM/TPM do processo)."""
+        if reservar is None:
+            return
+        try:
+            reservar(True)
+        except Exception:
+            self.disjuntor.desistir()
+            raise
+
+    def _esperar_nova_tentativa(self, tentativa: int, prazo: float) -> bool:
+        """Espera exponencial com jitter antes da próxima tentativa; False se não houver tempo ou tentativas."""
+        if tentativa + 1 >= self.settings['tentativas']:
+            return False
+        espera = random.uniform(0, min(self.settings['espera_max_segundos'],
+                                       self.settings['espera_base_segundos'] * 2 ** tentativa))
+        if time.monotonic() + espera >= prazo:
+            return False
+        time.sleep(espera)
+        incrementar('ia_chamadas', etapa='retentativa')
+        return True
+
+    def _registrar_erro(self, erro: Exception) -> None:
+        self.disjuntor.registrar_falha()
+        incrementar('ia_chamadas', etapa='timeout' if isinstance(erro, TimeoutError) else 'erro')
+
+    def _atraso_hedge(self) -> Optional[float]:
+        """Latência no percentil configurado das tentativas recentes (None sem hedge ou sem amostras)."""
+        if not self.settings['hedge']:
+            return None
+        with self._lock:
+            if len(self._latencias) < self.settings['hedge_min_amostras']:
+                return None
+            latencias = sorted(self._latencias)
+        return latencias[min(len(latencias) - 1, int(len(latencias) * self.settings['hedge_percentil']))]
+
+    def _tentar(self, funcao: Callable[[], Any], prazo: float, reservar: Optional[Callable[[bool], bool]] = None) -> Any:
+        """Uma tentativa de `funcao`, com hedge opcional; TimeoutError se não houver resposta a tempo.
+
+        A cota da requisição principal já foi reservada; `reservar(False)` reserva a do hedge.
+        """
+        inicio = time.monotonic()
+        limite = inicio + min(self.settings['timeout_tentativa_segundos'], prazo - inicio)
+        pendentes: List[Future] = [self._executor.submit(funcao)]
+        hedge: Optional[Future] = None
+        atraso = self._atraso_hedge()
+        erro: Optional[Exception] = None
+        try:
+            while pendentes:
+                if hedge is None and atraso is not None and inicio + atraso < limite:
+                    espera = inicio + atraso - time.monotonic()
+                else:
+                    espera = limite - time.monotonic()
+                prontos, _ = wait(pendentes, timeout=max(espera, 0), return_when=FIRST_COMPLETED)
+                for futuro in prontos:
+                    pendentes.remove(futuro)
+                    if futuro.exception() is None:
+                        with self._lock:
+                            self._latencias.append(time.monotonic() - inicio)
+                        if futuro is hedge:
+                            incrementar('ia_chamadas', etapa='hedge_venceu')
+                        return futuro.result()
+                    erro = futuro.exception()
+                if prontos:
+                    continue
+                if hedge is None and atraso is not None and time.monotonic() < limite:
+                    atraso = None
+                    if reservar is not None and not reservar(False):
+                        continue  # sem cota livre agora: o hedge não passa na frente da fila
+                    # A resposta passou do percentil: dispara a requisição duplicada
+                    incrementar('ia_chamadas', etapa='hedge')
+                    hedge = self._executor.submit(funcao)
+                    pendentes.append(hedge)
+                    continue
+                if time.monotonic() >= limite:
+                    raise TimeoutError(f"Erro: o modelo de IA não respondeu em {limite - inicio:.1f}s")
+            raise erro
+        finally:
+            for futuro in pendentes:
+                futuro.cancel()
+
+    # Interface do cliente
+
+    def invoke(self, prompt: str, reservar: Optional[Callable[[bool], bool]] = None, **kwargs) -> Any:
+        prazo = time.monotonic() + self.settings['prazo_segundos']
+        tentativa = 0
+        while True:
+            self._liberar()
+            self._reservar(reservar)
+            try:
+                resposta = self._tentar(lambda: self.modelo.invoke(prompt, **kwargs), prazo, reservar)
+            except Exception as e:
+                self._registrar_erro(e)
+                if not self._esperar_nova_tentativa(tentativa, prazo):
+                    raise Exception(f"Erro ao chamar o modelo de IA ({tentativa + 1} tentativa(s)): {e}") from e
+                tentativa += 1
+                continue
+            self.disjuntor.registrar_sucesso()
+            incrementar('ia_chamadas', etapa='sucesso')
+            return resposta
+
+    def stream(self, prompt: str, reservar: Optional[Callable[[bool], bool]] = None, **kwargs) -> Iterator[Any]:
+        """Streaming com prazo entre chunks; só é repetido se nenhum chunk tiver sido entregue."""
+        prazo = time.monotonic() + self.settings['prazo_segundos']
+        tentativa = 0
+        while True:
+            self._liberar()
+            self._reservar(reservar)
+            partes: 'queue.Queue' = queue.Queue()
+            parar = threading.Event()
+
+            def produzir() -> None:
+                try:
+                    for chunk in self.modelo.stream(prompt, **kwargs):
+                        if parar.is_set():
+                            return
+                        partes.put(('chunk', chunk))
+                    partes.put(('fim', None))
+                except Exception as e:
+                    partes.put(('erro', e))
+
+            entregues = 0
+            encerrada = False
+            try:
+                self._executor.submit(produzir)
+                while True:
+                    espera = max(min(self.settings['timeout_tentativa_segundos'], prazo - time.monotonic()), 0)
+                    try:
+                        tipo, valor = partes.get(timeout=espera)
+                    except queue.Empty:
+                        raise TimeoutError(f"Erro: o modelo de IA parou de responder por {espera:.1f}s")
+                    if tipo == 'erro':
+                        raise valor
+                    if tipo == 'fim':
+                        break
+                    entregues += 1
+                    yield valor
+                encerrada = True
+            except Exception as e:
+                encerrada = True
+                self._registrar_erro(e)
+                # Texto já entregue não pode ser gerado de novo sem duplicar a resposta
+                if entregues or not self._esperar_nova_tentativa(tentativa, prazo):
+                    raise Exception(f"Erro no streaming do modelo de IA ({tentativa + 1} tentativa(s)): {e}") from e
+                tentativa += 1
+                continue
+            finally:
+                parar.set()
+                if not encerrada:
+                    # Stream fechado pelo consumidor antes do fim (GeneratorExit, ex.: rerun): não é
+                    # falha do provedor, mas libera a chamada de teste do disjuntor, se for o caso
+                    self.disjuntor.desistir()
+            self.disjuntor.registrar_sucesso()
+            incrementar('ia_chamadas', etapa='sucesso')
+            return
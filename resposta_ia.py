@@ -0,0 +1,251 @@
+import json
+import re
+import unicodedata
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+# Palavras-chave (sem acento, maiúsculas) que identificam cada seção da resposta
+SECOES_CHAVES = [
+    ('nutricao', ('NUTRI', 'ALIMENTA')),
+    ('treino', ('TREINO', 'EXERCICIO')),
+    ('recomendacoes', ('RECOMENDACOES GERAIS', 'GERAIS')),
+    ('metas', ('METAS', 'MARCOS'))
+]
+
+# Títulos (normalizados) que abrem uma seção em qualquer nível de cabeçalho; os demais
+# cabeçalhos com palavras-chave só trocam de seção se forem numerados ou de nível acima
+# do cabeçalho da seção corrente (ex.: "### Refeição pré-treino" continua na nutrição)
+SECOES_TITULOS = {
+    'RECOMENDACOES NUTRICIONAIS': 'nutricao',
+    'NUTRICAO': 'nutricao',
+    'ALIMENTACAO': 'nutricao',
+    'PLANO ALIMENTAR': 'nutricao',
+    'DICAS DE TREINO': 'treino',
+    'ADAPTACOES DO TREINO': 'treino',
+    'PLANO DE TREINO': 'treino',
+    'TREINO': 'treino',
+    'EXERCICIOS': 'treino',
+    'RECOMENDACOES GERAIS': 'recomendacoes',
+    'METAS E MARCOS': 'metas',
+    'METAS': 'metas'
+}
+
+# Subseções das recomendações nutricionais
+REFEICOES_CHAVES = [
+    ('cafe_da_manha', ('CAFE DA MANHA', 'DESJEJUM')),
+    ('almoco', ('ALMOCO',)),
+    ('jantar', ('JANTAR',)),
+    ('lanches', ('LANCHE',)),
+    ('evitar', ('EVITAR', 'EVITADOS'))
+]
+
+TITULOS_SECOES = {
+    'nutricao': '🥗 Recomendações Nutricionais',
+    'treino': '💪 Dicas de Treino',
+    'recomendacoes': '💡 Recomendações Gerais',
+    'metas': '🎯 Metas e Marcos'
+}
+
+TITULOS_REFEICOES = {
+    'cafe_da_manha': 'Café da manhã',
+    'almoco': 'Almoço',
+    'jantar': 'Jantar',
+    'lanches': 'Lanches',
+    'evitar': 'Alimentos a evitar',
+    'geral': 'Observações'
+}
+
+_MARCADOR_ITEM = re.compile(r'^\s*(?:[-*•+]|\d+[.)])\s+')
+_CABECALHO = re.compile(r'^\s*(?:#{1,6}\s+|\d+[.)]\s+[A-ZÀ-Ú ]{4,}|\*\*[^*]+\*\*:?\s*$)')
+_NUMERADO = re.compile(r'^\s*(?:#{1,6}\s+)?(?:\*\*)?\d+[.)]\s')
+# Nível de um cabeçalho em negrito ou numerado sem '#' (abaixo de qualquer '#')
+_NIVEL_SEM_MARCACAO = 7
+
+def _normalizar(texto: str) -> str:
+    sem_acento = unicodedata.normalize('NFKD', texto).encode('ascii', 'ignore').decode('ascii')
+    return sem_acento.upper()
+
+def _limpar_item(linha: str) -> str:
+    return _MARCADOR_ITEM.sub('', linha).replace('**', '').strip().rstrip(':').strip()
+
+def _identificar(texto: str, chaves: list) -> Optional[str]:
+    normalizado = _normalizar(texto)
+    for nome, palavras in chaves:
+        if any(palavra in normalizado for palavra in palavras):
+            return nome
+    return None
+
+def _titulo(texto: str) -> str:
+    """Texto do cabeçalho normalizado, sem marcação, numeração, emojis e pontuação."""
+    return ' '.join(re.sub(r'[^A-Z ]', ' ', _normalizar(re.sub(r'^[#\s]*(?:\d+[.)])?', '', texto))).split())
+
+def _nivel(linha: str) -> int:
+    cerquilhas = re.match(r'\s*(#{1,6})\s', linha)
+    return len(cerquilhas.group(1)) if cerquilhas else _NIVEL_SEM_MARCACAO
+
+def secoes_vazias() -> Dict:
+    """Estrutura padrão das seções (mesmo formato de utils.processar_resposta_ia)."""
+    return {
+        'nutricao': {},
+        'treino': [],
+        'recomendacoes': [],
+        'metas': [],
+        'markdown': {}
+    }
+
+class ParserRespostaIA:
+    """Parser incremental e de passada única da resposta da IA.
+
+    Recebe o texto em partes (`alimentar`), processa apenas linhas completas e
+    mantém a seção/refeição corrente, de modo que cada caractere é lido uma vez.
+    `finalizar` processa o restante e devolve as seções tipadas, além do
+    Markdown original de cada seção para renderização independente.
+    """
+
+    def __init__(self):
+        self.secoes = secoes_vazias()
+        self._buffer = ''
+        self._secao = 'introducao'
+        self._nivel_secao = 0
+        self._refeicao = None
+        self._markdown: Dict[str, List[str]] = {}
+
+    def alimentar(self, parte: str) -> None:
+        """Adiciona uma parte do texto (por exemplo, um chunk do streaming)."""
+        self._buffer += parte
+        *linhas, self._buffer = self._buffer.split('\n')
+        for linha in linhas:
+            self._processar_linha(linha)
+
+    def finalizar(self) -> Dict:
+        """Processa o texto pendente e retorna as seções."""
+        if self._buffer:
+            self._processar_linha(self._buffer)
+            self._buffer = ''
+        self.secoes['markdown'] = {
+            secao: '\n'.join(linhas).strip() for secao, linhas in self._markdown.items()
+        }
+        return self.secoes
+
+    def _processar_linha(self, linha: str) -> None:
+        texto = linha.strip()
+        marcador = _MARCADOR_ITEM.match(linha)
+        cabecalho = bool(_CABECALHO.match(linha))
+
+        # Na nutrição, "Lanche pré-treino" é uma refeição antes de ser uma seção
+        refeicao = None
+        if self._secao == 'nutricao' and (cabecalho or (texto.endswith(':') and not marcador)):
+            refeicao = _identificar(texto, REFEICOES_CHAVES)
+
+        secao = self._nova_secao(linha, texto, cabecalho, bool(marcador)) if refeicao is None else None
+        if secao is not None:
+            self._secao = secao
+            self._refeicao = None
+            self._markdown.setdefault(secao, []).append(linha)
+            return
+
+        self._markdown.setdefault(self._secao, []).append(linha)
+        if self._secao == 'nutricao' and refeicao is None and cabecalho and not marcador:
+            # Subtítulo que não é uma refeição conhecida (ex.: "Refeição pré-treino") vira o próprio grupo
+            refeicao = texto.lstrip('#').replace('**', '').strip().rstrip(':').strip() or None
+        if refeicao is not None:
+            self._refeicao = refeicao
+            return
+
+        item = _limpar_item(texto)
+        if not item or self._secao == 'introducao':
+            return
+        if self._secao != 'nutricao':
+            self.secoes[self._secao].append(item)
+            return
+
+        # "- Café da manhã: ovos mexidos..." também identifica a refeição do item
+        rotulo, separador, conteudo = item.partition(':')
+        refeicao = _identificar(rotulo, REFEICOES_CHAVES) if separador and marcador else None
+        if refeicao is not None and conteudo.strip():
+            self.secoes['nutricao'].setdefault(refeicao, []).append(conteudo.strip())
+        else:
+            self.secoes['nutricao'].setdefault(self._refeicao or 'geral', []).append(item)
+
+    def _nova_secao(self, linha: str, texto: str, cabecalho: bool, marcador: bool) -> Optional[str]:
+        """Seção aberta pela linha, ou None se ela não muda de seção."""
+        if not cabecalho and (marcador or not texto.endswith(':')):
+            return None
+        titulo = SECOES_TITULOS.get(_titulo(texto.replace('**', '')))
+        if titulo is None and not cabecalho:
+            return None
+        secao = titulo or _identificar(texto, SECOES_CHAVES)
+        if secao is None:
+            return None
+        nivel = _nivel(linha)
+        if (titulo is None and self._secao != 'introducao' and not _NUMERADO.match(linha)
+                and nivel >= self._nivel_secao):
+            return None
+        self._nivel_secao = nivel
+        return secao
+
+def processar_texto(resposta: str) -> Dict:
+    """Processa uma resposta completa em uma única passada."""
+    parser = ParserRespostaIA()
+    parser.alimentar(resposta)
+    return parser.finalizar()
+
+# Refeições pedidas na seção de nutrição do modo de saída estruturada
+REFEICOES_JSON = ('cafe_da_manha', 'almoco', 'jantar', 'lanches', 'evitar')
+
+@lru_cache(maxsize=64)
+def instrucao_json(secoes: Tuple[str, ...], refeicoes: Tuple[str, ...] = REFEICOES_JSON) -> str:
+    """Instrução adicionada ao prompt no modo de saída estruturada, só com as seções pedidas."""
+    campos = [
+        '"nutricao": {' + ', '.join(f'"{r}": [...]' for r in refeicoes) + '}' if secao == 'nutricao'
+        else f'"{secao}": [...]'
+        for secao in secoes
+    ]
+    return ("Responda APENAS com um objeto JSON válido, sem texto fora dele, no formato:\n"
+            "{" + ', '.join(campos) + "}\n"
+            "Cada lista contém frases curtas em português.")
+
+def converter_json_em_markdown(resposta: str) -> str:
+    """Converte a resposta do modo JSON em Markdown; se não for JSON válido, retorna o texto original."""
+    secoes = processar_json(resposta)
+    return secoes_para_markdown(secoes) if secoes is not None else resposta
+
+def processar_json(resposta: str) -> Optional[Dict]:
+    """Converte a resposta do modo JSON em seções; retorna None se não for JSON válido."""
+    # Ignora cercas de código (```json) e qualquer texto em volta do objeto
+    texto = resposta.strip()
+    inicio, fim = texto.find('{'), texto.rfind('}')
+    if inicio < 0 or fim < 0:
+        return None
+    try:
+        dados = json.loads(texto[inicio:fim + 1])
+    except json.JSONDecodeError:
+        return None
+    if not isinstance(dados, dict):
+        return None
+
+    secoes = secoes_vazias()
+    nutricao = dados.get('nutricao') or {}
+    if isinstance(nutricao, dict):
+        secoes['nutricao'] = {k: [str(i) for i in v] for k, v in nutricao.items() if isinstance(v, list)}
+    for secao in ('treino', 'recomendacoes', 'metas'):
+        if isinstance(dados.get(secao), list):
+            secoes[secao] = [str(item) for item in dados[secao]]
+    secoes['markdown'] = {secao: renderizar_secao(secoes, secao) for secao in TITULOS_SECOES}
+    return secoes
+
+def renderizar_secao(secoes: Dict, secao: str) -> str:
+    """Gera o Markdown de uma única seção a partir da estrutura tipada."""
+    linhas = [f"### {TITULOS_SECOES[secao]}", '']
+    if secao == 'nutricao':
+        for refeicao, itens in secoes['nutricao'].items():
+            linhas.append(f"**{TITULOS_REFEICOES.get(refeicao, refeicao)}**")
+            linhas += [f"- {item}" for item in itens]
+            linhas.append('')
+    else:
+        linhas += [f"- {item}" for item in secoes[secao]]
+    return '\n'.join(linhas).strip()
+
+def secoes_para_markdown(secoes: Dict) -> str:
+    """Monta o Markdown completo a partir das seções não vazias (usado no modo JSON)."""
+    return '\n\n'.join(renderizar_secao(secoes, secao) for secao in TITULOS_SECOES if secoes.get(secao))
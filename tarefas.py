@@ -0,0 +1,136 @@
+"""Fila de tarefas em segundo plano para as gerações da IA.
+
+As sessões do Streamlit apenas submetem a tarefa e consultam o estado dela a
+cada rerun, sem segurar a thread do script durante a chamada ao modelo. As
+tarefas ficam em memória no processo (servidas por um pool de threads) e podem
+ser retomadas por id ou por chave por qualquer sessão, por exemplo depois de
+recarregar a página; concluídas são descartadas após `ttl_segundos`.
+"""
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from config import JOB_SETTINGS
+from metricas import incrementar, observar
+
+PENDENTE = 'pendente'
+EXECUTANDO = 'executando'
+CONCLUIDA = 'concluida'
+ERRO = 'erro'
+
+class Tarefa:
+    """Uma tarefa da fila: estado, resultado (ou erro) e o contexto para retomá-la.
+
+    `andamento` pode ser preenchido pela própria tarefa com um resultado parcial
+    (ex.: o StreamRecomendacoes com o texto recebido até o momento).
+    """
+
+    def __init__(self, chave: str, contexto: Any = None):
+        self.id = uuid.uuid4().hex
+        self.chave = chave
+        self.contexto = contexto
+        self.estado = PENDENTE
+        self.andamento: Any = None
+        self.resultado: Any = None
+        self.erro: Optional[Exception] = None
+        self.criada_em = time.time()
+        self.iniciada_em: Optional[float] = None
+        self.concluida_em: Optional[float] = None
+        self._fim = threading.Event()
+
+    @property
+    def concluida(self) -> bool:
+        return self._fim.is_set()
+
+    def aguardar(self, timeout: Optional[float] = None) -> bool:
+        """Espera até `timeout` segundos pelo fim da tarefa; retorna se ela terminou."""
+        return self._fim.wait(timeout)
+
+    def obter_resultado(self) -> Any:
+        """Resultado da tarefa concluída (relança o erro, se ela falhou)."""
+        if not self.concluida:
+            raise Exception("Erro: a tarefa ainda não terminou")
+        if self.erro is not None:
+            raise self.erro
+        return self.resultado
+
+class FilaTarefas:
+    """Fila em memória servida por `workers` threads; uma tarefa ativa por chave."""
+
+    def __init__(self, workers: int = 16, ttl_segundos: float = 1800):
+        self.ttl_segundos = ttl_segundos
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='fitia-tarefa')
+        self._lock = threading.Lock()
+        self._tarefas: Dict[str, Tarefa] = {}
+        self._por_chave: Dict[str, str] = {}
+
+    def submeter(self, chave: str, funcao: Callable[[Tarefa], Any], contexto: Any = None) -> Tarefa:
+        """Enfileira `funcao(tarefa)`; se já houver uma tarefa com a chave (sem erro), retorna ela."""
+        with self._lock:
+            self._limpar()
+            existente = self._tarefas.get(self._por_chave.get(chave, ''))
+            if existente is not None and existente.erro is None:
+                incrementar('tarefas_retomadas')
+                return existente
+            tarefa = Tarefa(chave, contexto)
+            self._tarefas[tarefa.id] = tarefa
+            self._por_chave[chave] = tarefa.id
+        incrementar('tarefas_submetidas')
+        self._executor.submit(self._executar, tarefa, funcao)
+        return tarefa
+
+    def _executar(self, tarefa: Tarefa, funcao: Callable[[Tarefa], Any]) -> None:
+        tarefa.iniciada_em = time.time()
+        tarefa.estado = EXECUTANDO
+        observar('tarefa_espera', tarefa.iniciada_em - tarefa.criada_em)
+        try:
+            tarefa.resultado = funcao(tarefa)
+            tarefa.estado = CONCLUIDA
+        except Exception as e:
+            tarefa.erro = e
+            tarefa.estado = ERRO
+            incrementar('erros', etapa='tarefa')
+        finally:
+            tarefa.concluida_em = time.time()
+            observar('tarefa_execucao', tarefa.concluida_em - tarefa.iniciada_em)
+            tarefa._fim.set()
+
+    def _limpar(self) -> None:
+        """Descarta tarefas concluídas há mais de ttl_segundos (chamado com o lock)."""
+        limite = time.time() - self.ttl_segundos
+        for tarefa_id in [t.id for t in self._tarefas.values() if t.concluida and t.concluida_em < limite]:
+            tarefa = self._tarefas.pop(tarefa_id)
+            if self._por_chave.get(tarefa.chave) == tarefa_id:
+                del self._por_chave[tarefa.chave]
+
+    def obter(self, tarefa_id: str) -> Optional[Tarefa]:
+        with self._lock:
+            return self._tarefas.get(tarefa_id)
+
+    def buscar(self, chave: str) -> Optional[Tarefa]:
+        """Tarefa mais recente submetida com a chave, se ainda estiver na fila."""
+        with self._lock:
+            return self._tarefas.get(self._por_chave.get(chave, ''))
+
+    def resumo(self) -> Dict[str, int]:
+        """Quantidade de tarefas em cada estado."""
+        with self._lock:
+            contagem = {PENDENTE: 0, EXECUTANDO: 0, CONCLUIDA: 0, ERRO: 0}
+            for tarefa in self._tarefas.values():
+                contagem[tarefa.estado] += 1
+            return contagem
+
+# Instância única por processo, recriada apenas se as configurações mudarem
+_fila_lock = threading.Lock()
+_fila_instancia: Dict = {'settings': None, 'fila': None}
+
+def get_fila_tarefas(config: Optional[Dict] = None) -> FilaTarefas:
+    """Retorna a fila de tarefas compartilhada pelo processo (chave JOBS do config.yaml)."""
+    settings = {**JOB_SETTINGS, **((config or {}).get('JOBS') or {})}
+    with _fila_lock:
+        if _fila_instancia['fila'] is None or _fila_instancia['settings'] != settings:
+            _fila_instancia['fila'] = FilaTarefas(settings['workers'], settings['ttl_segundos'])
+            _fila_instancia['settings'] = settings
+        return _fila_instancia['fila']
@@ -0,0 +1,94 @@
+import uuid
+
+import pytest
+
+pytest.importorskip('streamlit.testing.v1')
+from streamlit.testing.v1 import AppTest
+
+import app
+from plano import PlanoCompacto
+
+SCRIPT = 'import app\napp.main()\n'
+
+
+class Chunk:
+    def __init__(self, conteudo):
+        self.content = conteudo
+
+
+class ModeloFalso:
+    def __init__(self, falhar=False):
+        self.falhar = falhar
+        self.chamadas = 0
+
+    def invoke(self, prompt, **kwargs):
+        self.chamadas += 1
+        if self.falhar:
+            raise RuntimeError('provedor fora do ar')
+        return Chunk('## DICAS DE TREINO\n- Agachamento')
+
+    def stream(self, prompt, **kwargs):
+        yield self.invoke(prompt, **kwargs)
+
+
+@pytest.fixture
+def modelo(monkeypatch):
+    modelo = ModeloFalso()
+    config = {
+        'GOOGLE_API_KEY': 'teste', 'AI_STREAMING': False, 'AI_TEMPLATE_SECTIONS': False,
+        'LLM_CACHE': {'enabled': False}, 'STORE': {'enabled': False},
+        'JOBS': {'intervalo_polling_segundos': 0.05}
+    }
+    monkeypatch.setattr(app, 'load_config', lambda: dict(config))
+    monkeypatch.setattr(app, 'get_ai_model', lambda api_key, config=None: modelo)
+    return modelo
+
+
+def _enviar(at, nome, idade=None):
+    at.text_input[0].input(nome)
+    if idade is not None:
+        at.number_input[0].set_value(idade)
+    at.multiselect[1].select(at.multiselect[1].options[0])
+    at.button[0].click().run()
+
+
+def _nova_sessao():
+    at = AppTest.from_string(SCRIPT, default_timeout=30)
+    at.run()
+    return at
+
+
+def test_resultado_fica_na_sessao_entre_reruns(modelo):
+    at = _nova_sessao()
+    nome = f'Ana {uuid.uuid4().hex[:6]}'
+    _enviar(at, nome)
+    assert not at.exception
+    resultado = at.session_state['resultado_plano']
+    assert isinstance(resultado['plano_treino'], PlanoCompacto)
+    assert resultado['recomendacoes'] == '## DICAS DE TREINO\n- Agachamento'
+    assert modelo.chamadas == 1
+
+    at.run()                      # rerun qualquer (ex.: troca de aba)
+    at.button[0].click().run()    # novo envio com o mesmo perfil
+    assert at.session_state['resultado_plano']['perfil_hash'] == resultado['perfil_hash']
+    assert modelo.chamadas == 1
+    assert any('Agachamento' in m.value for m in at.markdown)
+
+    _enviar(at, nome, idade=41)   # perfil alterado: gera de novo
+    assert at.session_state['resultado_plano']['perfil_hash'] != resultado['perfil_hash']
+    assert modelo.chamadas == 2
+
+
+def test_falha_da_ia_exibe_recomendacoes_locais_e_tenta_de_novo(modelo):
+    modelo.falhar = True
+    at = _nova_sessao()
+    _enviar(at, f'Bia {uuid.uuid4().hex[:6]}')
+    assert not at.exception
+    assert at.warning and 'Não foi possível gerar' in at.warning[0].value
+    assert at.session_state['resultado_plano']['sem_ia']
+    chamadas = modelo.chamadas
+
+    modelo.falhar = False
+    at.button[0].click().run()    # mesmo perfil, mas o último envio ficou sem a IA
+    assert modelo.chamadas > chamadas
+    assert not at.session_state['resultado_plano'].get('sem_ia')
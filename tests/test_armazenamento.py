@@ -0,0 +1,21 @@
+from armazenamento import ArmazenamentoPlanos
+from metricas import METRICAS
+
+
+def _falhar():
+    raise ValueError('plano inválido')
+
+
+def test_escrita_com_erro_nao_descarta_o_restante_do_lote(tmp_path):
+    METRICAS.limpar()
+    armazenamento = ArmazenamentoPlanos(str(tmp_path / 'fitia.sqlite'), intervalo_segundos=0.2)
+    armazenamento.salvar_feedback('p1', 'Ana', 'antes')
+    armazenamento._enfileirar("UPDATE planos SET plano = ? WHERE id = ?", _falhar)
+    armazenamento._enfileirar("INSERT INTO feedback (plano_id) VALUES (?)", ('p1',))  # viola NOT NULL
+    armazenamento.salvar_feedback('p1', 'Ana', 'depois')
+    armazenamento.flush()
+
+    assert [f['texto'] for f in armazenamento.feedbacks('Ana')] == ['depois', 'antes']
+    contadores = METRICAS.resumo()['contadores']
+    assert contadores['armazenamento_perdidas'] == 2
+    assert contadores['armazenamento_escritas'] == 2
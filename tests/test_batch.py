@@ -0,0 +1,46 @@
+import pytest
+
+from batch import processar_perfil
+
+
+class ModeloQueNaoDeveSerChamado:
+    def invoke(self, *args, **kwargs):
+        raise AssertionError('o modelo não deveria ser chamado')
+
+
+def test_erro_ao_criar_plano_vira_status_erro():
+    perfil = {
+        'id': 'p1', 'nome': 'Ana', 'atividades': ['Yoga 🧘‍♀️'], 'duracao_plano': -1,
+        'objetivo': 'Manutenção ⚖️', 'limitacoes': '', 'peso': 70.0
+    }
+    registro = processar_perfil(perfil, {}, ModeloQueNaoDeveSerChamado(), None)
+    assert registro['status'] == 'erro'
+    assert registro['id'] == 'p1'
+    assert 'plano' in registro['erro']
+
+
+def test_perfil_com_rotulo_invalido_nao_interrompe_o_lote(tmp_path, monkeypatch):
+    import json
+
+    import batch
+
+    monkeypatch.setattr(batch, 'load_config', lambda: {'GOOGLE_API_KEY': 'x'})
+    monkeypatch.setattr(batch, 'get_ai_model', lambda chave, config=None: object())
+    monkeypatch.setattr(batch, 'obter_recomendacoes_ia', lambda *args, **kwargs: '## Metas\n- Meta 1')
+    base = {
+        'nome': 'Ana', 'idade': 30, 'sexo': 'Feminino', 'altura': 165, 'peso': 60.0,
+        'objetivo': 'Manutenção', 'atividades': ['Yoga'], 'duracao_plano': 7
+    }
+    entrada = tmp_path / 'perfis.jsonl'
+    entrada.write_text('\n'.join(json.dumps(p, ensure_ascii=False) for p in [
+        dict(base, id='a', nivel_atividade='Sedentário'),
+        dict(base, id='b', nivel_atividade='Atleta profissional'),
+        dict(base, id='c', nivel_atividade='Muito ativo 🏋️')
+    ]), encoding='utf-8')
+
+    with pytest.warns(UserWarning, match='b sem cardápio'):
+        resumo = batch.executar_lote(str(entrada), str(tmp_path / 'saida'), concorrencia=2, rpm=0, usar_cache=False)
+
+    assert resumo['erros'] == ['b']
+    assert resumo['concluidos'] == 2
+    assert 'erro_cardapios' not in resumo
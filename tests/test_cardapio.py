@@ -0,0 +1,36 @@
+import pandas as pd
+import pytest
+
+from batch import exportar_cardapios
+from cardapio import gerar_cardapio, gerar_cardapios_lote
+
+PERFIL = {
+    'nome': 'Ana', 'idade': 30, 'sexo': 'Feminino 👩', 'altura': 165, 'peso': 60.0,
+    'nivel_atividade': 'Moderadamente ativo 🏃', 'objetivo': 'Manutenção ⚖️',
+    'restricoes': [], 'atividades': [], 'preferencias_alimentares': '',
+    'limitacoes': '', 'duracao_plano': 3
+}
+
+
+def test_restricao_sem_emoji_equivale_a_opcao_do_formulario():
+    pd.testing.assert_frame_equal(
+        gerar_cardapio(2000, 'Manutenção ⚖️', ['vegano'], dias=2),
+        gerar_cardapio(2000, 'Manutenção ⚖️', ['Vegano 🌱'], dias=2)
+    )
+
+
+def test_restricao_desconhecida_deixa_so_o_perfil_sem_cardapio():
+    perfis = pd.DataFrame({
+        'id': ['a', 'b', 'c'], 'calorias': [2000, 2200, 1800], 'objetivo': ['Manutenção ⚖️'] * 3,
+        'restricoes': [['Vegano'], ['Alergia a amendoim'], []]
+    })
+    with pytest.warns(UserWarning, match='amendoim'):
+        cardapios = gerar_cardapios_lote(perfis, dias=2)
+    assert set(cardapios['id']) == {'a', 'c'}
+    assert set(cardapios['usuario']) == {0, 2}
+
+
+def test_exportar_cardapios_aceita_restricoes_sem_emoji(tmp_path):
+    perfis = [dict(PERFIL, id='p1', restricoes=['Vegano']), dict(PERFIL, id='p2')]
+    assert exportar_cardapios(perfis, str(tmp_path)) > 0
+    assert set(pd.read_parquet(tmp_path / 'cardapios.parquet')['id']) == {'p1', 'p2'}
@@ -0,0 +1,50 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from cohort import calcular_perfis_lote
+from config import ACTIVITY_LEVELS, GOALS
+from utils import calcular_calorias_diarias, calcular_macros_gramas, calcular_tmb
+
+
+def test_lote_igual_as_funcoes_escalares_em_todas_as_combinacoes():
+    combinacoes = list(itertools.product(ACTIVITY_LEVELS, GOALS, ['Masculino 👨', 'Feminino 👩']))
+    rng = np.random.default_rng(0)
+    perfis = pd.DataFrame({
+        'nivel_atividade': [c[0] for c in combinacoes],
+        'objetivo': [c[1] for c in combinacoes],
+        'sexo': [c[2] for c in combinacoes],
+        'peso': rng.uniform(40, 150, len(combinacoes)).round(1),
+        'altura': rng.uniform(140, 210, len(combinacoes)).round(0),
+        'idade': rng.integers(14, 90, len(combinacoes))
+    })
+    resultado = calcular_perfis_lote(perfis)
+
+    for linha in resultado.itertuples():
+        tmb = calcular_tmb(linha.peso, linha.altura, int(linha.idade), linha.sexo)
+        calorias = calcular_calorias_diarias(tmb, linha.nivel_atividade, linha.objetivo)
+        macros = calcular_macros_gramas(calorias, linha.objetivo)
+        assert linha.tmb == tmb
+        assert linha.calorias == calorias
+        assert (linha.proteinas_g, linha.carboidratos_g, linha.gorduras_g) == (
+            macros['protein'], macros['carbs'], macros['fats'])
+
+
+def test_rotulos_sem_emoji_usam_a_opcao_do_formulario():
+    perfis = pd.DataFrame({
+        'peso': [70.0, 70.0], 'altura': [170, 170], 'idade': [30, 30], 'sexo': ['Feminino', 'Feminino 👩'],
+        'nivel_atividade': ['sedentário', 'Sedentário 🛋️'], 'objetivo': ['Emagrecimento', 'Emagrecimento 📉']
+    })
+    resultado = calcular_perfis_lote(perfis)
+    assert resultado['calorias'].iloc[0] == resultado['calorias'].iloc[1]
+
+
+def test_rotulo_desconhecido_gera_erro():
+    perfis = pd.DataFrame({
+        'peso': [70.0], 'altura': [170], 'idade': [30], 'sexo': ['Feminino'],
+        'nivel_atividade': ['Atleta'], 'objetivo': ['Manutenção']
+    })
+    with pytest.raises(ValueError, match='Atleta'):
+        calcular_perfis_lote(perfis)
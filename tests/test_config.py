@@ -0,0 +1,31 @@
+import os
+
+import pytest
+
+from config import load_config
+
+def _escrever(caminho, conteudo, mtime_ns):
+    caminho.write_text(conteudo)
+    os.utime(caminho, ns=(mtime_ns, mtime_ns))
+
+def test_load_config_recarrega_quando_o_arquivo_muda(tmp_path):
+    caminho = tmp_path / 'config.yaml'
+    _escrever(caminho, 'modelo: a\n', 1_000_000_000)
+    assert load_config(str(caminho)) == {'modelo': 'a'}
+
+    # mesmo mtime: a cópia em memória é reaproveitada
+    _escrever(caminho, 'modelo: b\n', 1_000_000_000)
+    assert load_config(str(caminho)) == {'modelo': 'a'}
+
+    _escrever(caminho, 'modelo: b\n', 2_000_000_000)
+    assert load_config(str(caminho)) == {'modelo': 'b'}
+
+def test_load_config_devolve_copia(tmp_path):
+    caminho = tmp_path / 'config.yaml'
+    _escrever(caminho, 'modelo: a\n', 1_000_000_000)
+    load_config(str(caminho))['modelo'] = 'alterado'
+    assert load_config(str(caminho)) == {'modelo': 'a'}
+
+def test_load_config_arquivo_ausente(tmp_path):
+    with pytest.raises(Exception, match='Erro ao carregar a configuração'):
+        load_config(str(tmp_path / 'nao_existe.yaml'))
@@ -0,0 +1,102 @@
+import threading
+import time
+
+import pytest
+
+from coordenador_ia import ChamadasUnicas, LimitadorTokens
+
+def test_limitador_atende_em_ordem_de_chegada():
+    limitador = LimitadorTokens(rpm=None, tpm=600)   # 10 tokens/s
+    assert limitador.tentar_adquirir(600)            # esvazia o balde
+    ordem = []
+
+    def pedir(nome, tokens):
+        limitador.adquirir(tokens)
+        ordem.append(nome)
+
+    # o primeiro pede mais tokens: sem FIFO o segundo passaria na frente
+    primeiro = threading.Thread(target=pedir, args=('primeiro', 3))
+    primeiro.start()
+    while limitador.tamanho_fila() < 1:
+        time.sleep(0.001)
+    segundo = threading.Thread(target=pedir, args=('segundo', 1))
+    segundo.start()
+    primeiro.join(5)
+    segundo.join(5)
+    assert ordem == ['primeiro', 'segundo']
+    assert limitador.tamanho_fila() == 0
+
+def test_limitador_informa_posicao_na_fila():
+    limitador = LimitadorTokens(rpm=None, tpm=600)
+    assert limitador.tentar_adquirir(600)
+    posicoes = []
+    limitador.adquirir(1, ao_aguardar=posicoes.append)
+    assert posicoes == [1, 0]
+
+def test_devolver_libera_cota_sem_passar_do_limite():
+    limitador = LimitadorTokens(rpm=None, tpm=100)
+    assert limitador.tentar_adquirir(100)
+    assert not limitador.tentar_adquirir(10)
+    limitador.devolver(50)
+    assert limitador.tentar_adquirir(10)
+    limitador.devolver(1000)
+    assert limitador._tokens <= 100
+    assert limitador.tentar_adquirir(100)
+
+def test_limitador_respeita_max_espera():
+    limitador = LimitadorTokens(rpm=1, tpm=None, max_espera=0.05)
+    assert limitador.tentar_adquirir(1)
+    with pytest.raises(Exception, match='tempo máximo de espera'):
+        limitador.adquirir(1)
+    assert limitador.tamanho_fila() == 0
+
+def _em_paralelo(chamadas, chave, funcao, n=3):
+    resultados, erros = [], []
+
+    def executar():
+        try:
+            resultados.append(chamadas.executar(chave, funcao))
+        except Exception as e:
+            erros.append(e)
+
+    threads = [threading.Thread(target=executar) for _ in range(n)]
+    for t in threads:
+        t.start()
+    return threads, resultados, erros
+
+def test_chamadas_unicas_compartilham_uma_execucao():
+    chamadas = ChamadasUnicas()
+    liberar = threading.Event()
+    execucoes = []
+
+    def funcao():
+        execucoes.append(1)
+        liberar.wait(5)
+        return 'resposta'
+
+    threads, resultados, erros = _em_paralelo(chamadas, 'k', funcao)
+    time.sleep(0.05)
+    liberar.set()
+    for t in threads:
+        t.join(5)
+    assert execucoes == [1]
+    assert resultados == ['resposta'] * 3
+    assert not erros
+    assert chamadas.executar('k', lambda: 'nova') == 'nova'   # chave liberada ao terminar
+
+def test_chamadas_unicas_propagam_o_erro_a_quem_aguarda():
+    chamadas = ChamadasUnicas()
+    liberar = threading.Event()
+
+    def funcao():
+        liberar.wait(5)
+        raise ValueError('falhou')
+
+    threads, resultados, erros = _em_paralelo(chamadas, 'k', funcao)
+    time.sleep(0.05)
+    liberar.set()
+    for t in threads:
+        t.join(5)
+    assert not resultados
+    assert len(erros) == 3
+    assert all(isinstance(e, ValueError) for e in erros)
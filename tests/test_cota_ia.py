@@ -0,0 +1,53 @@
+import pytest
+
+import utils
+from coordenador_ia import LimitadorTokens
+from resiliencia_ia import ModeloResiliente
+
+PERFIL = {
+    'nome': 'Ana', 'idade': 30, 'sexo': 'Feminino 👩', 'altura': 165, 'peso': 60.0,
+    'nivel_atividade': 'Moderadamente ativo 🏃', 'objetivo': 'Manutenção ⚖️',
+    'restricoes': [], 'atividades': ['Corrida 🏃‍♀️'], 'preferencias_alimentares': '',
+    'limitacoes': '', 'duracao_plano': 30
+}
+
+class Mensagem:
+    def __init__(self, conteudo):
+        self.content = conteudo
+
+class ModeloInstavel:
+    """Falha nas primeiras `falhas` chamadas."""
+
+    def __init__(self, falhas):
+        self.falhas = falhas
+        self.chamadas = 0
+
+    def invoke(self, prompt, **kwargs):
+        self.chamadas += 1
+        if self.chamadas <= self.falhas:
+            raise RuntimeError('429')
+        return Mensagem('## Nutrição\n- ok')
+
+@pytest.fixture
+def limitador(monkeypatch):
+    limitador = LimitadorTokens(rpm=100, tpm=1_000_000)
+    monkeypatch.setattr(utils, 'limitador', limitador)
+    return limitador
+
+def _resiliente(modelo, tentativas):
+    return ModeloResiliente(modelo, {
+        'tentativas': tentativas, 'espera_base_segundos': 0.001, 'falhas_para_abrir': 100
+    })
+
+def test_cada_tentativa_consome_cota(limitador):
+    modelo = ModeloInstavel(falhas=2)
+    utils._invocar(_resiliente(modelo, 3), PERFIL)
+    assert modelo.chamadas == 3
+    assert limitador.rpm - limitador._requisicoes == pytest.approx(3, abs=0.1)
+
+def test_tokens_devolvidos_quando_a_chamada_falha(limitador):
+    modelo = ModeloInstavel(falhas=10)
+    with pytest.raises(Exception):
+        utils._invocar(_resiliente(modelo, 2), PERFIL)
+    limitador._reabastecer()
+    assert limitador._tokens == pytest.approx(limitador.tpm)
@@ -0,0 +1,26 @@
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from exportacao import exportar_lote_stream
+
+
+def _registro(i, **extras):
+    return {'id': str(i), 'nome': f'P{i}', 'plano': [{'data': '01/01/2026', 'duracao': 30}], **extras}
+
+
+def test_coluna_nova_depois_do_primeiro_lote_gera_erro(tmp_path):
+    registros = [_registro(0), _registro(1), _registro(2, observacao='nova')]
+    with pytest.raises(ValueError, match='observacao'):
+        exportar_lote_stream(registros, str(tmp_path), tamanho_lote=2)
+
+
+def test_esquema_explicito_mantem_coluna_nula_no_primeiro_lote(tmp_path):
+    esquemas = {'perfis': pa.schema([('id', pa.string()), ('nome', pa.string()), ('observacao', pa.string())])}
+    registros = [_registro(0), _registro(1), _registro(2, observacao='nova')]
+    assert exportar_lote_stream(registros, str(tmp_path), tamanho_lote=2, esquemas=esquemas) == 3
+
+    perfis = pq.read_table(tmp_path / 'perfis.parquet')
+    assert perfis.column('observacao').to_pylist() == [None, None, 'nova']
+    assert len(pd.read_parquet(tmp_path / 'planos.parquet')) == 3
@@ -0,0 +1,15 @@
+from config import GOALS
+from graficos import construir_graficos_plano, gerar_graficos_plano
+from plano import criar_plano_treino_df
+
+OBJETIVO = 'Manutenção ⚖️'
+
+
+def test_figuras_do_cache_sao_copias_independentes():
+    plano_df = criar_plano_treino_df(['Yoga 🧘‍♀️'], 30, OBJETIVO, '', 70.0, seed=1)
+    primeira = gerar_graficos_plano(plano_df, 70.0, OBJETIVO, GOALS[OBJETIVO])
+    primeira[0].update_layout(title='alterado por uma sessão')
+    segunda = gerar_graficos_plano(plano_df, 70.0, OBJETIVO, GOALS[OBJETIVO])
+    assert segunda[0] is not primeira[0]
+    assert segunda[0].layout.title.text != 'alterado por uma sessão'
+    assert segunda[1].to_dict() == construir_graficos_plano(plano_df, GOALS[OBJETIVO])[1].to_dict()
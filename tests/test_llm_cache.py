@@ -0,0 +1,109 @@
+import time
+
+import pytest
+
+import utils
+from coordenador_ia import LimitadorTokens
+from llm_cache import NOME_PLACEHOLDER, LLMResponseCache, get_llm_cache
+
+PERFIL = {
+    'idade': 30, 'sexo': 'Feminino 👩', 'altura': 165, 'peso': 60.0,
+    'nivel_atividade': 'Moderadamente ativo 🏃', 'objetivo': 'Ganho de Massa 💪',
+    'restricoes': [], 'preferencias_alimentares': '', 'limitacoes': '', 'duracao_plano': 30
+}
+
+
+class Chunk:
+    def __init__(self, conteudo):
+        self.content = conteudo
+
+
+class ModeloEco:
+    """Responde citando o nome que recebeu no prompt, em chunks que dividem o marcador."""
+
+    def __init__(self):
+        self.prompts = []
+
+    def _resposta(self, prompt):
+        self.prompts.append(prompt)
+        nome = prompt.split('plano detalhado para ')[1].split('.')[0]
+        return f"## Metas\n- Vamos lá, {nome}! Anabolismo em foco."
+
+    def invoke(self, prompt, **kwargs):
+        return Chunk(self._resposta(prompt))
+
+    def stream(self, prompt, **kwargs):
+        resposta = self._resposta(prompt)
+        for inicio in range(0, len(resposta), 5):
+            yield Chunk(resposta[inicio:inicio + 5])
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return LLMResponseCache(str(tmp_path / 'cache.sqlite'), ttl_seconds=60, max_entries=10)
+
+
+@pytest.fixture(autouse=True)
+def sem_limite(monkeypatch):
+    monkeypatch.setattr(utils, 'limitador', LimitadorTokens(rpm=0, tpm=0))
+
+
+def test_nome_so_e_trocado_como_palavra_inteira(cache):
+    cache.set(dict(PERFIL, nome='Ana'), 'Olá, Ana! O anabolismo e a Anabolismo-fase ajudam, Ana.')
+    resposta = cache.get(dict(PERFIL, nome='Bruno'))
+    assert resposta == 'Olá, Bruno! O anabolismo e a Anabolismo-fase ajudam, Bruno.'
+
+
+def test_prompt_com_cache_nao_leva_o_nome(cache):
+    modelo = ModeloEco()
+    resposta = utils.obter_recomendacoes_ia(modelo, dict(PERFIL, nome='Ana Silva'), cache)
+    assert 'Ana' not in modelo.prompts[0] and NOME_PLACEHOLDER in modelo.prompts[0]
+    assert 'Vamos lá, Ana Silva!' in resposta
+
+    outra = utils.obter_recomendacoes_ia(modelo, dict(PERFIL, nome='Bruno'), cache)
+    assert len(modelo.prompts) == 1
+    assert 'Vamos lá, Bruno!' in outra and 'Ana Silva' not in outra
+
+
+def test_streaming_com_cache_preenche_o_nome_dividido_entre_chunks(cache):
+    modelo = ModeloEco()
+    partes = list(utils.stream_recomendacoes_ia(modelo, dict(PERFIL, nome='Ana'), cache))
+    assert NOME_PLACEHOLDER not in ''.join(partes)
+    assert 'Vamos lá, Ana!' in ''.join(partes)
+    assert cache.get(dict(PERFIL, nome='Bia')) == '## Metas\n- Vamos lá, Bia! Anabolismo em foco.'
+
+
+def test_sem_cache_o_prompt_leva_o_nome():
+    modelo = ModeloEco()
+    assert 'Vamos lá, Ana!' in utils.obter_recomendacoes_ia(modelo, dict(PERFIL, nome='Ana'))
+    assert 'para Ana.' in modelo.prompts[0]
+
+
+def test_entrada_expirada_nao_e_servida(tmp_path):
+    cache = LLMResponseCache(str(tmp_path / 'cache.sqlite'), ttl_seconds=0.05, max_entries=10)
+    cache.set(dict(PERFIL, nome='Ana'), 'resposta')
+    assert cache.get(dict(PERFIL, nome='Ana')) == 'resposta'
+    time.sleep(0.1)
+    assert cache.get(dict(PERFIL, nome='Ana')) is None
+    assert cache.stats()['entries'] == 0
+
+
+def test_remove_as_entradas_menos_usadas_alem_do_limite(tmp_path):
+    cache = LLMResponseCache(str(tmp_path / 'cache.sqlite'), ttl_seconds=60, max_entries=2)
+    perfis = [dict(PERFIL, nome='Ana', peso=peso) for peso in (60.0, 70.0, 80.0)]
+    cache.set(perfis[0], 'a')
+    time.sleep(0.01)
+    cache.set(perfis[1], 'b')
+    time.sleep(0.01)
+    assert cache.get(perfis[0]) == 'a'   # passa a ser a mais recente
+    time.sleep(0.01)
+    cache.set(perfis[2], 'c')
+
+    assert cache.get(perfis[1]) is None
+    assert cache.get(perfis[0]) == 'a' and cache.get(perfis[2]) == 'c'
+    assert cache.stats()['evictions'] == 1
+
+
+def test_cache_desativado(tmp_path):
+    assert get_llm_cache({'LLM_CACHE': {'enabled': False}}) is None
+    assert get_llm_cache({'LLM_CACHE': {'path': str(tmp_path / 'cache.sqlite')}}) is not None
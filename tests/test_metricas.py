@@ -0,0 +1,107 @@
+import json
+import re
+
+import numpy as np
+import pytest
+
+from metricas import BUCKETS_SEGUNDOS, PREFIXO, Histograma, Metricas
+
+# Linha de amostra do formato texto do Prometheus: nome{rótulos} valor
+AMOSTRA = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)(\{[a-z_]+="[^"]*"(,[a-z_]+="[^"]*")*\})? (\S+)$')
+
+
+def test_quantil_de_histograma_vazio_e_de_um_valor():
+    h = Histograma()
+    assert h.quantil(0.5) == 0.0
+    h.observar(0.2)
+    assert h.quantil(0.5) == h.quantil(0.99) == 0.2
+
+
+@pytest.mark.parametrize('q', [0.5, 0.95, 0.99])
+def test_quantil_fica_dentro_do_bucket_do_valor_exato(q):
+    valores = np.random.default_rng(0).lognormal(mean=-3, sigma=1.5, size=5000)
+    h = Histograma()
+    for valor in valores:
+        h.observar(float(valor))
+    exato = float(np.quantile(valores, q))
+    estimado = h.quantil(q)
+    # o erro máximo é a largura do bucket que contém o valor exato
+    i = np.searchsorted(BUCKETS_SEGUNDOS, exato)
+    inferior = BUCKETS_SEGUNDOS[i - 1] if i else 0.0
+    superior = BUCKETS_SEGUNDOS[i] if i < len(BUCKETS_SEGUNDOS) else h.maximo
+    assert inferior <= estimado <= superior
+
+
+def test_quantil_acima_do_maior_limite_usa_o_maximo():
+    h = Histograma()
+    for valor in (100.0, 200.0):
+        h.observar(valor)
+    assert BUCKETS_SEGUNDOS[-1] < h.quantil(0.5) <= 200.0
+    assert h.quantil(1.0) == 200.0
+
+
+def test_quantis_sao_monotonos():
+    h = Histograma()
+    for valor in np.linspace(0, 3, 301):
+        h.observar(float(valor))
+    quantis = [h.quantil(q / 100) for q in range(1, 101)]
+    assert quantis == sorted(quantis)
+
+
+def _metricas():
+    metricas = Metricas()
+    for segundos in (0.003, 0.02, 0.02, 7.0):
+        metricas.observar('ia_invoke', segundos)
+    metricas.observar('calcular_tmb', 0.0001)
+    metricas.incrementar('ia_tokens_entrada', 250)
+    metricas.incrementar('erros', etapa='ia_stream')
+    metricas.incrementar('erros', etapa='fila_ia')
+    return metricas
+
+
+def test_formato_texto_do_prometheus():
+    texto = _metricas().para_prometheus()
+    assert texto.endswith('\n')
+    tipos = {}
+    amostras = {}
+    for linha in texto.splitlines():
+        if linha.startswith('# TYPE '):
+            _, _, nome, tipo = linha.split(' ')
+            tipos[nome] = tipo
+            continue
+        encontrado = AMOSTRA.match(linha)
+        assert encontrado, linha
+        amostras[encontrado.group(1) + (encontrado.group(2) or '')] = float(encontrado.group(4))
+
+    assert tipos[f'{PREFIXO}_etapa_segundos'] == 'histogram'
+    assert tipos[f'{PREFIXO}_erros_total'] == 'counter'
+    assert amostras[f'{PREFIXO}_ia_tokens_entrada_total'] == 250
+    assert amostras[f'{PREFIXO}_erros_total{{etapa="fila_ia"}}'] == 1
+
+    # buckets cumulativos, terminando em +Inf com a contagem total
+    buckets = [
+        valor for chave, valor in amostras.items()
+        if chave.startswith(f'{PREFIXO}_etapa_segundos_bucket{{etapa="ia_invoke"')
+    ]
+    assert len(buckets) == len(BUCKETS_SEGUNDOS) + 1
+    assert buckets == sorted(buckets)
+    assert amostras[f'{PREFIXO}_etapa_segundos_bucket{{etapa="ia_invoke",le="+Inf"}}'] == 4
+    assert amostras[f'{PREFIXO}_etapa_segundos_bucket{{etapa="ia_invoke",le="0.025"}}'] == 3
+    assert amostras[f'{PREFIXO}_etapa_segundos_count{{etapa="ia_invoke"}}'] == 4
+    assert amostras[f'{PREFIXO}_etapa_segundos_sum{{etapa="ia_invoke"}}'] == pytest.approx(7.043)
+
+
+def test_exportacoes_em_arquivo(tmp_path):
+    metricas = _metricas()
+    prometheus = tmp_path / 'metricas' / 'fitia.prom'
+    metricas.exportar_prometheus(str(prometheus))
+    assert prometheus.read_text(encoding='utf-8').startswith(f'# TYPE {PREFIXO}_etapa_segundos histogram')
+    assert not (tmp_path / 'metricas' / 'fitia.prom.tmp').exists()
+
+    jsonl = tmp_path / 'metricas.jsonl'
+    metricas.exportar_jsonl(str(jsonl))
+    metricas.exportar_jsonl(str(jsonl))
+    registros = [json.loads(linha) for linha in jsonl.read_text(encoding='utf-8').splitlines()]
+    assert len(registros) == 2
+    assert registros[0]['etapas']['ia_invoke']['chamadas'] == 4
+    assert registros[0]['contadores']['erros[ia_stream]'] == 1
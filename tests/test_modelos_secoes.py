@@ -0,0 +1,86 @@
+import json
+import os
+import subprocess
+import sys
+from itertools import product
+
+import pytest
+
+import utils
+from config import ACTIVITY_LEVELS, DIETARY_RESTRICTIONS, GOALS, PHYSICAL_ACTIVITIES
+from coordenador_ia import LimitadorTokens
+from modelos_secoes import conteudo_padrao, recomendacoes_locais, secoes_personalizadas
+
+PERFIL = {
+    'nome': 'Ana', 'idade': 30, 'sexo': 'Feminino 👩', 'altura': 165, 'peso': 60.0,
+    'nivel_atividade': list(ACTIVITY_LEVELS)[2], 'objetivo': list(GOALS)[0],
+    'restricoes': list(DIETARY_RESTRICTIONS)[1:3], 'atividades': list(PHYSICAL_ACTIVITIES)[:2],
+    'preferencias_alimentares': 'frutas', 'limitacoes': '', 'duracao_plano': 30
+}
+
+
+def test_conteudo_padrao_depende_so_das_opcoes_do_formulario():
+    texto = conteudo_padrao(PERFIL)
+    outro_usuario = dict(PERFIL, nome='Bruno', idade=55, peso=92.0, preferencias_alimentares='massas',
+                         limitacoes='joelho', restricoes=PERFIL['restricoes'][::-1])
+    assert conteudo_padrao(outro_usuario) == texto
+    assert conteudo_padrao(dict(PERFIL, objetivo=list(GOALS)[1])) != texto
+    assert conteudo_padrao(dict(PERFIL, restricoes=[])) != texto
+
+
+def test_conteudo_padrao_igual_entre_processos():
+    # A ordem de sets/dicts não pode vazar para o texto: compara com outro PYTHONHASHSEED
+    codigo = (
+        'import sys, json; from modelos_secoes import conteudo_padrao; '
+        'sys.stdout.write(conteudo_padrao(json.loads(sys.argv[1])))'
+    )
+    raiz = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    textos = {
+        subprocess.run(
+            [sys.executable, '-c', codigo, json.dumps(PERFIL)], cwd=raiz, capture_output=True, check=True,
+            env={**os.environ, 'PYTHONHASHSEED': semente, 'PYTHONIOENCODING': 'utf-8'}
+        ).stdout.decode('utf-8')
+        for semente in ('1', '2')
+    }
+    assert textos == {conteudo_padrao(PERFIL)}
+
+
+@pytest.mark.parametrize('objetivo,nivel', list(product(GOALS, ACTIVITY_LEVELS)))
+def test_todas_as_combinacoes_tem_as_quatro_secoes(objetivo, nivel):
+    secoes = utils.processar_resposta_ia(conteudo_padrao(dict(PERFIL, objetivo=objetivo, nivel_atividade=nivel)))
+    assert secoes['treino'] and secoes['recomendacoes'] and secoes['metas']
+    assert secoes['nutricao']['evitar']
+
+
+def test_secoes_personalizadas_so_pedem_treino_com_limitacoes():
+    assert secoes_personalizadas(PERFIL) == ['nutricao']
+    assert secoes_personalizadas(dict(PERFIL, limitacoes='   ')) == ['nutricao']
+    assert secoes_personalizadas(dict(PERFIL, limitacoes='dor no joelho')) == ['nutricao', 'treino']
+
+
+def test_recomendacoes_locais_trazem_o_conteudo_padrao():
+    assert recomendacoes_locais(PERFIL).endswith(conteudo_padrao(PERFIL))
+
+
+class Mensagem:
+    def __init__(self, conteudo):
+        self.content = conteudo
+
+
+class ModeloFalso:
+    def __init__(self):
+        self.prompts = []
+
+    def invoke(self, prompt, **kwargs):
+        self.prompts.append(prompt)
+        return Mensagem('- Café: iogurte com frutas')
+
+
+def test_modo_modelos_pede_a_ia_so_as_partes_personalizadas(monkeypatch):
+    monkeypatch.setattr(utils, 'limitador', LimitadorTokens(rpm=0, tpm=0))
+    modelo = ModeloFalso()
+    resposta = utils.obter_recomendacoes_ia(modelo, PERFIL, modelos=True)
+    assert resposta == f"{conteudo_padrao(PERFIL)}\n\n- Café: iogurte com frutas"
+    assert 'METAS E MARCOS' not in modelo.prompts[0] and 'ADAPTAÇÕES DO TREINO' not in modelo.prompts[0]
+    utils.obter_recomendacoes_ia(modelo, dict(PERFIL, limitacoes='dor no joelho'), modelos=True)
+    assert 'ADAPTAÇÕES DO TREINO' in modelo.prompts[1]
@@ -0,0 +1,90 @@
+import pytest
+
+import utils
+from config import AI_OUTPUT_TOKENS
+from coordenador_ia import LimitadorTokens
+
+PERFIL = {
+    'nome': 'Ana', 'idade': 30, 'sexo': 'Feminino 👩', 'altura': 165, 'peso': 60.0,
+    'nivel_atividade': 'Moderadamente ativo 🏃', 'objetivo': 'Ganho de Massa 💪',
+    'restricoes': ['Vegetariano 🥗'], 'preferencias_alimentares': 'frutas', 'limitacoes': '', 'duracao_plano': 30
+}
+SECOES = list(utils.SECOES_PROMPT)
+
+
+class Mensagem:
+    def __init__(self, conteudo, usage_metadata=None):
+        self.content = conteudo
+        self.usage_metadata = usage_metadata
+
+
+class ModeloFalso:
+    """Registra o generation_config de cada chamada e informa o uso de tokens."""
+
+    def __init__(self):
+        self.geracoes = []
+
+    def invoke(self, prompt, generation_config=None, **kwargs):
+        self.geracoes.append(generation_config)
+        return Mensagem('## METAS\n- ok', {'input_tokens': 200, 'output_tokens': 40})
+
+
+@pytest.fixture(autouse=True)
+def sem_limite(monkeypatch):
+    monkeypatch.setattr(utils, 'limitador', LimitadorTokens(rpm=0, tpm=0))
+
+
+def test_orcamento_de_saida_cresce_com_a_duracao_ate_a_base():
+    base = sum(AI_OUTPUT_TOKENS[s] for s in SECOES)
+    orcamentos = [utils.calcular_max_tokens_saida(dias) for dias in (7, 14, 30, 60, 90)]
+    assert orcamentos == sorted(orcamentos)
+    assert orcamentos[2:] == [base] * 3
+    assert orcamentos[0] == int(base * (0.5 + 7 / 60))
+
+
+def test_orcamento_de_saida_fica_entre_minimo_e_maximo():
+    for dias in (1, 7, 30, 365):
+        for secoes in [None] + [[s] for s in SECOES]:
+            for modelos in (False, True):
+                if modelos and secoes and f'personalizado_{secoes[0]}' not in AI_OUTPUT_TOKENS:
+                    continue
+                orcamento = utils.calcular_max_tokens_saida(dias, secoes, modelos)
+                assert AI_OUTPUT_TOKENS['minimo'] <= orcamento <= AI_OUTPUT_TOKENS['maximo']
+
+
+def test_sub_requisicao_recebe_so_a_parte_da_sua_secao():
+    total = utils.calcular_max_tokens_saida(30)
+    partes = [utils.calcular_max_tokens_saida(30, [s]) for s in SECOES]
+    assert all(parte < total for parte in partes)
+    assert sum(partes) <= total + len(SECOES) * AI_OUTPUT_TOKENS['minimo']
+
+
+def test_prompt_compacto_fica_dentro_do_orcamento():
+    prompt = utils.gerar_prompt_ia(PERFIL)
+    assert utils.estimar_tokens(prompt) <= 300
+    assert not any(linha.startswith(' ') for linha in prompt.splitlines())
+    assert '\n\n\n' not in prompt
+    for secao in SECOES:
+        parcial = utils.gerar_prompt_ia(PERFIL, [secao])
+        assert len(parcial) < len(prompt)
+        assert utils._SECOES_COMPACTAS[secao] in parcial
+        assert all(utils._SECOES_COMPACTAS[s] not in parcial for s in SECOES if s != secao)
+
+
+def test_chamada_envia_o_orcamento_e_registra_o_uso():
+    modelo, uso = ModeloFalso(), {}
+    utils.obter_recomendacoes_ia(modelo, dict(PERFIL, duracao_plano=7), uso=uso)
+    esperado = utils.calcular_max_tokens_saida(7)
+    assert modelo.geracoes == [{'max_output_tokens': esperado}]
+    assert uso['tokens_entrada'] == 200 and uso['tokens_saida'] == 40
+    assert uso['max_tokens_saida'] == esperado and uso['requisicoes'] == 1
+
+
+def test_sub_requisicoes_paralelas_somam_o_uso():
+    modelo, uso = ModeloFalso(), {}
+    utils.obter_recomendacoes_ia(modelo, PERFIL, paralelo=True, uso=uso)
+    assert sorted(g['max_output_tokens'] for g in modelo.geracoes) == sorted(
+        utils.calcular_max_tokens_saida(30, [s]) for s in SECOES
+    )
+    assert uso['requisicoes'] == len(SECOES)
+    assert uso['tokens_saida'] == 40 * len(SECOES)
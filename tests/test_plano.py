@@ -0,0 +1,127 @@
+import os
+import subprocess
+import sys
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from plano import EXERCICIO_PADRAO, PlanoCompacto, criar_plano_treino_df, reprojetar_peso
+
+INICIO = date(2026, 1, 5)
+
+
+def test_atividade_sem_emoji_usa_opcao_do_formulario():
+    df = criar_plano_treino_df(['corrida'], 7, 'Manutenção ⚖️', '', 70.0, seed=1)
+    assert set(df['exercicio']) == {'Corrida 🏃‍♀️'}
+
+
+def test_atividade_desconhecida_e_ignorada_com_aviso():
+    with pytest.warns(UserWarning, match='Futebol'):
+        df = criar_plano_treino_df(['Futebol'], 7, 'Manutenção ⚖️', '', 70.0, seed=1)
+    assert set(df['exercicio']) == {EXERCICIO_PADRAO}
+
+
+def _plano(objetivo='Emagrecimento 📉', dias=60):
+    return criar_plano_treino_df(['corrida'], dias, objetivo, '', 80.0, seed=1, data_inicio=INICIO)
+
+
+def _pesagens(pesos_por_dia):
+    return [{'data': (INICIO + timedelta(days=dia)).isoformat(), 'peso': peso} for dia, peso in pesos_por_dia]
+
+
+def test_reprojecao_mantem_os_dias_ate_a_ultima_pesagem():
+    plano = _plano()
+    original = plano.copy()
+    novo = reprojetar_peso(plano, _pesagens([(7, 79.0), (14, 78.5)]), 80.0, 'Emagrecimento 📉')
+    assert plano.equals(original)   # o DataFrame recebido não é alterado
+    np.testing.assert_array_equal(novo['peso_projetado'][:15], plano['peso_projetado'][:15])
+    # depois da última pesagem a projeção é uma reta a partir dela
+    passos = np.diff(novo['peso_projetado'].to_numpy()[15:])
+    np.testing.assert_allclose(passos, passos[0], atol=0.011)
+
+
+def test_reprojecao_segue_as_pesagens():
+    plano = _plano()
+    # perdeu bem mais rápido que o previsto para o objetivo
+    rapido = reprojetar_peso(plano, _pesagens([(7, 78.5), (14, 77.2), (21, 76.0)]), 80.0, 'Emagrecimento 📉')
+    # peso parado em 80 kg
+    parado = reprojetar_peso(plano, _pesagens([(7, 80.0), (14, 80.0), (21, 80.0)]), 80.0, 'Emagrecimento 📉')
+    assert rapido['peso_projetado'].iloc[-1] < plano['peso_projetado'].iloc[-1] < parado['peso_projetado'].iloc[-1]
+    assert rapido['peso_projetado'].iloc[22] == pytest.approx(76.0, abs=0.5)
+
+
+def test_reprojecao_converge_para_peso_estavel():
+    plano = _plano('Manutenção ⚖️')
+    pesagens = _pesagens([(dia, 75.0) for dia in range(1, 31)])
+    novo = reprojetar_peso(plano, pesagens, 80.0, 'Manutenção ⚖️')
+    assert novo['peso_projetado'].iloc[31] == pytest.approx(75.0, abs=0.3)
+    assert abs(novo['peso_projetado'].iloc[-1] - novo['peso_projetado'].iloc[31]) < 0.5
+
+
+def test_reprojecao_limita_a_variacao_semanal():
+    plano = _plano('Manutenção ⚖️')
+    novo = reprojetar_peso(plano, _pesagens([(1, 70.0)]), 80.0, 'Manutenção ⚖️', {'max_variacao_semanal': 0.5})
+    passos = np.diff(novo['peso_projetado'].to_numpy()[2:])
+    assert np.all(np.abs(passos) <= 0.5 / 7 + 0.01)
+
+
+def test_reprojecao_nao_depende_da_ordem_das_pesagens():
+    plano = _plano()
+    pesagens = _pesagens([(7, 79.0), (14, 78.5), (21, 78.4)])
+    ordenadas = reprojetar_peso(plano, pesagens, 80.0, 'Emagrecimento 📉')
+    assert ordenadas.equals(reprojetar_peso(plano, pesagens[::-1], 80.0, 'Emagrecimento 📉'))
+    assert reprojetar_peso(plano, [], 80.0, 'Emagrecimento 📉').equals(plano)
+
+
+def test_plano_compacto_volta_ao_mesmo_dataframe():
+    plano = criar_plano_treino_df(['corrida', 'Musculação 🏋️‍♀️'], 45, 'Emagrecimento 📉', '', 80.0,
+                                  seed=3, data_inicio=INICIO)
+    compacto = PlanoCompacto.de_dataframe(plano)
+    assert len(compacto) == 45
+    assert sum(a.nbytes for a in (compacto.exercicio, compacto.intensidade, compacto.duracao,
+                                  compacto.peso_projetado)) == 8 * 45
+    pd.testing.assert_frame_equal(compacto.para_dataframe(), plano)
+
+
+def test_plano_compacto_aceita_o_plano_do_historico_com_texto():
+    plano = criar_plano_treino_df(['corrida'], 10, 'Manutenção ⚖️', '', 70.0, seed=1, data_inicio=INICIO)
+    historico = plano.assign(
+        data=plano['data'].dt.strftime('%d/%m/%Y'),
+        dia_semana=plano['dia_semana'].astype(str),
+        exercicio=plano['exercicio'].astype(str),
+        intensidade=plano['intensidade'].astype(str),
+        duracao=plano['duracao'].astype(int)
+    )
+    compacto = PlanoCompacto.de_dataframe(historico)
+    assert compacto.assinatura == PlanoCompacto.de_dataframe(plano).assinatura
+    pd.testing.assert_frame_equal(compacto.para_dataframe(), plano)
+
+
+def test_assinatura_identifica_o_conteudo_do_plano():
+    plano = criar_plano_treino_df(['corrida'], 30, 'Emagrecimento 📉', '', 80.0, seed=2, data_inicio=INICIO)
+    assinatura = PlanoCompacto.de_dataframe(plano).assinatura
+    assert PlanoCompacto.de_dataframe(plano.copy()).assinatura == assinatura
+    assert PlanoCompacto.de_dataframe(PlanoCompacto.de_dataframe(plano).para_dataframe()).assinatura == assinatura
+    pesado = plano.assign(peso_projetado=plano['peso_projetado'] + 0.5)
+    assert PlanoCompacto.de_dataframe(pesado).assinatura != assinatura
+    adiado = criar_plano_treino_df(['corrida'], 30, 'Emagrecimento 📉', '', 80.0, seed=2,
+                                   data_inicio=INICIO + timedelta(days=1))
+    assert PlanoCompacto.de_dataframe(adiado).assinatura != assinatura
+
+
+def test_assinatura_igual_entre_processos():
+    codigo = (
+        'import sys; from datetime import date; from plano import PlanoCompacto, criar_plano_treino_df; '
+        "p = criar_plano_treino_df(['corrida'], 30, 'Emagrecimento 📉', '', 80.0, seed=2, data_inicio=date(2026, 1, 5)); "
+        'sys.stdout.write(PlanoCompacto.de_dataframe(p).assinatura)'
+    )
+    raiz = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    assinaturas = {
+        subprocess.run([sys.executable, '-c', codigo], cwd=raiz, capture_output=True, check=True,
+                       env={**os.environ, 'PYTHONHASHSEED': semente}).stdout.decode('ascii')
+        for semente in ('1', '2')
+    }
+    plano = criar_plano_treino_df(['corrida'], 30, 'Emagrecimento 📉', '', 80.0, seed=2, data_inicio=INICIO)
+    assert assinaturas == {PlanoCompacto.de_dataframe(plano).assinatura}
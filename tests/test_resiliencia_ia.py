@@ -0,0 +1,67 @@
+import time
+
+import pytest
+
+from resiliencia_ia import ABERTO, FECHADO, IAIndisponivel, ModeloResiliente
+
+class ModeloFalso:
+    def __init__(self):
+        self.falhar = False
+
+    def invoke(self, prompt, **kwargs):
+        if self.falhar:
+            raise RuntimeError('falha')
+        return prompt
+
+    def stream(self, prompt, **kwargs):
+        if self.falhar:
+            raise RuntimeError('falha')
+        for parte in ('a', 'b', 'c'):
+            yield parte
+
+def _resiliente(modelo):
+    return ModeloResiliente(modelo, {
+        'tentativas': 1, 'falhas_para_abrir': 1, 'aberto_segundos': 0.05, 'timeout_tentativa_segundos': 2
+    })
+
+def test_stream_fechado_na_chamada_de_teste_nao_prende_o_disjuntor():
+    modelo = ModeloFalso()
+    resiliente = _resiliente(modelo)
+    modelo.falhar = True
+    with pytest.raises(Exception):
+        resiliente.invoke('x')
+    assert resiliente.disjuntor.estado == ABERTO
+
+    time.sleep(0.06)
+    modelo.falhar = False
+    stream = resiliente.stream('x')
+    assert next(stream) == 'a'   # chamada de teste (meio aberto)
+    stream.close()                # consumidor abandona o stream (ex.: rerun do Streamlit)
+
+    assert not resiliente.disjuntor._teste_em_andamento
+    time.sleep(0.06)
+    assert ''.join(resiliente.stream('x')) == 'abc'
+    assert resiliente.invoke('y') == 'y'
+
+def test_disjuntor_aberto_recusa_sem_chamar_o_modelo():
+    modelo = ModeloFalso()
+    resiliente = _resiliente(modelo)
+    modelo.falhar = True
+    with pytest.raises(Exception):
+        resiliente.invoke('x')
+    with pytest.raises(IAIndisponivel):
+        resiliente.invoke('x')
+
+def test_streams_abandonados_nao_abrem_o_disjuntor():
+    modelo = ModeloFalso()
+    resiliente = ModeloResiliente(modelo, {
+        'tentativas': 1, 'falhas_para_abrir': 3, 'aberto_segundos': 30, 'timeout_tentativa_segundos': 2
+    })
+    for _ in range(5):
+        stream = resiliente.stream('x')
+        assert next(stream) == 'a'
+        stream.close()
+
+    assert resiliente.disjuntor.estado == FECHADO
+    assert resiliente.disjuntor.falhas == 0
+    assert resiliente.invoke('y') == 'y'
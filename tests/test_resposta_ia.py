@@ -0,0 +1,82 @@
+from resposta_ia import processar_texto
+
+MARKDOWN = """Olá, Ana!
+## 1. Recomendações Nutricionais
+### Café da manhã
+- Ovos mexidos
+### Refeição pré-treino
+- Banana
+### Lanche pós-treino
+- Iogurte
+## 2. Dicas de Treino
+- Força 3x por semana
+## Recomendações Gerais
+- Beba água
+## Metas e Marcos
+- Perder 2 kg no mês
+"""
+
+NEGRITO = """### 🥗 Recomendações Nutricionais
+**Café da manhã**
+- Aveia
+**Refeição pré-treino**
+- Fruta
+### 💪 Dicas de Treino
+- Supino
+"""
+
+SEM_MARCACAO = """RECOMENDAÇÕES NUTRICIONAIS:
+- Café da manhã: ovos
+- Almoço: arroz e feijão
+DICAS DE TREINO:
+- Agachamento
+METAS E MARCOS:
+- Semana 1
+"""
+
+
+def test_subtitulo_com_palavra_de_outra_secao_fica_na_nutricao():
+    secoes = processar_texto(MARKDOWN)
+    assert secoes['nutricao'] == {
+        'cafe_da_manha': ['Ovos mexidos'],
+        'Refeição pré-treino': ['Banana'],
+        'lanches': ['Iogurte']
+    }
+    assert secoes['treino'] == ['Força 3x por semana']
+    assert secoes['recomendacoes'] == ['Beba água']
+    assert secoes['metas'] == ['Perder 2 kg no mês']
+
+
+def test_subtitulo_em_negrito_nao_troca_de_secao():
+    secoes = processar_texto(NEGRITO)
+    assert secoes['nutricao'] == {'cafe_da_manha': ['Aveia'], 'Refeição pré-treino': ['Fruta']}
+    assert secoes['treino'] == ['Supino']
+
+
+def test_titulos_exatos_sem_marcacao_abrem_secoes():
+    secoes = processar_texto(SEM_MARCACAO)
+    assert secoes['nutricao'] == {'cafe_da_manha': ['ovos'], 'almoco': ['arroz e feijão']}
+    assert secoes['treino'] == ['Agachamento']
+    assert secoes['metas'] == ['Semana 1']
+
+
+def test_markdown_com_trecho_entre_chaves_e_lido_como_texto():
+    from utils import processar_resposta_ia
+    resposta = '## Metas\n- Registre {"peso": 70} no app\n- Meta {semanal}'
+    assert processar_resposta_ia(resposta)['metas'] == ['Registre {"peso": 70} no app', 'Meta {semanal}']
+
+
+def test_modo_json_pede_so_as_secoes_do_pedido():
+    from utils import gerar_prompt_ia
+    perfil = {
+        'nome': 'Ana', 'idade': 30, 'sexo': 'Feminino 👩', 'altura': 165, 'peso': 60.0,
+        'nivel_atividade': 'Sedentário 🛋️', 'objetivo': 'Manutenção ⚖️', 'restricoes': [],
+        'preferencias_alimentares': '', 'limitacoes': '', 'duracao_plano': 30
+    }
+    prompt = gerar_prompt_ia(perfil, formato_json=True, modelos=True)
+    assert '"nutricao"' in prompt
+    for ausente in ('"treino"', '"recomendacoes"', '"metas"', '"evitar"'):
+        assert ausente not in prompt
+    assert '"treino"' in gerar_prompt_ia(dict(perfil, limitacoes='joelho'), formato_json=True, modelos=True)
+    completo = gerar_prompt_ia(perfil, formato_json=True)
+    assert all(f'"{secao}"' in completo for secao in ('nutricao', 'treino', 'recomendacoes', 'metas', 'evitar'))
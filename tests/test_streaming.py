@@ -0,0 +1,136 @@
+import time
+
+import pytest
+
+import utils
+from coordenador_ia import LimitadorTokens
+from llm_cache import LLMResponseCache
+
+PERFIL = {
+    'nome': 'Ana', 'idade': 30, 'sexo': 'Feminino 👩', 'altura': 165, 'peso': 60.0,
+    'nivel_atividade': 'Moderadamente ativo 🏃', 'objetivo': 'Ganho de Massa 💪',
+    'restricoes': [], 'preferencias_alimentares': '', 'limitacoes': '', 'duracao_plano': 30
+}
+RESPOSTA = '## RECOMENDAÇÕES NUTRICIONAIS\n- Aveia no café\n\n## METAS E MARCOS\n- Treinar 3x por semana'
+
+
+class Chunk:
+    def __init__(self, conteudo):
+        self.content = conteudo
+
+
+class ModeloFalso:
+    """Responde RESPOSTA em chunks de 7 caracteres; `falhar_apos` interrompe o stream."""
+
+    def __init__(self, falhar_apos=None):
+        self.falhar_apos = falhar_apos
+        self.chamadas = 0
+
+    def invoke(self, prompt, **kwargs):
+        self.chamadas += 1
+        return Chunk(RESPOSTA)
+
+    def stream(self, prompt, **kwargs):
+        self.chamadas += 1
+        for i, inicio in enumerate(range(0, len(RESPOSTA), 7)):
+            if self.falhar_apos is not None and i == self.falhar_apos:
+                raise RuntimeError('conexão perdida')
+            yield Chunk(RESPOSTA[inicio:inicio + 7])
+
+
+@pytest.fixture(autouse=True)
+def sem_limite(monkeypatch):
+    monkeypatch.setattr(utils, 'limitador', LimitadorTokens(rpm=0, tpm=0))
+
+
+def test_stream_entrega_partes_que_montam_a_resposta():
+    uso = {}
+    partes = list(utils.stream_recomendacoes_ia(ModeloFalso(), PERFIL, uso=uso))
+    assert len(partes) > 1
+    assert ''.join(partes) == RESPOSTA
+    assert ''.join(partes) == utils.obter_recomendacoes_ia(ModeloFalso(), PERFIL)
+    assert uso['requisicoes'] == 1
+
+
+def test_stream_guarda_no_cache_e_serve_de_uma_vez(tmp_path):
+    cache = LLMResponseCache(str(tmp_path / 'cache.sqlite'), ttl_seconds=60, max_entries=10)
+    modelo = ModeloFalso()
+    assert ''.join(utils.stream_recomendacoes_ia(modelo, PERFIL, cache)) == RESPOSTA
+    assert list(utils.stream_recomendacoes_ia(modelo, PERFIL, cache)) == [RESPOSTA]
+    assert modelo.chamadas == 1
+
+
+def test_stream_interrompido_nao_vai_para_o_cache(tmp_path):
+    cache = LLMResponseCache(str(tmp_path / 'cache.sqlite'), ttl_seconds=60, max_entries=10)
+    with pytest.raises(RuntimeError):
+        list(utils.stream_recomendacoes_ia(ModeloFalso(falhar_apos=2), PERFIL, cache))
+    assert cache.get(PERFIL) is None
+
+
+def test_stream_em_segundo_plano_pode_ser_percorrido_de_novo():
+    transmissao = utils.iniciar_stream_recomendacoes_ia(ModeloFalso(), PERFIL)
+    assert ''.join(transmissao) == RESPOSTA
+    assert ''.join(transmissao) == RESPOSTA   # rerun: repete as partes já recebidas
+    assert transmissao.concluido and transmissao.erro is None
+    assert set(transmissao.secoes()) >= {'nutricao', 'metas'}
+
+
+def test_stream_em_segundo_plano_repassa_o_erro():
+    transmissao = utils.iniciar_stream_recomendacoes_ia(ModeloFalso(falhar_apos=2), PERFIL)
+    recebidas = []
+    with pytest.raises(RuntimeError, match='conexão perdida'):
+        for parte in transmissao:
+            recebidas.append(parte)
+    assert ''.join(recebidas) == RESPOSTA[:14]
+
+
+def test_stream_igual_em_andamento_e_compartilhado():
+    modelo = ModeloFalso()
+    lider = utils.stream_recomendacoes_ia(modelo, PERFIL)
+    primeira = next(lider)   # o líder fica com a transmissão em andamento
+    uso = {}
+    seguidor = utils.iniciar_stream_recomendacoes_ia(modelo, PERFIL, uso=uso)
+    while not uso.get('compartilhada'):
+        time.sleep(0.001)
+    assert primeira + ''.join(lider) == RESPOSTA
+    assert ''.join(seguidor) == RESPOSTA
+    assert modelo.chamadas == 1
+
+
+class ModeloPorSecao:
+    """Responde o título da seção pedida; a primeira seção do prompt é a última a terminar."""
+
+    TITULOS = ['RECOMENDAÇÕES NUTRICIONAIS', 'DICAS DE TREINO', 'RECOMENDAÇÕES GERAIS', 'METAS E MARCOS']
+
+    def __init__(self):
+        self.chamadas = 0
+
+    def invoke(self, prompt, **kwargs):
+        self.chamadas += 1
+        titulo = next(t for t in self.TITULOS if t in prompt)
+        time.sleep(0.02 * (len(self.TITULOS) - self.TITULOS.index(titulo)))
+        return Chunk(f'## {titulo}')
+
+
+def test_secoes_paralelas_voltam_na_ordem_do_prompt():
+    modelo = ModeloPorSecao()
+    esperado = '\n\n'.join(f'## {t}' for t in ModeloPorSecao.TITULOS)
+    assert utils.obter_recomendacoes_ia(modelo, PERFIL, paralelo=True) == esperado
+    assert modelo.chamadas == 4
+    partes = list(utils.stream_recomendacoes_ia(modelo, PERFIL, paralelo=True))
+    assert len(partes) == 4 and ''.join(partes) == esperado   # cada seção inteira, na ordem
+
+
+def test_recomendacoes_em_segundo_plano_sem_streaming():
+    futuro = utils.iniciar_recomendacoes_ia(ModeloFalso(), PERFIL)
+    assert futuro.result(5) == RESPOSTA
+
+
+def test_recomendacoes_em_segundo_plano_repassam_o_erro():
+    class ModeloForaDoAr(ModeloFalso):
+        def invoke(self, prompt, **kwargs):
+            raise RuntimeError('provedor fora do ar')
+
+    futuro = utils.iniciar_recomendacoes_ia(ModeloForaDoAr(), PERFIL)
+    with pytest.raises(RuntimeError, match='fora do ar'):
+        futuro.result(5)
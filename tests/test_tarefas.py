@@ -0,0 +1,85 @@
+import threading
+import time
+
+import pytest
+
+from tarefas import CONCLUIDA, ERRO, EXECUTANDO, FilaTarefas
+
+
+def test_mesma_chave_reaproveita_a_tarefa():
+    fila = FilaTarefas(workers=2)
+    liberar = threading.Event()
+    execucoes = []
+
+    def gerar(tarefa):
+        execucoes.append(tarefa.id)
+        liberar.wait(5)
+        return 'texto'
+
+    primeira = fila.submeter('perfil-a', gerar, contexto={'calorias': 2000})
+    segunda = fila.submeter('perfil-a', gerar)
+    outra = fila.submeter('perfil-b', gerar)
+    assert segunda is primeira and outra is not primeira
+    liberar.set()
+    assert primeira.aguardar(5) and outra.aguardar(5)
+    assert sorted(execucoes) == sorted([primeira.id, outra.id])
+    assert fila.submeter('perfil-a', gerar) is primeira   # concluída: não gera de novo
+    assert primeira.obter_resultado() == 'texto'
+
+
+def test_tarefa_e_retomada_por_id_ou_chave_com_o_progresso():
+    fila = FilaTarefas(workers=1)
+    liberar = threading.Event()
+
+    def gerar(tarefa):
+        tarefa.andamento = 'parcial'
+        liberar.wait(5)
+        return 'completo'
+
+    tarefa = fila.submeter('perfil', gerar, contexto={'calorias': 2000})
+    while tarefa.andamento is None:
+        time.sleep(0.001)
+    # outra sessão (ex.: página recarregada) encontra a mesma tarefa em andamento
+    retomada = fila.obter(tarefa.id)
+    assert retomada is tarefa and fila.buscar('perfil') is tarefa
+    assert retomada.estado == EXECUTANDO and not retomada.concluida
+    assert retomada.andamento == 'parcial' and retomada.contexto == {'calorias': 2000}
+    with pytest.raises(Exception, match='ainda não terminou'):
+        retomada.obter_resultado()
+    liberar.set()
+    assert retomada.aguardar(5)
+    assert retomada.estado == CONCLUIDA and retomada.obter_resultado() == 'completo'
+
+
+def test_tarefa_com_erro_e_submetida_de_novo():
+    fila = FilaTarefas(workers=1)
+
+    def falhar(tarefa):
+        raise RuntimeError('provedor fora do ar')
+
+    tarefa = fila.submeter('perfil', falhar)
+    assert tarefa.aguardar(5)
+    assert tarefa.estado == ERRO
+    with pytest.raises(RuntimeError, match='fora do ar'):
+        tarefa.obter_resultado()
+    nova = fila.submeter('perfil', lambda t: 'ok')
+    assert nova is not tarefa
+    assert nova.aguardar(5) and nova.obter_resultado() == 'ok'
+    assert fila.buscar('perfil') is nova
+
+
+def test_tarefas_concluidas_sao_descartadas_apos_o_ttl():
+    fila = FilaTarefas(workers=2, ttl_segundos=0.05)
+    antiga = fila.submeter('antiga', lambda t: 'ok')
+    assert antiga.aguardar(5)
+    liberar = threading.Event()
+    em_andamento = fila.submeter('em_andamento', lambda t: liberar.wait(5))
+    time.sleep(0.1)
+
+    fila.submeter('nova', lambda t: 'ok').aguardar(5)   # a limpeza ocorre a cada submissão
+    assert fila.obter(antiga.id) is None and fila.buscar('antiga') is None
+    # tarefas ainda não concluídas nunca expiram
+    assert fila.obter(em_andamento.id) is em_andamento
+    liberar.set()
+    assert em_andamento.aguardar(5)
+    assert sum(fila.resumo().values()) == 2
@@ -1,207 +1,682 @@
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-from datetime import datetime, timedelta
-import random
-from typing import Dict, List, Tuple
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+import hashlib
+import importlib
+import json
 import os
-from langchain_google_genai import ChatGoogleGenerativeAI
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
 
-def initialize_ai_model(api_key: str) -> ChatGoogleGenerativeAI:
+from config import ACTIVITY_LEVELS, GOALS, GOAL_CALORIE_ADJUSTMENTS, AI_OUTPUT_TOKENS
+from coordenador_ia import chamadas_unicas, chave_chamada, limitador
+from llm_cache import NOME_PLACEHOLDER
+from resiliencia_ia import ModeloResiliente
+from metricas import incrementar, medir, observar
+from modelos_secoes import PEDIDOS_PERSONALIZADOS, REFEICOES_PERSONALIZADAS, conteudo_padrao, secoes_personalizadas
+from resposta_ia import (
+    ParserRespostaIA, converter_json_em_markdown, instrucao_json, processar_json, processar_texto
+)
+
+# Dependências pesadas (langchain, pandas/numpy, plotly) são importadas só no primeiro
+# uso, para que a primeira renderização do app não espere por elas
+if TYPE_CHECKING:
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
+# Atributos servidos por outros módulos, carregados sob demanda (PEP 562)
+_ATRIBUTOS_TARDIOS = {
+    'gerar_graficos_plano': 'graficos',
+    'gerar_grafico_comparacao_peso': 'graficos',
+    'criar_plano_treino_df': 'plano'
+}
+
+def __getattr__(nome: str):
+    if nome in _ATRIBUTOS_TARDIOS:
+        return getattr(importlib.import_module(_ATRIBUTOS_TARDIOS[nome]), nome)
+    raise AttributeError(f"module 'utils' has no attribute '{nome}'")
+
+# Módulos carregados em segundo plano logo após a primeira renderização
+MODULOS_PESADOS = ['langchain_google_genai', 'plano', 'graficos', 'cardapio']
+_aquecimento_lock = threading.Lock()
+_aquecimento: Dict = {'iniciado': False}
+
+def aquecer_importacoes() -> None:
+    """Importa as dependências pesadas em uma thread, uma vez por processo."""
+    with _aquecimento_lock:
+        if _aquecimento['iniciado']:
+            return
+        _aquecimento['iniciado'] = True
+
+    def importar():
+        for modulo in MODULOS_PESADOS:
+            try:
+                importlib.import_module(modulo)
+            except Exception as e:
+                print(f"Erro ao pré-carregar {modulo}: {e}")
+
+    threading.Thread(target=importar, name='fitia-importacoes', daemon=True).start()
+
+def initialize_ai_model(api_key: str) -> 'ChatGoogleGenerativeAI':
     """Inicializa o modelo AI do Google."""
     try:
+        from langchain_google_genai import ChatGoogleGenerativeAI
         os.environ['GOOGLE_API_KEY'] = api_key
         return ChatGoogleGenerativeAI(model='gemini-pro',
                                     temperature=0.7,
                                     top_p=0.9,
                                     top_k=40,
-                                    max_output_tokens=2048)
+                                    max_output_tokens=AI_OUTPUT_TOKENS['maximo'])
     except Exception as e:
         raise Exception(f"Erro ao inicializar o modelo AI: {e}")
 
-def gerar_prompt_ia(dados_usuario: Dict) -> str:
-    """Gera um prompt detalhado para a IA baseado nos dados do usuário."""
-    return f"""
-    Como nutricionista e personal trainer especializado, crie um plano detalhado para {dados_usuario['nome']}.
-    
-    Perfil:
-    - Idade: {dados_usuario['idade']} anos
-    - Sexo: {dados_usuario['sexo']}
-    - Altura: {dados_usuario['altura']} cm
-    - Peso: {dados_usuario['peso']} kg
-    - Nível de atividade: {dados_usuario['nivel_atividade']}
-    - Objetivo: {dados_usuario['objetivo']}
-    - Restrições alimentares: {', '.join(dados_usuario['restricoes'])}
-    - Preferências alimentares: {dados_usuario['preferencias_alimentares']}
-    - Limitações físicas: {dados_usuario['limitacoes']}
-    
-    Por favor, forneça:
-    1. RECOMENDAÇÕES NUTRICIONAIS:
+# Cliente único por processo, compartilhado entre todas as sessões do Streamlit
+_ai_model_lock = threading.Lock()
+_ai_model_cache: Dict = {'api_key': None, 'settings': None, 'model': None}
+
+def get_ai_model(api_key: str, config: Optional[Dict] = None) -> ModeloResiliente:
+    """Retorna o modelo AI compartilhado, com prazos, novas tentativas e disjuntor (AI_RESILIENCE).
+
+    O cliente só é recriado quando a chave ou as configurações de resiliência mudam.
+    """
+    settings = (config or {}).get('AI_RESILIENCE') or {}
+    with _ai_model_lock:
+        if (_ai_model_cache['model'] is None or _ai_model_cache['api_key'] != api_key
+                or _ai_model_cache['settings'] != settings):
+            _ai_model_cache['model'] = ModeloResiliente(initialize_ai_model(api_key), settings)
+            _ai_model_cache['api_key'] = api_key
+            _ai_model_cache['settings'] = settings
+        return _ai_model_cache['model']
+
+# Seções solicitadas à IA; podem ser pedidas juntas ou em sub-requisições paralelas
+SECOES_PROMPT = {
+    'nutricao': """RECOMENDAÇÕES NUTRICIONAIS:
     - Sugestão de 3 opções de café da manhã
     - Sugestão de 3 opções de almoço
     - Sugestão de 3 opções de jantar
     - 5 opções de lanches saudáveis
-    - Alimentos a serem evitados
-    
-    2. DICAS DE TREINO:
+    - Alimentos a serem evitados""",
+    'treino': """DICAS DE TREINO:
     - Melhores exercícios para o objetivo
     - Frequência recomendada
     - Intensidade ideal
-    - Precauções específicas
-    
-    3. RECOMENDAÇÕES GERAIS:
+    - Precauções específicas""",
+    'recomendacoes': """RECOMENDAÇÕES GERAIS:
     - Dicas de hidratação
     - Sugestões de suplementação (se necessário)
     - Dicas de descanso e recuperação
-    - Estratégias para manter a motivação
-    
-    4. METAS E MARCOS:
+    - Estratégias para manter a motivação""",
+    'metas': """METAS E MARCOS:
     - Objetivos semanais realistas
     - Indicadores de progresso
-    - Ajustes recomendados ao longo do tempo
-    
-    Por favor, organize as informações de forma clara e estruturada usando markdown para formatação.
+    - Ajustes recomendados ao longo do tempo"""
+}
+
+def _compactar(texto: str) -> str:
+    """Remove a indentação e as linhas em branco repetidas de um bloco de texto do prompt."""
+    linhas = [linha.strip() for linha in texto.strip().splitlines()]
+    return '\n'.join(l for i, l in enumerate(linhas) if l or (i and linhas[i - 1]))
+
+# Modelo do prompt pré-compilado uma única vez: sem a indentação do código-fonte,
+# que era enviada (e cobrada) em toda requisição
+_MODELO_PROMPT = _compactar("""
+    Como nutricionista e personal trainer especializado, crie um plano detalhado para {nome}.
+
+    Perfil:
+    - Idade: {idade} anos
+    - Sexo: {sexo}
+    - Altura: {altura} cm
+    - Peso: {peso} kg
+    - Nível de atividade: {nivel_atividade}
+    - Objetivo: {objetivo}
+    - Restrições alimentares: {restricoes}
+    - Preferências alimentares: {preferencias_alimentares}
+    - Limitações físicas: {limitacoes}
+
+    Por favor, forneça:
+    {pedidos}
+
+    {formato}
+""")
+_SECOES_COMPACTAS = {secao: _compactar(texto) for secao, texto in SECOES_PROMPT.items()}
+_FORMATO_MARKDOWN = 'Organize as informações de forma clara e estruturada usando markdown.'
+_PEDIDOS_COMPACTOS = {secao: _compactar(texto) for secao, texto in PEDIDOS_PERSONALIZADOS.items()}
+
+def gerar_prompt_ia(
+    dados_usuario: Dict,
+    secoes: Optional[List[str]] = None,
+    formato_json: bool = False,
+    modelos: bool = False
+) -> str:
+    """Gera um prompt detalhado para a IA baseado nos dados do usuário.
+
+    Por padrão pede todas as seções de SECOES_PROMPT; `secoes` restringe o pedido
+    a um subconjunto (usado nas sub-requisições paralelas). `formato_json` pede a
+    resposta como JSON estruturado em vez de Markdown. Com `modelos` o prompt pede
+    só as partes personalizadas (modelos_secoes.PEDIDOS_PERSONALIZADOS); o restante
+    vem da biblioteca de conteúdo padrão.
+    """
+    textos = _PEDIDOS_COMPACTOS if modelos else _SECOES_COMPACTAS
+    secoes = tuple(secoes or (secoes_personalizadas(dados_usuario) if modelos else SECOES_PROMPT))
+    pedidos = '\n\n'.join(f"{i}. {textos[secao]}" for i, secao in enumerate(secoes, 1))
+    if formato_json:
+        # O formato pede só as seções (e refeições) pedidas, dentro do orçamento de saída delas
+        formato = instrucao_json(secoes, REFEICOES_PERSONALIZADAS) if modelos else instrucao_json(secoes)
+    else:
+        formato = _FORMATO_MARKDOWN
+    return _MODELO_PROMPT.format(
+        nome=dados_usuario['nome'],
+        idade=dados_usuario['idade'],
+        sexo=dados_usuario['sexo'],
+        altura=dados_usuario['altura'],
+        peso=dados_usuario['peso'],
+        nivel_atividade=dados_usuario['nivel_atividade'],
+        objetivo=dados_usuario['objetivo'],
+        restricoes=', '.join(dados_usuario['restricoes']),
+        preferencias_alimentares=dados_usuario['preferencias_alimentares'],
+        limitacoes=dados_usuario['limitacoes'],
+        pedidos=pedidos,
+        formato=formato
+    )
+
+def calcular_max_tokens_saida(duracao_plano: int, secoes: Optional[List[str]] = None, modelos: bool = False) -> int:
+    """Orçamento de tokens de saída para as seções pedidas, proporcional à duração do plano.
+
+    Planos de 30 dias ou mais usam a base de AI_OUTPUT_TOKENS; um plano de 7 dias
+    recebe cerca de 60% dela. O resultado fica entre o mínimo e o máximo configurados.
+    Com `modelos` usa as bases `personalizado_<secao>`, das partes pedidas à IA nesse modo.
+    """
+    fator = min(1.0, 0.5 + duracao_plano / 60)
+    if modelos:
+        base = sum(AI_OUTPUT_TOKENS[f'personalizado_{secao}'] for secao in (secoes or ['nutricao']))
+    else:
+        base = sum(AI_OUTPUT_TOKENS[secao] for secao in (secoes or SECOES_PROMPT))
+    return int(min(AI_OUTPUT_TOKENS['maximo'], max(AI_OUTPUT_TOKENS['minimo'], base * fator)))
+
+def estimar_tokens(texto: str) -> int:
+    """Estimativa de tokens (~4 caracteres por token), usada quando o modelo não informa o uso."""
+    return (len(texto) + 3) // 4
+
+# Uso acumulado de tokens no processo (todas as sessões), para acompanhar custo por plano
+_uso_lock = threading.Lock()
+_uso_total: Dict = {'requisicoes': 0, 'tokens_entrada': 0, 'tokens_saida': 0, 'cache': 0}
+
+def _registrar_uso(
+    uso: Optional[Dict],
+    prompt: str,
+    resposta: str,
+    max_saida: int,
+    inicio: float,
+    metadados: Optional[Dict] = None
+) -> int:
+    """Soma os tokens de uma chamada em `uso` (por plano) e no total do processo.
+
+    Usa os números informados pelo modelo (`usage_metadata`) quando existem e,
+    caso contrário, a estimativa de estimar_tokens. Retorna o total de tokens.
+    """
+    metadados = metadados or {}
+    entrada = metadados.get('input_tokens') or estimar_tokens(prompt)
+    saida = metadados.get('output_tokens') or estimar_tokens(resposta)
+    incrementar('ia_tokens_entrada', entrada)
+    incrementar('ia_tokens_saida', saida)
+    with _uso_lock:
+        _uso_total['requisicoes'] += 1
+        _uso_total['tokens_entrada'] += entrada
+        _uso_total['tokens_saida'] += saida
+        if uso is not None:
+            uso['requisicoes'] = uso.get('requisicoes', 0) + 1
+            uso['tokens_entrada'] = uso.get('tokens_entrada', 0) + entrada
+            uso['tokens_saida'] = uso.get('tokens_saida', 0) + saida
+            uso['max_tokens_saida'] = uso.get('max_tokens_saida', 0) + max_saida
+            # Sub-requisições paralelas se sobrepõem: vale a mais lenta
+            uso['latencia_s'] = max(uso.get('latencia_s', 0.0), round(time.perf_counter() - inicio, 3))
+    return entrada + saida
+
+def _registrar_cache(uso: Optional[Dict]) -> None:
+    incrementar('cache_ia_acertos')
+    with _uso_lock:
+        _uso_total['cache'] += 1
+        if uso is not None:
+            uso['cache'] = True
+
+def uso_tokens_total() -> Dict:
+    """Retorna uma cópia do uso de tokens acumulado pelo processo."""
+    with _uso_lock:
+        return dict(_uso_total)
+
+# Executores compartilhados pelo processo: um para a chamada de cada sessão e outro
+# para as sub-requisições por seção (separados para que um não espere pelo outro)
+_executor_ia = ThreadPoolExecutor(max_workers=16, thread_name_prefix='fitia-ia')
+_executor_secoes = ThreadPoolExecutor(max_workers=32, thread_name_prefix='fitia-ia-secao')
+
+def _config_geracao(dados_usuario: Dict, secoes=None, modelos: bool = False) -> Dict:
+    if modelos:
+        secoes = secoes or secoes_personalizadas(dados_usuario)
+    return {'max_output_tokens': calcular_max_tokens_saida(dados_usuario.get('duracao_plano', 30), secoes, modelos)}
+
+def _para_cache(dados_usuario: Dict) -> Dict:
+    """Perfil enviado ao modelo quando a resposta vai para o cache compartilhado: sem o nome.
+
+    O prompt leva NOME_PLACEHOLDER, trocado pelo nome só na exibição, para que nenhuma
+    forma do nome (primeiro nome, apelido) fique na resposta servida a outros usuários.
+    """
+    return {**dados_usuario, 'nome': NOME_PLACEHOLDER}
+
+def _preencher_nome(texto: str, dados_usuario: Dict) -> str:
+    return texto.replace(NOME_PLACEHOLDER, dados_usuario.get('nome') or '')
+
+def _preencher_nome_stream(partes: Iterable[str], dados_usuario: Dict) -> Iterator[str]:
+    """_preencher_nome em streaming: o marcador pode chegar dividido entre dois chunks."""
+    pendente = ''
+    for parte in partes:
+        texto = pendente + parte
+        # Segura o final do texto que ainda pode ser o começo do marcador
+        corte = len(texto)
+        for tamanho in range(min(len(NOME_PLACEHOLDER) - 1, len(texto)), 0, -1):
+            if NOME_PLACEHOLDER.startswith(texto[-tamanho:]):
+                corte -= tamanho
+                break
+        pendente = texto[corte:]
+        if corte:
+            yield _preencher_nome(texto[:corte], dados_usuario)
+    if pendente:
+        yield _preencher_nome(pendente, dados_usuario)
+
+def _com_conteudo_padrao(dados_usuario: Dict, resposta: str, modelos: bool) -> str:
+    """No modo de modelos, junta a biblioteca de conteúdo padrão à resposta personalizada da IA."""
+    return f"{conteudo_padrao(dados_usuario)}\n\n{resposta}" if modelos else resposta
+
+def _cota(prompt: str, geracao: Dict, uso: Optional[Dict]) -> Tuple[Callable[[bool], bool], List[int]]:
+    """Função que reserva no limitador do processo a cota de cada requisição enviada ao modelo.
+
+    Passada como `reservar` ao ModeloResiliente, é chamada a cada tentativa e hedge
+    (`bloquear=False` só reserva se houver cota imediata). Retorna também a lista dos
+    tokens reservados (entrada + saída máxima), para devolver o que não for usado.
+    """
+    reservas: List[int] = []
+    tokens = estimar_tokens(prompt) + geracao['max_output_tokens']
+
+    def atualizar_posicao(posicao: int) -> None:
+        if uso is not None:
+            uso['posicao_fila'] = posicao
+
+    def reservar(bloquear: bool = True) -> bool:
+        if bloquear:
+            limitador.adquirir(tokens, atualizar_posicao)
+        elif not limitador.tentar_adquirir(tokens):
+            return False
+        reservas.append(tokens)
+        return True
+
+    return reservar, reservas
+
+def _argumentos_cota(ai_model, reservar: Callable[[bool], bool]) -> Dict:
+    """O ModeloResiliente reserva a cota a cada requisição; outros clientes reservam uma vez aqui."""
+    if isinstance(ai_model, ModeloResiliente):
+        return {'reservar': reservar}
+    reservar(True)
+    return {}
+
+def _marcar_compartilhada(uso: Optional[Dict]) -> None:
+    if uso is not None:
+        uso['compartilhada'] = True
+
+def _invocar(
+    ai_model: 'ChatGoogleGenerativeAI',
+    dados_usuario: Dict,
+    secoes=None,
+    formato_json: bool = False,
+    uso: Optional[Dict] = None,
+    modelos: bool = False
+) -> str:
+    """Faz uma chamada ao modelo; no modo JSON a resposta é convertida para Markdown.
+
+    Chamadas simultâneas com o mesmo prompt compartilham uma única requisição, e
+    cada requisição aguarda a cota do limitador de RPM/TPM do processo.
     """
+    prompt = gerar_prompt_ia(dados_usuario, secoes, formato_json, modelos)
+    geracao = _config_geracao(dados_usuario, secoes, modelos)
+    lider = []
 
-def processar_resposta_ia(resposta: str) -> Dict:
-    """Processa a resposta da IA e organiza em seções."""
+    def chamar() -> str:
+        lider.append(True)
+        inicio = time.perf_counter()
+        reservar, reservas = _cota(prompt, geracao, uso)
+        try:
+            with medir('ia_invoke'):
+                mensagem = ai_model.invoke(prompt, generation_config=geracao, **_argumentos_cota(ai_model, reservar))
+        except Exception:
+            limitador.devolver(sum(reservas))
+            raise
+        usados = _registrar_uso(uso, prompt, mensagem.content, geracao['max_output_tokens'], inicio,
+                                getattr(mensagem, 'usage_metadata', None))
+        limitador.devolver(sum(reservas) - usados)
+        return mensagem.content
+
+    resposta = chamadas_unicas.executar(chave_chamada(prompt, geracao), chamar)
+    if not lider:
+        _marcar_compartilhada(uso)
+    return converter_json_em_markdown(resposta) if formato_json else resposta
+
+def _invocar_secoes_paralelas(
+    ai_model: 'ChatGoogleGenerativeAI',
+    dados_usuario: Dict,
+    formato_json: bool = False,
+    uso: Optional[Dict] = None,
+    modelos: bool = False
+) -> List[Future]:
+    """Dispara uma sub-requisição por seção do prompt, todas ao mesmo tempo."""
+    return [
+        _executor_secoes.submit(_invocar, ai_model, dados_usuario, [secao], formato_json, uso, modelos)
+        for secao in (secoes_personalizadas(dados_usuario) if modelos else SECOES_PROMPT)
+    ]
+
+def _stream_modelo(
+    ai_model: 'ChatGoogleGenerativeAI',
+    dados_usuario: Dict,
+    uso: Optional[Dict] = None,
+    modelos: bool = False
+) -> Iterator[str]:
+    """Repassa os chunks do streaming do modelo e registra o uso de tokens ao final.
+
+    Um streaming igual já em andamento é compartilhado: quem chega depois recebe
+    as partes já geradas e acompanha as seguintes, sem nova requisição.
+    """
+    inicio = time.perf_counter()
+    prompt = gerar_prompt_ia(dados_usuario, modelos=modelos)
+    geracao = _config_geracao(dados_usuario, modelos=modelos)
+    chave = chave_chamada(prompt, {**geracao, 'stream': True})
+    transmissao, lider = chamadas_unicas.compartilhar(chave, StreamRecomendacoes)
+    if not lider:
+        _marcar_compartilhada(uso)
+        yield from transmissao
+        return
+
+    partes, metadados = [], None
+    reservar, reservas = _cota(prompt, geracao, uso)
     try:
-        # Divide a resposta em seções principais
-        sections = {
-            'nutricao': {},
-            'treino': [],
-            'recomendacoes': [],
-            'metas': []
-        }
-        
-        # Extrai seções usando regex ou split
-        # Implementar lógica de parsing baseada no formato da resposta
-        # Retorna um dicionário estruturado com as informações
-        
-        return sections
+        for chunk in ai_model.stream(prompt, generation_config=geracao, **_argumentos_cota(ai_model, reservar)):
+            if not partes:
+                observar('ia_primeiro_token', time.perf_counter() - inicio)
+            # O uso informado pelo modelo vem nos últimos chunks
+            metadados = getattr(chunk, 'usage_metadata', None) or metadados
+            partes.append(chunk.content)
+            transmissao._adicionar(chunk.content)
+            yield chunk.content
+        transmissao._finalizar()
+    except Exception as e:
+        incrementar('erros', etapa='ia_stream')
+        transmissao._finalizar(e)
+        limitador.devolver(sum(reservas))
+        raise
+    finally:
+        chamadas_unicas.liberar(chave)
+        if not transmissao.concluido:
+            # Consumidor do líder abandonou o streaming: quem compartilhava não pode ficar esperando
+            transmissao._finalizar(Exception("Erro: streaming da IA interrompido"))
+    observar('ia_stream', time.perf_counter() - inicio)
+    usados = _registrar_uso(uso, prompt, ''.join(partes), geracao['max_output_tokens'], inicio, metadados)
+    limitador.devolver(sum(reservas) - usados)
+
+def obter_recomendacoes_ia(
+    ai_model: 'ChatGoogleGenerativeAI',
+    dados_usuario: Dict,
+    cache=None,
+    paralelo: bool = False,
+    formato_json: bool = False,
+    uso: Optional[Dict] = None,
+    modelos: bool = False
+) -> str:
+    """Obtém as recomendações da IA, consultando o cache de respostas antes do modelo.
+
+    No modo `formato_json` o modelo responde em JSON estruturado, que é convertido
+    para Markdown; o cache guarda sempre o Markdown. Se `uso` for informado, recebe
+    os tokens de entrada/saída, o orçamento de saída e a latência das chamadas.
+    Com `modelos` a IA gera só as partes personalizadas (as únicas guardadas no
+    cache) e o conteúdo padrão vem de modelos_secoes. Com `cache` o nome não vai
+    no prompt (ver _para_cache).
+    """
+    variante = 'modelos' if modelos else ''
+    perfil_prompt = dados_usuario
+    if cache is not None:
+        resposta = cache.get(dados_usuario, variante)
+        if resposta is not None:
+            _registrar_cache(uso)
+            return _com_conteudo_padrao(dados_usuario, resposta, modelos)
+        incrementar('cache_ia_falhas')
+        perfil_prompt = _para_cache(dados_usuario)
+
+    if paralelo:
+        futuros = _invocar_secoes_paralelas(ai_model, perfil_prompt, formato_json, uso, modelos)
+        resposta = '\n\n'.join(f.result() for f in futuros)
+    else:
+        resposta = _invocar(ai_model, perfil_prompt, formato_json=formato_json, uso=uso, modelos=modelos)
+    if cache is not None:
+        cache.set(dados_usuario, resposta, variante)
+        resposta = _preencher_nome(resposta, dados_usuario)
+    return _com_conteudo_padrao(dados_usuario, resposta, modelos)
+
+def stream_recomendacoes_ia(
+    ai_model: 'ChatGoogleGenerativeAI',
+    dados_usuario: Dict,
+    cache=None,
+    paralelo: bool = False,
+    formato_json: bool = False,
+    uso: Optional[Dict] = None,
+    modelos: bool = False
+) -> Iterator[str]:
+    """Gera as recomendações da IA em partes, à medida que o modelo as produz.
+
+    No modo paralelo cada seção é entregue inteira, na ordem do prompt, assim
+    que a sua sub-requisição termina. No modo JSON não há streaming parcial: o
+    texto convertido é entregue de uma vez. Com `modelos` o conteúdo padrão é
+    entregue imediatamente, antes das partes personalizadas.
+    """
+    if formato_json:
+        yield obter_recomendacoes_ia(ai_model, dados_usuario, cache, paralelo, formato_json, uso, modelos)
+        return
+
+    if modelos:
+        yield conteudo_padrao(dados_usuario) + '\n\n'
+    variante = 'modelos' if modelos else ''
+    perfil_prompt = dados_usuario
+    if cache is not None:
+        resposta = cache.get(dados_usuario, variante)
+        if resposta is not None:
+            _registrar_cache(uso)
+            yield resposta
+            return
+        incrementar('cache_ia_falhas')
+        perfil_prompt = _para_cache(dados_usuario)
+
+    if paralelo:
+        futuros = _invocar_secoes_paralelas(ai_model, perfil_prompt, uso=uso, modelos=modelos)
+        fontes = (('\n\n' if i else '') + f.result() for i, f in enumerate(futuros))
+    else:
+        fontes = _stream_modelo(ai_model, perfil_prompt, uso, modelos)
+
+    partes = []
+
+    def recebidas() -> Iterator[str]:
+        for parte in fontes:
+            if parte:
+                partes.append(parte)
+                yield parte
+
+    yield from _preencher_nome_stream(recebidas(), dados_usuario) if cache is not None else recebidas()
+    if cache is not None:
+        cache.set(dados_usuario, ''.join(partes), variante)
+
+def iniciar_recomendacoes_ia(
+    ai_model: 'ChatGoogleGenerativeAI',
+    dados_usuario: Dict,
+    cache=None,
+    paralelo: bool = False,
+    formato_json: bool = False,
+    uso: Optional[Dict] = None,
+    modelos: bool = False
+) -> Future:
+    """Dispara obter_recomendacoes_ia em segundo plano e retorna o Future do texto."""
+    return _executor_ia.submit(
+        obter_recomendacoes_ia, ai_model, dados_usuario, cache, paralelo, formato_json, uso, modelos
+    )
+
+class StreamRecomendacoes:
+    """Recomendações em streaming produzidas em segundo plano.
+
+    Guarda as partes já recebidas, então pode ser percorrido mais de uma vez (por
+    exemplo, após um rerun do Streamlit): cada iteração repete as partes
+    acumuladas e continua aguardando as próximas até o fim da geração.
+    """
+
+    def __init__(self):
+        self.partes: List[str] = []
+        self.concluido = False
+        self.erro: Optional[Exception] = None
+        self._condicao = threading.Condition()
+        self._parser = ParserRespostaIA()
+        self._secoes: Optional[Dict] = None
+
+    def _adicionar(self, parte: str) -> None:
+        with self._condicao:
+            self.partes.append(parte)
+            self._parser.alimentar(parte)
+            self._condicao.notify_all()
+
+    def _finalizar(self, erro: Optional[Exception] = None) -> None:
+        with self._condicao:
+            self.erro = erro
+            self.concluido = True
+            self._condicao.notify_all()
+
+    def __iter__(self) -> Iterator[str]:
+        indice = 0
+        while True:
+            with self._condicao:
+                while indice >= len(self.partes) and not self.concluido:
+                    self._condicao.wait()
+                if indice < len(self.partes):
+                    parte = self.partes[indice]
+                elif self.erro is not None:
+                    raise self.erro
+                else:
+                    return
+            indice += 1
+            yield parte
+
+    def texto(self) -> str:
+        """Retorna o texto recebido até o momento."""
+        with self._condicao:
+            return ''.join(self.partes)
+
+    def secoes(self) -> Dict:
+        """Retorna as seções, analisadas à medida que as partes chegaram (após o término)."""
+        with self._condicao:
+            if self._secoes is None:
+                self._secoes = self._parser.finalizar()
+            return self._secoes
+
+def iniciar_stream_recomendacoes_ia(
+    ai_model: 'ChatGoogleGenerativeAI',
+    dados_usuario: Dict,
+    cache=None,
+    paralelo: bool = False,
+    formato_json: bool = False,
+    uso: Optional[Dict] = None,
+    modelos: bool = False
+) -> StreamRecomendacoes:
+    """Dispara o streaming em segundo plano e retorna um StreamRecomendacoes."""
+    resultado = StreamRecomendacoes()
+    _executor_ia.submit(transmitir_recomendacoes_ia, resultado, ai_model, dados_usuario, cache, paralelo,
+                        formato_json, uso, modelos)
+    return resultado
+
+def transmitir_recomendacoes_ia(
+    transmissao: StreamRecomendacoes,
+    ai_model: 'ChatGoogleGenerativeAI',
+    dados_usuario: Dict,
+    cache=None,
+    paralelo: bool = False,
+    formato_json: bool = False,
+    uso: Optional[Dict] = None,
+    modelos: bool = False
+) -> str:
+    """Preenche `transmissao` com o streaming das recomendações na thread atual; retorna o texto final."""
+    try:
+        for parte in stream_recomendacoes_ia(ai_model, dados_usuario, cache, paralelo, formato_json, uso, modelos):
+            transmissao._adicionar(parte)
+    except Exception as e:
+        transmissao._finalizar(e)
+        raise
+    transmissao._finalizar()
+    return transmissao.texto()
+
+def hash_perfil(dados_usuario: Dict) -> str:
+    """Gera um hash estável do perfil exato, usado para detectar mudanças no formulário."""
+    perfil = json.dumps(dados_usuario, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(perfil.encode('utf-8')).hexdigest()
+
+def processar_resposta_ia(resposta: str, formato_json: bool = False) -> Dict:
+    """Processa a resposta da IA e organiza em seções.
+
+    Retorna 'nutricao' (itens por refeição), 'treino', 'recomendacoes' e 'metas'
+    (listas de itens) e 'markdown' (texto original de cada seção). Com `formato_json`
+    (resposta crua do modo JSON) o objeto é lido diretamente, sem parsing do texto;
+    as respostas de obter_recomendacoes_ia já vêm convertidas para Markdown.
+    """
+    try:
+        if formato_json:
+            return processar_json(resposta) or processar_texto(resposta)
+        return processar_texto(resposta)
     except Exception as e:
         print(f"Erro ao processar resposta da IA: {e}")
         return {}
+
+def normalizar_sexo(sexo: str) -> str:
+    """Remove o emoji do rótulo de sexo vindo do formulário ('Masculino 👨' -> 'Masculino')."""
+    return sexo.split(' ')[0].strip() if sexo else sexo
+
 def calcular_tmb(peso: float, altura: float, idade: int, sexo: str) -> float:
     """Calcula a Taxa Metabólica Basal usando a fórmula de Harris-Benedict."""
-    if sexo == 'Masculino':
+    if normalizar_sexo(sexo) == 'Masculino':
         return 88.36 + (13.4 * peso) + (4.8 * altura) - (5.7 * idade)
     return 447.6 + (9.2 * peso) + (3.1 * altura) - (4.3 * idade)
 
 def calcular_calorias_diarias(tmb: float, nivel_atividade: str, objetivo: str) -> float:
     """Calcula as calorias diárias baseadas no TMB, nível de atividade e objetivo."""
-    fatores_atividade = {
-        'Sedentário 🛋️': 1.2,
-        'Levemente ativo 🚶': 1.375,
-        'Moderadamente ativo 🏃': 1.55,
-        'Muito ativo 🏋️': 1.725,
-        'Extremamente ativo 🏊‍♂️': 1.9
-    }
-    
-    calorias_base = tmb * fatores_atividade[nivel_atividade]
-    
-    ajustes_objetivo = {
-        'Emagrecimento 📉': -500,
-        'Ganho de Massa 💪': 500,
-        'Manutenção ⚖️': 0,
-        'Performance 🎯': 300
+    calorias_base = tmb * ACTIVITY_LEVELS[nivel_atividade]
+    return calorias_base + GOAL_CALORIE_ADJUSTMENTS[objetivo]
+
+def calcular_macros_gramas(calorias: float, objetivo: str) -> Dict[str, float]:
+    """Converte as calorias diárias em gramas de proteínas, carboidratos e gorduras."""
+    macros = GOALS[objetivo]
+    return {
+        'protein': (calorias * macros['protein'] / 100) / 4,
+        'carbs': (calorias * macros['carbs'] / 100) / 4,
+        'fats': (calorias * macros['fats'] / 100) / 9
     }
-    
-    return calorias_base + ajustes_objetivo[objetivo]
 
 def calcular_peso_projetado(peso_inicial: float, objetivo: str, dia: int) -> float:
     """Calcula o peso projetado baseado no objetivo e dia do plano."""
-    if 'Emagrecimento' in objetivo:
-        # Perda de 0.5kg por semana
-        return peso_inicial - (0.5 * dia / 7)
-    elif 'Ganho de Massa' in objetivo:
-        # Ganho de 0.25kg por semana
-        return peso_inicial + (0.25 * dia / 7)
-    else:
-        # Manutenção ou Performance
-        return peso_inicial
+    from plano import variacao_semanal
+    # Perda de 0.5kg/semana no emagrecimento, ganho de 0.25kg/semana no ganho de massa
+    # (ver plano.VARIACAO_PESO_SEMANAL); manutenção e performance mantêm o peso
+    return peso_inicial + (variacao_semanal(objetivo) * dia / 7)
 
 def criar_plano_treino(
     preferencias: List[str], 
     duracao_plano: int, 
     objetivo: str,
     limitacoes: str,
-    peso_inicial: float
-) -> List[Dict]:
-    """Cria um plano de treino personalizado."""
-    plano_treino = []
-    dias_semana = ['Segunda', 'Terça', 'Quarta', 'Quinta', 'Sexta', 'Sábado', 'Domingo']
-    
-    for dia in range(duracao_plano):
-        data = datetime.today() + timedelta(days=dia)
-        dia_semana = dias_semana[data.weekday()]
-        
-        if dia_semana in ['Sábado', 'Domingo']:
-            intensidade = 'Leve'
-            duracao = random.randint(30, 45)
-        else:
-            intensidade = random.choice(['Moderada', 'Alta'])
-            duracao = random.randint(45, 75)
-        
-        exercicio = random.choice(preferencias) if preferencias else 'Caminhada 🚶‍♂️'
-        
-        peso_projetado = calcular_peso_projetado(peso_inicial, objetivo, dia)
-        
-        plano_treino.append({
-            'data': data.strftime('%d/%m/%Y'),
-            'dia_semana': dia_semana,
-            'exercicio': exercicio,
-            'intensidade': intensidade,
-            'duracao': duracao,
-            'peso_projetado': round(peso_projetado, 2)
-        })
-    
-    return plano_treino
-
-def gerar_graficos_plano(
-    plano_df: pd.DataFrame,
     peso_inicial: float,
-    objetivo: str,
-    macronutrientes: Dict
-) -> Tuple[go.Figure, go.Figure, go.Figure]:
-    """Gera os gráficos do plano."""
-    # Gráfico de projeção de peso
-    fig_peso = px.line(plano_df, x='data', y='peso_projetado',
-                       title='📈 Projeção de Evolução do Peso',
-                       template='plotly_white')
-    fig_peso.update_layout(
-        xaxis_title='Data',
-        yaxis_title='Peso (kg)',
-        showlegend=True,
-        plot_bgcolor='rgba(0,0,0,0)',
-        paper_bgcolor='rgba(0,0,0,0)'
-    )
-
-    # Gráfico de macronutrientes
-    fig_macro = go.Figure(data=[go.Pie(
-        labels=list(macronutrientes.keys()),
-        values=list(macronutrientes.values()),
-        hole=.3,
-        marker_colors=['#FF6B6B', '#4ECDC4', '#45B7D1']
-    )])
-    fig_macro.update_layout(
-        title='🥗 Distribuição de Macronutrientes',
-        template='plotly_white',
-        plot_bgcolor='rgba(0,0,0,0)',
-        paper_bgcolor='rgba(0,0,0,0)'
-    )
-
-    # Gráfico de intensidade dos treinos
-    fig_treinos = px.bar(plano_df, x='data', y='duracao',
-                        color='intensidade',
-                        title='💪 Intensidade dos Treinos',
-                        template='plotly_white')
-    fig_treinos.update_layout(
-        xaxis_title='Data',
-        yaxis_title='Duração (minutos)',
-        showlegend=True,
-        plot_bgcolor='rgba(0,0,0,0)',
-        paper_bgcolor='rgba(0,0,0,0)'
-    )
+    seed: Optional[int] = None
+) -> List[Dict]:
+    """Cria um plano de treino personalizado como lista de dias (datas em dd/mm/aaaa).
 
-    return fig_peso, fig_macro, fig_treinos
+    Usa o gerador vetorizado de plano.criar_plano_treino_df; prefira-o quando um
+    DataFrame tipado for suficiente.
+    """
+    from plano import criar_plano_treino_df
+    plano_df = criar_plano_treino_df(preferencias, duracao_plano, objetivo, limitacoes, peso_inicial, seed)
+    colunas = {'data': [d.strftime('%d/%m/%Y') for d in plano_df['data'].tolist()]}
+    for coluna in ['dia_semana', 'exercicio', 'intensidade', 'duracao', 'peso_projetado']:
+        colunas[coluna] = plano_df[coluna].tolist()
+    return [dict(zip(colunas, valores)) for valores in zip(*colunas.values())]